@@ -1,37 +1,23 @@
+import importlib
 import os
 import re
+import sys
+import time
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 from utils.security import limiter
+from utils.json_provider import FastJSONProvider
+from utils.instrumentation import init_instrumentation
+from utils.metrics import init_metrics
+from utils.profiler import init_profiler
 
 ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
 load_dotenv(dotenv_path=ENV_PATH, override=True)
 
-app = Flask(__name__)
-limiter.init_app(app)
-
-
-@limiter.request_filter
-def skip_rate_limit_for_options():
-    return request.method == "OPTIONS"
-
-
-@app.errorhandler(429)
-def ratelimit_handler(e):
-    return jsonify({"error": "Too many requests. Please try again later."}), 429
-
-# Initialize database connection pool on startup
-from models.db import init_connection_pool
-try:
-    init_connection_pool()
-    print("✓ Database connection pool initialized", flush=True)
-except Exception as e:
-    error_msg = f"CRITICAL: Could not initialize connection pool: {e}"
-    print(error_msg, flush=True)
-    import sys
-    print(error_msg, file=sys.stderr, flush=True)
-    # Continue anyway so we can see the error in logs
+# Print every blueprint module's import time at boot, not just the slowest few
+BOOT_TIMING = os.getenv("BOOT_TIMING", "0") == "1"
+BOOT_TIMING_TOP = 5
 
 # 1. DEFINE ALLOWED ORIGINS
 DEFAULT_ORIGINS = [
@@ -52,107 +38,153 @@ def is_allowed_origin(origin):
         return True
     return False
 
-# 2. CONFIGURE CORS
-# We set origins to a dummy value to avoid the iteration error, 
-# then override it in the hook below.
-CORS(app, supports_credentials=True)
-
-@app.after_request
-def add_cors_headers(response):
-    origin = request.headers.get('Origin')
-    if is_allowed_origin(origin):
-        response.headers['Access-Control-Allow-Origin'] = origin
-        response.headers['Access-Control-Allow-Credentials'] = 'true'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization'
-        response.headers['Access-Control-Allow-Methods'] = 'GET,POST,OPTIONS,PUT,DELETE'
-    return response
-
-# Handle OPTIONS preflight requests globally (before any auth or routing)
-@app.route('/<path:path>', methods=['OPTIONS'])
-def handle_preflight(path=None):
-    """Handle CORS preflight requests"""
-    origin = request.headers.get('Origin')
-    if is_allowed_origin(origin):
-        return '', 204
-    return '', 403
-
-# 3. IMPORT ROUTES (Absolute imports)
-from routes.products import products_bp
-from routes.daily_entry import daily_bp
-from routes.auth import auth_bp
-from routes.health import health_bp
-from routes.forecast import forecast_bp
-from services.excel_import import excel_bp
-from routes.export import export_bp
-from routes.forecast_context import forecast_context_bp
-from routes.throwaway_export import throwaway_export_bp
-from routes.forecast_v1 import forecast_v1_bp
-from routes.forecast_approval import forecast_approval_bp
-from routes.waste_submission import waste_submission_bp
-from routes.forecast_accuracy import forecast_accuracy_bp
-from routes.forecast_learning import forecast_learning_bp
-from routes.qr import qr_bp
-from routes.dashboard import dashboard_bp
-from routes.system_health import system_health_bp
-from routes.throwaway_import import throwaway_import_bp
-from routes.anonymous_waste_submission import anonymous_waste_bp
-from routes.pending_waste_management import pending_waste_bp
-from routes.calendar_events import bp as calendar_events_bp
-from routes.daily_production import bp as daily_production_bp
-from routes.daily_production_plan import bp as daily_production_plan_bp
-from routes.daily_sales import bp as daily_sales_bp
-from routes.daily_throwaway import bp as daily_throwaway_bp
-from routes.daily_waste import bp as daily_waste_bp
-from routes.forecast_final import bp as forecast_final_bp
-from routes.forecast_history import bp as forecast_history_bp
-from routes.forecast_raw import bp as forecast_raw_bp, bp_alt as forecast_raw_alt_bp
-from routes.manager_context import bp as manager_context_bp
-from routes.users import bp as users_bp
-from routes.dashboard_data import bp as dashboard_data_bp
-from routes.profile_settings import forecast_settings_bp
-
-# 4. REGISTER BLUEPRINTS
-app.register_blueprint(products_bp, url_prefix="/api/v1/products")
-app.register_blueprint(daily_bp, url_prefix="/api/v1/daily")
-app.register_blueprint(auth_bp, url_prefix="/api/v1/auth")
-app.register_blueprint(health_bp, url_prefix="/api/v1")
-app.register_blueprint(forecast_bp, url_prefix="/api/v1/forecast")
-app.register_blueprint(excel_bp, url_prefix="/api/v1/excel")
-app.register_blueprint(export_bp, url_prefix="/api/v1/export")
-app.register_blueprint(forecast_context_bp, url_prefix="/api/v1/forecast/context")
-app.register_blueprint(throwaway_export_bp, url_prefix="/api/v1/throwaway")
-app.register_blueprint(throwaway_import_bp, url_prefix="/api/v1/throwaway")
-app.register_blueprint(forecast_v1_bp, url_prefix="/api/v1")
-app.register_blueprint(forecast_accuracy_bp, url_prefix="/api/v1/forecast/accuracy")
-app.register_blueprint(forecast_learning_bp, url_prefix="/api/v1/forecast/learning")
-app.register_blueprint(forecast_approval_bp, url_prefix="/api/v1/forecast/approvals")
-app.register_blueprint(waste_submission_bp, url_prefix="/api/v1/waste_submission")
-app.register_blueprint(dashboard_bp, url_prefix="/api/v1/dashboard")
-app.register_blueprint(system_health_bp, url_prefix="/api/v1")
-app.register_blueprint(qr_bp, url_prefix="/api/v1/qr")
-app.register_blueprint(anonymous_waste_bp)  # Already has url_prefix in blueprint
-app.register_blueprint(pending_waste_bp)  # Already has url_prefix in blueprint
-
-# Table route blueprints
-app.register_blueprint(calendar_events_bp, url_prefix="/api/v1/calendar_events")
-app.register_blueprint(daily_production_bp, url_prefix="/api/v1/daily_production")
-app.register_blueprint(daily_production_plan_bp, url_prefix="/api/v1/daily_production_plan")
-app.register_blueprint(daily_sales_bp, url_prefix="/api/v1/daily_sales")
-app.register_blueprint(daily_throwaway_bp, url_prefix="/api/v1/daily_throwaway")
-app.register_blueprint(daily_waste_bp, url_prefix="/api/v1/daily_waste")
-app.register_blueprint(forecast_final_bp, url_prefix="/api/v1/forecast_final")
-app.register_blueprint(forecast_history_bp, url_prefix="/api/v1/forecast_history")
-app.register_blueprint(forecast_raw_bp)  # Already has /api/v1/forecast prefix
-app.register_blueprint(forecast_raw_alt_bp)  # Alternate route with /api/v1/forecast_raw
-app.register_blueprint(manager_context_bp, url_prefix="/api/v1/manager_context")
-app.register_blueprint(users_bp, url_prefix="/api/v1/users")
-app.register_blueprint(dashboard_data_bp, url_prefix="/api/v1/dashboard")
-app.register_blueprint(forecast_settings_bp, url_prefix="/api/v1/forecast/settings")
-
-@app.get("/")
-def home():
-    return {"message": "Backend is live"}
+# 2. BLUEPRINTS: (module, attribute, url_prefix); None keeps the blueprint's own prefix.
+# Route modules import pandas / openpyxl / qrcode / PIL inside the handlers that
+# use them, so registering everything here stays cheap.
+BLUEPRINTS = [
+    ("routes.products", "products_bp", "/api/v1/products"),
+    ("routes.daily_entry", "daily_bp", "/api/v1/daily"),
+    ("routes.auth", "auth_bp", "/api/v1/auth"),
+    ("routes.health", "health_bp", "/api/v1"),
+    ("routes.forecast", "forecast_bp", "/api/v1/forecast"),
+    ("services.excel_import", "excel_bp", "/api/v1/excel"),
+    ("routes.export", "export_bp", "/api/v1/export"),
+    ("routes.forecast_context", "forecast_context_bp", "/api/v1/forecast/context"),
+    ("routes.throwaway_export", "throwaway_export_bp", "/api/v1/throwaway"),
+    ("routes.throwaway_import", "throwaway_import_bp", "/api/v1/throwaway"),
+    ("routes.forecast_v1", "forecast_v1_bp", "/api/v1"),
+    ("routes.forecast_accuracy", "forecast_accuracy_bp", "/api/v1/forecast/accuracy"),
+    ("routes.forecast_learning", "forecast_learning_bp", "/api/v1/forecast/learning"),
+    ("routes.forecast_approval", "forecast_approval_bp", "/api/v1/forecast/approvals"),
+    ("routes.waste_submission", "waste_submission_bp", "/api/v1/waste_submission"),
+    ("routes.dashboard", "dashboard_bp", "/api/v1/dashboard"),
+    ("routes.system_health", "system_health_bp", "/api/v1"),
+    ("routes.qr", "qr_bp", "/api/v1/qr"),
+    ("routes.anonymous_waste_submission", "anonymous_waste_bp", None),
+    ("routes.pending_waste_management", "pending_waste_bp", None),
+
+    # Table route blueprints
+    ("routes.calendar_events", "bp", "/api/v1/calendar_events"),
+    ("routes.daily_production", "bp", "/api/v1/daily_production"),
+    ("routes.daily_production_plan", "bp", "/api/v1/daily_production_plan"),
+    ("routes.daily_sales", "bp", "/api/v1/daily_sales"),
+    ("routes.daily_throwaway", "bp", "/api/v1/daily_throwaway"),
+    ("routes.daily_waste", "bp", "/api/v1/daily_waste"),
+    ("routes.forecast_final", "bp", "/api/v1/forecast_final"),
+    ("routes.forecast_history", "bp", "/api/v1/forecast_history"),
+    ("routes.forecast_raw", "bp", None),  # Already has /api/v1/forecast prefix
+    ("routes.forecast_raw", "bp_alt", None),  # Alternate route with /api/v1/forecast_raw
+    ("routes.manager_context", "bp", "/api/v1/manager_context"),
+    ("routes.users", "bp", "/api/v1/users"),
+    ("routes.dashboard_data", "bp", "/api/v1/dashboard"),
+    ("routes.profile_settings", "forecast_settings_bp", "/api/v1/forecast/settings"),
+    ("routes.metrics", "metrics_bp", None),  # /metrics for Prometheus
+    ("routes.profiles", "profiles_bp", "/api/v1/debug"),
+]
+
+
+@limiter.request_filter
+def skip_rate_limit_for_options():
+    return request.method == "OPTIONS"
+
+
+def _init_database():
+    # Connection pool is created on a background thread so the worker can
+    # serve /health (reporting "warming") while the database connects
+    from models.db import start_pool_warmup
+    try:
+        start_pool_warmup()
+        print("✓ Database connection pool warming up in background", flush=True)
+    except Exception as e:
+        error_msg = f"CRITICAL: Could not start connection pool warm-up: {e}"
+        print(error_msg, flush=True)
+        print(error_msg, file=sys.stderr, flush=True)
+        # Continue anyway so we can see the error in logs
+
+
+def _register_blueprints(app):
+    """Import and register BLUEPRINTS; returns [(seconds, module)] import times."""
+    timings = {}
+    for module_name, attr, url_prefix in BLUEPRINTS:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        timings[module_name] = timings.get(module_name, 0.0) + time.perf_counter() - started
+
+        blueprint = getattr(module, attr)
+        if url_prefix is None:
+            app.register_blueprint(blueprint)
+        else:
+            app.register_blueprint(blueprint, url_prefix=url_prefix)
+    return sorted(((seconds, name) for name, seconds in timings.items()), reverse=True)
+
+
+def _report_boot(timings, started):
+    """One boot line with the slowest imports (all of them with BOOT_TIMING=1).
+
+    Times are inclusive: the first module to import a shared dependency is charged for it.
+    """
+    total_ms = (time.perf_counter() - started) * 1000
+    shown = timings if BOOT_TIMING else timings[:BOOT_TIMING_TOP]
+    slowest = ", ".join(f"{name} {seconds * 1000:.0f}ms" for seconds, name in shown)
+    print(f"✓ App ready in {total_ms:.0f}ms ({len(timings)} route modules; slowest: {slowest})", flush=True)
+
+
+def create_app():
+    started = time.perf_counter()
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    # Registered first so the request timer also covers the limiter and CORS hooks
+    init_instrumentation(app)
+    init_metrics(app)
+    init_profiler(app)
+    limiter.init_app(app)
+
+    @app.errorhandler(429)
+    def ratelimit_handler(e):
+        return jsonify({"error": "Too many requests. Please try again later."}), 429
+
+    _init_database()
+
+    # 3. CONFIGURE CORS
+    # We set origins to a dummy value to avoid the iteration error,
+    # then override it in the hook below.
+    CORS(app, supports_credentials=True)
+
+    @app.after_request
+    def add_cors_headers(response):
+        origin = request.headers.get('Origin')
+        if is_allowed_origin(origin):
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization'
+            response.headers['Access-Control-Allow-Methods'] = 'GET,POST,OPTIONS,PUT,DELETE'
+            # Lets the frontend read Server-Timing from the Performance API
+            response.headers['Timing-Allow-Origin'] = origin
+        return response
+
+    # Handle OPTIONS preflight requests globally (before any auth or routing)
+    @app.route('/<path:path>', methods=['OPTIONS'])
+    def handle_preflight(path=None):
+        """Handle CORS preflight requests"""
+        origin = request.headers.get('Origin')
+        if is_allowed_origin(origin):
+            return '', 204
+        return '', 403
+
+    # 4. REGISTER BLUEPRINTS
+    timings = _register_blueprints(app)
+
+    @app.get("/")
+    def home():
+        return {"message": "Backend is live"}
+
+    _report_boot(timings, started)
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=port)
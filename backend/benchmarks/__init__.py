@@ -0,0 +1,24 @@
+"""
+Benchmark suite
+Times the hot paths (next-day forecast, generate_forecast, weekly import,
+throwaway export, dashboard summaries, waste approval) against a synthetic
+multi-store dataset in a local Postgres, and writes the timings as JSON so
+runs can be compared across commits. benchmarks.loadtest replays the daily
+traffic mix against the app under gunicorn to find how many stores one
+instance can carry.
+
+    cd backend
+    python -m benchmarks.datagen --stores 20 --products 40 --days 180 --reset
+    python -m benchmarks.run --repeat 20 --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.run --compare benchmarks/results/<baseline>.json
+    python -m benchmarks.loadtest --stores 10,25,50 --phase-seconds 60
+
+Synthetic stores use ids from BENCH_STORE_BASE upwards so they never mix with
+real stores; `datagen --clear` removes everything the generator wrote.
+DATABASE_URL must point at a local database that already has the schema.
+"""
+
+BENCH_STORE_BASE = 900000
+BENCH_STORE_LIMIT = BENCH_STORE_BASE + 99999
+BENCH_USER_EMAIL = "benchmark@bench.invalid"
+BENCH_STORE_PIN = "4321"
@@ -0,0 +1,190 @@
+"""
+Benchmark cases. Each case is called once per timed iteration with the shared
+BenchContext and returns the Flask response (or None for direct service calls);
+a 4xx/5xx response fails the case.
+"""
+import io
+import re
+from datetime import timedelta
+
+from benchmarks import BENCH_STORE_BASE, BENCH_STORE_LIMIT, BENCH_USER_EMAIL
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class BenchContext:
+    """App client, auth header and dataset facts shared by all cases."""
+
+    def __init__(self, app):
+        from models.db import get_connection, return_connection
+        from utils.jwt_handler import create_access_token
+
+        self.app = app
+        self.client = app.test_client()
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT MIN(store_id) AS store_id, COUNT(DISTINCT store_id) AS stores,
+                       COUNT(DISTINCT product_id) AS products,
+                       MIN(date) AS first_date, MAX(date) AS last_date, COUNT(*) AS rows
+                FROM daily_throwaway WHERE store_id BETWEEN %s AND %s
+            """, (BENCH_STORE_BASE, BENCH_STORE_LIMIT))
+            dataset = cur.fetchone()
+            if not dataset or not dataset["rows"]:
+                raise RuntimeError("No benchmark data; run `python -m benchmarks.datagen` first")
+            cur.execute("SELECT id FROM users WHERE email = %s", (BENCH_USER_EMAIL,))
+            user = cur.fetchone()
+            cur.execute("""
+                SELECT id FROM pending_waste_submissions
+                WHERE store_id BETWEEN %s AND %s AND status = 'pending'
+                ORDER BY id
+            """, (BENCH_STORE_BASE, BENCH_STORE_LIMIT))
+            self.pending_submission_ids = [row["id"] for row in cur.fetchall()]
+            cur.close()
+        finally:
+            return_connection(conn)
+
+        self.store_id = dataset["store_id"]
+        self.last_date = dataset["last_date"]
+        self.dataset = {
+            "stores": dataset["stores"],
+            "products": dataset["products"],
+            "days": (dataset["last_date"] - dataset["first_date"]).days + 1,
+            "daily_throwaway_rows": dataset["rows"],
+            "pending_submissions": len(self.pending_submission_ids),
+        }
+        token = create_access_token({"sub": user["id"], "email": BENCH_USER_EMAIL, "store_id": self.store_id})
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.week_start = self._last_full_week_start()
+        self.import_sheet = None
+
+    def _last_full_week_start(self):
+        # Sunday that starts the last week fully inside the dataset
+        latest_start = self.last_date - timedelta(days=6)
+        return latest_start - timedelta(days=(latest_start.weekday() + 1) % 7)
+
+    def get(self, path, **params):
+        return self.client.get(path, query_string=params, headers=self.headers)
+
+
+def sql_stats(response):
+    """(queries, db_ms) from the Server-Timing header, when present."""
+    if response is None:
+        return None, None
+    match = _SERVER_TIMING_DB.search(response.headers.get("Server-Timing", ""))
+    if not match:
+        return None, None
+    return int(match.group(2)), float(match.group(1))
+
+
+def next_day_forecast(ctx):
+    return ctx.get("/api/v1/forecast/next-day", store_id=ctx.store_id,
+                   target_date=(ctx.last_date + timedelta(days=1)).isoformat())
+
+
+def generate_forecast(ctx):
+    from models.db import get_connection, return_connection
+    from services.forecast_engine import generate_forecast as generate
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        generate(cur, ctx.store_id, ctx.last_date + timedelta(days=1), "normal")
+        cur.close()
+        conn.rollback()
+    finally:
+        return_connection(conn)
+
+
+def _weekly_sheet(ctx):
+    """AM/PM weekly sheet in the layout upload_throwaways expects, built from existing rows."""
+    from openpyxl import Workbook
+    from models.db import get_connection, return_connection
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT p.product_name, dt.date, dt.produced, dt.waste
+            FROM daily_throwaway dt
+            JOIN products p ON p.product_id = dt.product_id
+            WHERE dt.store_id = %s AND dt.date BETWEEN %s AND %s
+            ORDER BY p.product_name, dt.date
+        """, (ctx.store_id, ctx.week_start, ctx.week_start + timedelta(days=6)))
+        rows = cur.fetchall()
+        cur.close()
+    finally:
+        return_connection(conn)
+
+    by_product = {}
+    for row in rows:
+        values = by_product.setdefault(row["product_name"], [0] * 14)
+        day_index = (row["date"] - ctx.week_start).days
+        values[day_index * 2] = row["produced"]
+        values[day_index * 2 + 1] = row["waste"]
+
+    wb = Workbook()
+    ws = wb.active
+    ws.cell(row=2, column=1, value="DATE:")
+    ws.cell(row=2, column=2, value=ctx.week_start)
+    for offset, (name, values) in enumerate(sorted(by_product.items())):
+        ws.cell(row=5 + offset, column=1, value=name)
+        for col, value in enumerate(values, start=2):
+            ws.cell(row=5 + offset, column=col, value=value)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def weekly_import(ctx):
+    if ctx.import_sheet is None:
+        ctx.import_sheet = _weekly_sheet(ctx)
+    return ctx.client.post(
+        "/api/v1/throwaway/upload_throwaways",
+        data={"store_id": str(ctx.store_id), "file": (io.BytesIO(ctx.import_sheet), "bench.xlsx")},
+        headers=ctx.headers,
+        content_type="multipart/form-data",
+    )
+
+
+def export_throwaway(ctx):
+    response = ctx.get("/api/v1/throwaway/export", store_id=ctx.store_id, week_start=ctx.week_start.isoformat())
+    response.get_data()  # drain the streamed workbook
+    return response
+
+
+def dashboard_production_summary(ctx):
+    response = ctx.get("/api/v1/dashboard/production-summary", store_id=ctx.store_id, days=28)
+    response.get_data()
+    return response
+
+
+def dashboard_waste_summary(ctx):
+    response = ctx.get("/api/v1/dashboard/waste-summary", store_id=ctx.store_id, days=28)
+    response.get_data()
+    return response
+
+
+def dashboard_quick_stats(ctx):
+    return ctx.get("/api/v1/dashboard/quick-stats", store_id=ctx.store_id)
+
+
+def waste_approval(ctx):
+    if not ctx.pending_submission_ids:
+        raise RuntimeError("Out of pending submissions; regenerate with `datagen --reset`")
+    submission_id = ctx.pending_submission_ids.pop(0)
+    return ctx.client.post("/api/v1/pending-waste/approve", json={"submission_id": submission_id},
+                           headers=ctx.headers)
+
+
+CASES = {
+    "next_day_forecast": next_day_forecast,
+    "generate_forecast": generate_forecast,
+    "weekly_import": weekly_import,
+    "export_throwaway": export_throwaway,
+    "dashboard_production_summary": dashboard_production_summary,
+    "dashboard_waste_summary": dashboard_waste_summary,
+    "dashboard_quick_stats": dashboard_quick_stats,
+    "waste_approval": waste_approval,
+}
@@ -0,0 +1,210 @@
+"""Generate a reproducible synthetic dataset: N stores x M products x D days.
+
+Usage:
+  python -m benchmarks.datagen [--stores 10] [--products 30] [--days 120] [--seed 42] [--reset]
+  python -m benchmarks.datagen --clear
+
+Writes stores, daily_throwaway, approved forecast_history (with actuals),
+pending waste submissions + items for the last --pending-days days, and a
+benchmark manager user. The same arguments and seed always produce the same rows.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(BACKEND_DIR, ".env"))
+
+from psycopg2.extras import execute_values
+
+from benchmarks import BENCH_STORE_BASE, BENCH_STORE_LIMIT, BENCH_STORE_PIN, BENCH_USER_EMAIL
+from models.db import get_connection, return_connection
+
+# Relative demand by ISO weekday (Mon=1 .. Sun=7): busy weekend mornings
+WEEKDAY_FACTORS = {1: 0.9, 2: 0.85, 3: 0.9, 4: 0.95, 5: 1.1, 6: 1.3, 7: 1.2}
+PAGE_SIZE = 5000
+
+# (table, store column) in delete order
+BENCH_TABLES = [
+    ("pending_waste_items", None),
+    ("pending_waste_submissions", "store_id"),
+    ("forecast_accuracy_summary", "store_id"),
+    ("forecast_accuracy", "store_id"),
+    ("forecast_learning", "store_id"),
+    ("forecast_ets_state", "store_id"),
+    ("forecast_history", "store_id"),
+    ("daily_production_plan", "store_id"),
+    ("daily_throwaway", "store_id"),
+]
+
+
+def bench_store_ids(n):
+    return [BENCH_STORE_BASE + i for i in range(1, n + 1)]
+
+
+def clear(cur):
+    """Delete every row the generator wrote (bench store ids only)."""
+    bounds = (BENCH_STORE_BASE, BENCH_STORE_LIMIT)
+    for table, column in BENCH_TABLES:
+        if column is None:
+            cur.execute("""
+                DELETE FROM pending_waste_items
+                WHERE submission_id IN (
+                    SELECT id FROM pending_waste_submissions WHERE store_id BETWEEN %s AND %s
+                )
+            """, bounds)
+        else:
+            cur.execute(f"DELETE FROM {table} WHERE {column} BETWEEN %s AND %s", bounds)
+    cur.execute("UPDATE users SET store_id = NULL WHERE email = %s", (BENCH_USER_EMAIL,))
+    cur.execute("DELETE FROM stores WHERE id BETWEEN %s AND %s", bounds)
+
+
+def ensure_products(cur, count):
+    """First `count` active products, adding synthetic ones if the table has fewer."""
+    cur.execute("""
+        SELECT product_id, product_name, product_type
+        FROM products WHERE is_active = TRUE
+        ORDER BY product_id LIMIT %s
+    """, (count,))
+    products = cur.fetchall()
+    for n in range(len(products) + 1, count + 1):
+        cur.execute("""
+            INSERT INTO products (product_name, product_type, is_active)
+            VALUES (%s, 'donut', TRUE)
+            ON CONFLICT (product_name) DO UPDATE SET is_active = TRUE
+            RETURNING product_id, product_name, product_type
+        """, (f"Bench Product {n}",))
+        products.append(cur.fetchone())
+    return products
+
+
+def ensure_bench_user(cur, store_id):
+    cur.execute("""
+        INSERT INTO users (name, email, password_hash, store_id, role)
+        VALUES ('Benchmark Manager', %s, '!', %s, 'manager')
+        ON CONFLICT (email) DO UPDATE SET store_id = EXCLUDED.store_id, role = 'manager'
+        RETURNING id
+    """, (BENCH_USER_EMAIL, store_id))
+    return cur.fetchone()["id"]
+
+
+def generate(cur, stores=10, products=30, days=120, seed=42, pending_days=7, submissions_per_day=3, end_date=None):
+    """Insert the dataset; returns row counts per table."""
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    dates = [end_date - timedelta(days=d) for d in range(days, 0, -1)]
+    store_ids = bench_store_ids(stores)
+    product_rows = ensure_products(cur, products)
+
+    execute_values(cur, """
+        INSERT INTO stores (id, name, city, state, is_active, store_pin)
+        VALUES %s
+        ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, is_active = TRUE, store_pin = EXCLUDED.store_pin
+    """, [(sid, f"Bench Store {sid - BENCH_STORE_BASE}", "Benchville", "MA", True, BENCH_STORE_PIN)
+          for sid in store_ids])
+    user_id = ensure_bench_user(cur, store_ids[0])
+
+    throwaway, history = [], []
+    for store_id in store_ids:
+        store_scale = rng.uniform(0.6, 1.6)
+        for product in product_rows:
+            base = rng.uniform(6, 60) * store_scale
+            for day in dates:
+                sold = max(0, int(round(base * WEEKDAY_FACTORS[day.isoweekday()] * rng.gauss(1.0, 0.15))))
+                produced = int(round(sold * rng.uniform(1.02, 1.25))) + 1
+                throwaway.append((store_id, product["product_id"], day, produced, produced - sold))
+
+                predicted = max(1, int(round(sold * rng.gauss(1.0, 0.12))))
+                error = sold - predicted
+                history.append((store_id, product["product_id"], day - timedelta(days=1), day,
+                                predicted, predicted, "approved", sold, error, error / predicted))
+
+    execute_values(cur, """
+        INSERT INTO daily_throwaway (store_id, product_id, date, produced, waste)
+        VALUES %s
+        ON CONFLICT (store_id, product_id, date)
+        DO UPDATE SET produced = EXCLUDED.produced, waste = EXCLUDED.waste
+    """, throwaway, page_size=PAGE_SIZE)
+    execute_values(cur, """
+        INSERT INTO forecast_history
+        (store_id, product_id, forecast_date, target_date, predicted_quantity, final_quantity,
+         status, actual_sold, forecast_error, error_pct, model_version)
+        VALUES %s
+        ON CONFLICT (store_id, product_id, target_date) DO NOTHING
+    """, history, template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'bench')", page_size=PAGE_SIZE)
+
+    submissions = []
+    for store_id in store_ids:
+        for day in dates[-pending_days:]:
+            for n in range(submissions_per_day):
+                submissions.append((store_id, f"Bench Employee {n + 1}", day, "pending"))
+    submission_ids = execute_values(cur, """
+        INSERT INTO pending_waste_submissions (store_id, submitter_name, submission_date, status)
+        VALUES %s RETURNING id
+    """, submissions, page_size=PAGE_SIZE, fetch=True)
+
+    items = []
+    for row in submission_ids:
+        for product in rng.sample(product_rows, min(5, len(product_rows))):
+            items.append((row["id"], product["product_id"], product["product_name"],
+                          rng.randint(1, 12), product.get("product_type") or "other"))
+    execute_values(cur, """
+        INSERT INTO pending_waste_items (submission_id, product_id, product_name, waste_quantity, product_type)
+        VALUES %s
+    """, items, page_size=PAGE_SIZE)
+
+    return {
+        "stores": len(store_ids),
+        "products": len(product_rows),
+        "days": days,
+        "daily_throwaway": len(throwaway),
+        "forecast_history": len(history),
+        "pending_waste_submissions": len(submission_ids),
+        "pending_waste_items": len(items),
+        "user_id": user_id,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--products", type=int, default=30)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pending-days", type=int, default=7)
+    parser.add_argument("--submissions-per-day", type=int, default=3)
+    parser.add_argument("--reset", action="store_true", help="clear existing benchmark rows first")
+    parser.add_argument("--clear", action="store_true", help="only clear benchmark rows")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        if args.clear or args.reset:
+            clear(cur)
+        counts = {}
+        if not args.clear:
+            counts = generate(cur, args.stores, args.products, args.days, args.seed,
+                              args.pending_days, args.submissions_per_day)
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+
+    summary = ", ".join(f"{k}={v}" for k, v in counts.items()) or "cleared"
+    print(f"Benchmark dataset: {summary} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
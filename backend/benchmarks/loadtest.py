@@ -0,0 +1,524 @@
+"""Replay the daily traffic mix against the app under gunicorn and report latency per endpoint.
+
+Usage:
+  python -m benchmarks.loadtest [--stores 10,25,50] [--phase-seconds 60] [--speedup 1]
+                                [--workers 2] [--threads 4] [--url http://127.0.0.1:8000]
+                                [--slo-p95-ms 500] [--max-error-rate 0.01] [--output results.json]
+
+Needs the synthetic dataset with at least max(--stores) stores
+(python -m benchmarks.datagen --stores 50). Unless --url is given, the app is
+started under gunicorn (gthread, like the Procfile) with rate limiting off and
+a private METRICS_DIR, and stopped afterwards.
+
+For each store count the phases of a trading day run back to back:
+
+  morning_burst      QR-code waste submissions (page load, PIN check, submit)
+  dashboard_polling  managers refreshing the dashboard and pending-waste badge
+  evening_forecast   next-day forecast generation, with light polling
+  friday_import      weekly throwaway sheet uploads, with light polling
+
+Requests arrive open-loop (Poisson, RATES are per store per minute, times
+--speedup) and latency is measured from the scheduled send time, so a backed-up
+server shows up as latency rather than as a slower client. /metrics is sampled
+every second for pool utilisation and connection wait. The largest store count
+whose interactive endpoints meet --slo-p95-ms, with every endpoint under
+--max-error-rate, is reported as the per-instance capacity.
+
+Submissions and imports write to the bench stores; `datagen --reset` restores them.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import re
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(BACKEND_DIR, ".env"))
+
+import requests
+
+from benchmarks import BENCH_STORE_BASE, BENCH_STORE_LIMIT, BENCH_STORE_PIN, BENCH_USER_EMAIL
+from benchmarks.run import _git, _percentile
+
+# endpoint -> (method, path template, interactive); interactive endpoints count towards the latency SLO
+ENDPOINTS = {
+    "waste_products": ("GET", "/api/v1/anonymous-waste/products", True),
+    "waste_check_pin": ("GET", "/api/v1/anonymous-waste/check-pin/{store_id}", True),
+    "waste_submit": ("POST", "/api/v1/anonymous-waste/submit", True),
+    "dashboard_production_summary": ("GET", "/api/v1/dashboard/production-summary", True),
+    "dashboard_waste_summary": ("GET", "/api/v1/dashboard/waste-summary", True),
+    "dashboard_quick_stats": ("GET", "/api/v1/dashboard/quick-stats", True),
+    "pending_waste_counts": ("GET", "/api/v1/pending-waste/counts", True),
+    "next_day_forecast": ("GET", "/api/v1/forecast/next-day", False),
+    "weekly_import": ("POST", "/api/v1/throwaway/upload_throwaways", False),
+}
+
+# phase -> endpoint -> requests per store per minute
+RATES = {
+    "morning_burst": {
+        "waste_products": 3.0,
+        "waste_check_pin": 3.0,
+        "waste_submit": 3.0,
+        "dashboard_quick_stats": 0.5,
+    },
+    "dashboard_polling": {
+        "dashboard_production_summary": 1.0,
+        "dashboard_waste_summary": 1.0,
+        "dashboard_quick_stats": 2.0,
+        "pending_waste_counts": 2.0,
+    },
+    "evening_forecast": {
+        "next_day_forecast": 1.0,
+        "dashboard_quick_stats": 0.5,
+        "pending_waste_counts": 0.5,
+    },
+    "friday_import": {
+        "weekly_import": 0.5,
+        "dashboard_production_summary": 0.5,
+        "dashboard_quick_stats": 1.0,
+    },
+}
+
+METRICS_INTERVAL = 1.0
+_PROM_LINE = re.compile(r'^(\w+)(?:\{([^}]*)\})?\s+(\S+)$')
+
+
+class Target:
+    """The server under test, plus what the traffic needs to talk to it."""
+
+    def __init__(self, url, metrics_token, user_id, products, timeout):
+        self.url = url.rstrip("/")
+        self.metrics_token = metrics_token
+        self.user_id = user_id
+        self.products = products
+        self.timeout = timeout
+        self.week_start = _last_full_week_start(date.today())
+        self.import_sheet = _weekly_sheet(products, self.week_start)
+        self._tokens = {}
+        self._local = threading.local()
+
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def auth(self, store_id):
+        if store_id not in self._tokens:
+            from utils.jwt_handler import create_access_token
+            token = create_access_token({"sub": self.user_id, "email": BENCH_USER_EMAIL, "store_id": store_id})
+            self._tokens[store_id] = {"Authorization": f"Bearer {token}"}
+        return self._tokens[store_id]
+
+    def send(self, endpoint, store_id, rng):
+        method, template, _ = ENDPOINTS[endpoint]
+        kwargs = {"timeout": self.timeout}
+        if endpoint == "waste_submit":
+            items = rng.sample(self.products, min(len(self.products), rng.randint(3, 6)))
+            kwargs["json"] = {
+                "store_id": store_id,
+                "store_pin": BENCH_STORE_PIN,
+                "submitter_name": f"Load Test {rng.randint(1, 20)}",
+                "product_items": [{
+                    "product_id": p["product_id"],
+                    "product_name": p["product_name"],
+                    "product_type": p.get("product_type") or "other",
+                    "waste_quantity": rng.randint(1, 12),
+                } for p in items],
+            }
+        elif endpoint == "weekly_import":
+            kwargs["headers"] = self.auth(store_id)
+            kwargs["data"] = {"store_id": str(store_id)}
+            kwargs["files"] = {"file": ("loadtest.xlsx", io.BytesIO(self.import_sheet))}
+        elif endpoint == "next_day_forecast":
+            kwargs["headers"] = self.auth(store_id)
+            kwargs["params"] = {"store_id": store_id, "target_date": (date.today() + timedelta(days=1)).isoformat()}
+        elif not endpoint.startswith("waste_"):
+            kwargs["headers"] = self.auth(store_id)
+            kwargs["params"] = {"store_id": store_id}
+            if endpoint in ("dashboard_production_summary", "dashboard_waste_summary"):
+                kwargs["params"]["days"] = 28
+        response = self.session().request(method, self.url + template.format(store_id=store_id), **kwargs)
+        response.content  # read the whole body (exports and summaries can be large)
+        return response.status_code
+
+    def metrics(self):
+        """{name: summed value} for the pool series of /metrics."""
+        response = self.session().get(f"{self.url}/metrics", timeout=self.timeout,
+                                      headers={"Authorization": f"Bearer {self.metrics_token}"})
+        response.raise_for_status()
+        values = {}
+        for line in response.text.splitlines():
+            match = _PROM_LINE.match(line)
+            if not match:
+                continue
+            name, labels, value = match.groups()
+            if name == "dunkin_db_pool_connections":
+                name = f"{name}:{'in_use' if 'in_use' in (labels or '') else 'idle'}"
+            elif name not in ("dunkin_db_pool_max_connections", "dunkin_http_request_pool_wait_seconds_total"):
+                continue
+            values[name] = values.get(name, 0.0) + float(value)
+        return values
+
+
+def _last_full_week_start(today):
+    # Sunday that starts the most recent week ending before today
+    latest_start = today - timedelta(days=7)
+    return latest_start - timedelta(days=(latest_start.weekday() + 1) % 7)
+
+
+def _weekly_sheet(products, week_start):
+    """AM/PM weekly sheet in the layout upload_throwaways expects, with made-up counts."""
+    from openpyxl import Workbook
+
+    rng = random.Random(week_start.toordinal())
+    wb = Workbook()
+    ws = wb.active
+    ws.cell(row=2, column=1, value="DATE:")
+    ws.cell(row=2, column=2, value=week_start)
+    for offset, product in enumerate(products):
+        ws.cell(row=5 + offset, column=1, value=product["product_name"])
+        for col in range(2, 16):
+            ws.cell(row=5 + offset, column=col, value=rng.randint(0, 12))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, threads, boot_timeout):
+    """Start the app under gunicorn; returns (process, url, metrics_token)."""
+    port = _free_port()
+    metrics_token = secrets.token_hex(16)
+    env = dict(os.environ,
+               RATE_LIMIT_ENABLED="false",
+               REQUEST_SLOW_MS="0",
+               METRICS_TOKEN=metrics_token,
+               METRICS_DIR=tempfile.mkdtemp(prefix="dunkin_loadtest_metrics_"),
+               METRICS_FLUSH_SECONDS="1")
+    process = subprocess.Popen([
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--chdir", BACKEND_DIR,
+        "--bind", f"127.0.0.1:{port}",
+        "--worker-class", "gthread",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--timeout", "120",
+        "--log-level", "warning",
+    ], env=env)
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + boot_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            health = requests.get(f"{url}/api/v1/health", timeout=2).json()
+            if health.get("database", {}).get("status") == "connected":
+                return process, url, metrics_token
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"App not ready after {boot_timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def bench_setup():
+    """(bench user id, number of bench stores) from the database."""
+    from models.db import get_connection, return_connection
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM users WHERE email = %s", (BENCH_USER_EMAIL,))
+        user = cur.fetchone()
+        cur.execute("SELECT COUNT(*) AS stores FROM stores WHERE id BETWEEN %s AND %s",
+                    (BENCH_STORE_BASE, BENCH_STORE_LIMIT))
+        stores = cur.fetchone()["stores"]
+        cur.close()
+    finally:
+        return_connection(conn)
+    if not user or not stores:
+        raise RuntimeError("No benchmark data; run `python -m benchmarks.datagen` first")
+    return user["id"], stores
+
+
+def schedule(phase, stores, seconds, speedup, rng):
+    """Sorted (offset_s, endpoint, store_id) arrivals for one phase."""
+    store_ids = [BENCH_STORE_BASE + i for i in range(1, stores + 1)]
+    arrivals = []
+    for endpoint, per_store_per_minute in RATES[phase].items():
+        rate = per_store_per_minute * stores * speedup / 60
+        offset = rng.expovariate(rate)
+        while offset < seconds:
+            arrivals.append((offset, endpoint, rng.choice(store_ids)))
+            offset += rng.expovariate(rate)
+    return sorted(arrivals)
+
+
+class MetricsSampler(threading.Thread):
+    """Polls /metrics every METRICS_INTERVAL seconds while a phase runs."""
+
+    def __init__(self, target):
+        super().__init__(name="loadtest-metrics", daemon=True)
+        self.target = target
+        self.samples = []
+        self.errors = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                self.samples.append(self.target.metrics())
+            except (requests.RequestException, ValueError):
+                self.errors += 1
+            if self._stop_event.wait(METRICS_INTERVAL):
+                break
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        try:
+            self.samples.append(self.target.metrics())
+        except (requests.RequestException, ValueError):
+            self.errors += 1
+
+    def summary(self):
+        capacity = [s for s in self.samples if s.get("dunkin_db_pool_max_connections")]
+        if not capacity:
+            return {"samples": 0, "errors": self.errors}
+        utilisation = [s.get("dunkin_db_pool_connections:in_use", 0) / s["dunkin_db_pool_max_connections"]
+                       for s in capacity]
+        waits = [s.get("dunkin_http_request_pool_wait_seconds_total", 0.0) for s in self.samples]
+        return {
+            "samples": len(capacity),
+            "errors": self.errors,
+            "max_connections": capacity[-1]["dunkin_db_pool_max_connections"],
+            "in_use_peak": max(s.get("dunkin_db_pool_connections:in_use", 0) for s in capacity),
+            "utilisation_mean": round(statistics.fmean(utilisation), 3),
+            "utilisation_peak": round(max(utilisation), 3),
+            "saturated_fraction": round(sum(1 for u in utilisation if u >= 1) / len(utilisation), 3),
+            "pool_wait_s": round(max(0.0, waits[-1] - waits[0]), 3),
+        }
+
+
+def _stats(latencies, errors, seconds):
+    ordered = sorted(latencies)
+    count = len(ordered)
+    if not count:
+        return {"count": 0}
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4),
+        "rps": round(count / seconds, 2),
+        "p50_ms": round(_percentile(ordered, 50), 2),
+        "p95_ms": round(_percentile(ordered, 95), 2),
+        "p99_ms": round(_percentile(ordered, 99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def run_phase(target, phase, stores, seconds, speedup, concurrency, seed):
+    rng = random.Random(f"{seed}:{phase}:{stores}")
+    arrivals = schedule(phase, stores, seconds, speedup, rng)
+    results = {endpoint: ([], []) for endpoint in RATES[phase]}  # endpoint -> (latencies, statuses)
+    lock = threading.Lock()
+
+    def fire(endpoint, store_id, scheduled, request_seed):
+        try:
+            status = target.send(endpoint, store_id, random.Random(request_seed))
+        except requests.RequestException:
+            status = 0
+        latency = (time.perf_counter() - scheduled) * 1000
+        with lock:
+            results[endpoint][0].append(latency)
+            results[endpoint][1].append(status)
+
+    sampler = MetricsSampler(target)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest") as pool:
+        for offset, endpoint, store_id in arrivals:
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, endpoint, store_id, scheduled, rng.random())
+    elapsed = max(seconds, time.perf_counter() - started)
+    sampler.stop()
+
+    endpoints = {}
+    all_latencies, all_errors = [], 0
+    for endpoint, (latencies, statuses) in results.items():
+        errors = sum(1 for status in statuses if status == 0 or status >= 400)
+        endpoints[endpoint] = _stats(latencies, errors, elapsed)
+        all_latencies += latencies
+        all_errors += errors
+    return {
+        "duration_s": round(elapsed, 2),
+        "total": _stats(all_latencies, all_errors, elapsed),
+        "endpoints": endpoints,
+        "pool": sampler.summary(),
+    }
+
+
+def meets_slo(run, slo_p95_ms, max_error_rate):
+    for phase in run["phases"].values():
+        for endpoint, stats in phase["endpoints"].items():
+            if not stats["count"]:
+                continue
+            if stats["error_rate"] > max_error_rate:
+                return False
+            if ENDPOINTS[endpoint][2] and stats["p95_ms"] > slo_p95_ms:
+                return False
+    return True
+
+
+def print_run(run):
+    print(f"\n{run['stores']} stores ({'meets' if run['meets_slo'] else 'misses'} SLO)", file=sys.stderr)
+    print(f"{'phase / endpoint':<40} {'count':>6} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>7}",
+          file=sys.stderr)
+    for phase_name, phase in run["phases"].items():
+        pool = phase["pool"]
+        pool_note = (f"pool {pool['utilisation_mean']:.0%} mean / {pool['utilisation_peak']:.0%} peak, "
+                     f"waited {pool['pool_wait_s']}s" if pool.get("samples") else "pool n/a")
+        print(f"{phase_name}  [{pool_note}]", file=sys.stderr)
+        for endpoint, s in phase["endpoints"].items():
+            if not s["count"]:
+                continue
+            print(f"  {endpoint:<38} {s['count']:>6} {s['error_rate'] * 100:>5.1f}% {s['p50_ms']:>9.1f} "
+                  f"{s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['rps']:>7.2f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stores", default="10", help="comma-separated store counts to sweep, e.g. 10,25,50")
+    parser.add_argument("--phases", help="comma-separated subset of: " + ", ".join(RATES))
+    parser.add_argument("--phase-seconds", type=float, default=60)
+    parser.add_argument("--speedup", type=float, default=1.0, help="multiply every arrival rate")
+    parser.add_argument("--concurrency", type=int, default=64, help="client threads")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--boot-timeout", type=float, default=60)
+    parser.add_argument("--url", help="test an already running server instead of starting gunicorn")
+    parser.add_argument("--metrics-token", default=os.getenv("METRICS_TOKEN", ""),
+                        help="bearer token for /metrics on --url (default: METRICS_TOKEN)")
+    parser.add_argument("--slo-p95-ms", type=float, default=500)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        store_counts = sorted({int(n) for n in args.stores.split(",")})
+    except ValueError:
+        parser.error("--stores must be comma-separated integers")
+    phases = args.phases.split(",") if args.phases else list(RATES)
+    unknown = [name for name in phases if name not in RATES]
+    if unknown:
+        parser.error(f"unknown phases: {', '.join(unknown)}")
+
+    user_id, available = bench_setup()
+    if store_counts[-1] > available:
+        parser.error(f"only {available} bench stores; run `python -m benchmarks.datagen --stores {store_counts[-1]}`")
+
+    process = None
+    if args.url:
+        url, metrics_token = args.url, args.metrics_token
+    else:
+        process, url, metrics_token = start_server(args.workers, args.threads, args.boot_timeout)
+        print(f"gunicorn ready at {url} ({args.workers} workers x {args.threads} threads)", file=sys.stderr)
+
+    started = time.perf_counter()
+    runs = []
+    try:
+        products = requests.get(f"{url}/api/v1/anonymous-waste/products", timeout=args.timeout).json()
+        target = Target(url, metrics_token, user_id, products, args.timeout)
+        for stores in store_counts:
+            run = {"stores": stores, "phases": {}}
+            for phase in phases:
+                print(f"{stores} stores: {phase} for {args.phase_seconds:g}s...", file=sys.stderr)
+                run["phases"][phase] = run_phase(target, phase, stores, args.phase_seconds, args.speedup,
+                                                 args.concurrency, args.seed)
+            run["meets_slo"] = meets_slo(run, args.slo_p95_ms, args.max_error_rate)
+            runs.append(run)
+            print_run(run)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    passing = [run["stores"] for run in runs if run["meets_slo"]]
+    capacity = None
+    for run in runs:
+        if not run["meets_slo"]:
+            break
+        capacity = run["stores"]
+
+    report = {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "url": args.url,
+            "workers": None if args.url else args.workers,
+            "threads": None if args.url else args.threads,
+            "phase_seconds": args.phase_seconds,
+            "speedup": args.speedup,
+            "rates_per_store_per_minute": {phase: RATES[phase] for phase in phases},
+            "slo": {"p95_ms": args.slo_p95_ms, "max_error_rate": args.max_error_rate},
+            "elapsed_s": round(time.perf_counter() - started, 2),
+        },
+        "runs": runs,
+        "capacity": {"max_stores_meeting_slo": capacity, "passing_store_counts": passing},
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2, default=str))
+
+    if capacity is None:
+        print(f"\nNo tested store count met the SLO (p95 <= {args.slo_p95_ms:g}ms, "
+              f"errors <= {args.max_error_rate:.1%})", file=sys.stderr)
+    else:
+        print(f"\nCapacity: {capacity} stores per instance meet the SLO (p95 <= {args.slo_p95_ms:g}ms, "
+              f"errors <= {args.max_error_rate:.1%})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Run the benchmark cases and write JSON timings for comparison across commits.
+
+Usage:
+  python -m benchmarks.run [--repeat 10] [--warmup 1] [--cases next_day_forecast,weekly_import]
+                           [--output results.json] [--compare baseline.json]
+
+Needs the synthetic dataset (python -m benchmarks.datagen). Each case runs
+--warmup untimed iterations, then --repeat timed ones; results record min /
+median / mean / p95 / max / stdev in milliseconds plus the median SQL query
+count and DB time taken from the Server-Timing header.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv
+load_dotenv(dotenv_path=os.path.join(BACKEND_DIR, ".env"))
+
+# Keep the app quiet and unthrottled while benchmarking
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_STORAGE_URI", "memory://")
+os.environ.setdefault("REQUEST_SLOW_MS", "0")
+
+from benchmarks.cases import CASES, BenchContext, sql_stats
+
+
+def _git(*args):
+    try:
+        return subprocess.check_output(["git", *args], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_case(ctx, name, func, repeat, warmup):
+    for _ in range(warmup):
+        func(ctx)
+
+    timings, queries, db_ms = [], [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = func(ctx)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response is not None and response.status_code >= 400:
+            raise RuntimeError(f"{name}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+        timings.append(elapsed)
+        count, db = sql_stats(response)
+        if count is not None:
+            queries.append(count)
+            db_ms.append(db)
+
+    ordered = sorted(timings)
+    return {
+        "repeat": repeat,
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(_percentile(ordered, 95), 3),
+        "max_ms": round(ordered[-1], 3),
+        "stdev_ms": round(statistics.stdev(ordered), 3) if len(ordered) > 1 else 0.0,
+        "queries": statistics.median(queries) if queries else None,
+        "db_ms": round(statistics.median(db_ms), 3) if db_ms else None,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline['meta'].get('commit') or baseline_path}:", file=sys.stderr)
+    print(f"{'case':<30} {'base ms':>10} {'now ms':>10} {'change':>9} {'queries':>12}", file=sys.stderr)
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if not before or "median_ms" not in before or "median_ms" not in result:
+            print(f"{name:<30} {'-':>10} {result.get('median_ms', '-'):>10}", file=sys.stderr)
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+        queries = f"{before.get('queries')} -> {result.get('queries')}"
+        print(f"{name:<30} {before['median_ms']:>10.2f} {result['median_ms']:>10.2f} {change:>+8.1f}% {queries:>12}",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--cases", help="comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    selected = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [name for name in selected if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    from app import app
+
+    ctx = BenchContext(app)
+    started = time.perf_counter()
+    results = {}
+    for name in selected:
+        try:
+            results[name] = run_case(ctx, name, CASES[name], args.repeat, args.warmup)
+            print(f"{name:<30} median {results[name]['median_ms']:>9.2f} ms  "
+                  f"p95 {results[name]['p95_ms']:>9.2f} ms  queries {results[name]['queries']}", file=sys.stderr)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            print(f"{name:<30} FAILED: {e}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "dataset": ctx.dataset,
+            "elapsed_s": round(time.perf_counter() - started, 2),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2, default=str))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""gunicorn settings shared by the Procfile (gunicorn -c backend/gunicorn.conf.py ...)."""
+import os
+import sys
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+load_dotenv(dotenv_path=os.path.join(BACKEND_DIR, ".env"), override=True)
+
+
+def on_starting(server):
+    # Worker snapshots and exited-worker counters from a previous run would be merged
+    # into this one's totals; every restart starts /metrics from zero
+    from utils.metrics import METRICS_DIR, reset_metrics_dir
+
+    reset_metrics_dir()
+    print(f"[METRICS] Cleared {METRICS_DIR}", flush=True)
@@ -0,0 +1,11 @@
+-- Shared rate limit counters for the postgres+limiter:// storage backend
+-- (utils/rate_limit_storage.py). UNLOGGED: counters are disposable and skip WAL.
+-- The storage also creates this table on first connect.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_counters (
+  key TEXT PRIMARY KEY,
+  window_idx BIGINT NOT NULL DEFAULT 0,
+  curr_count BIGINT NOT NULL DEFAULT 0,
+  prev_count BIGINT NOT NULL DEFAULT 0,
+  expires_at DOUBLE PRECISION NOT NULL  -- epoch seconds
+);
@@ -0,0 +1,24 @@
+-- Incremental forecast learning (services/forecast_learning.py)
+-- forecast_learning keeps an exponentially weighted mean error per store/product;
+-- forecast_history.learned_at marks observations already folded into it.
+
+ALTER TABLE forecast_history ADD COLUMN IF NOT EXISTS learned_at TIMESTAMP;
+
+ALTER TABLE forecast_learning ADD COLUMN IF NOT EXISTS ewma_error_pct NUMERIC;       -- unclamped state
+ALTER TABLE forecast_learning ADD COLUMN IF NOT EXISTS last_target_date DATE;
+
+-- Existing averages seed the running state; observations they already cover are consumed
+UPDATE forecast_learning SET ewma_error_pct = avg_error_pct WHERE ewma_error_pct IS NULL;
+
+UPDATE forecast_history
+SET learned_at = now()
+WHERE status = 'approved'
+  AND actual_sold IS NOT NULL
+  AND forecast_error IS NOT NULL
+  AND error_pct IS NOT NULL
+  AND learned_at IS NULL;
+
+-- Only unconsumed observations are indexed, so each refresh scans just the new rows
+CREATE INDEX IF NOT EXISTS idx_forecast_history_unlearned
+  ON forecast_history (store_id)
+  WHERE learned_at IS NULL AND actual_sold IS NOT NULL AND status = 'approved';
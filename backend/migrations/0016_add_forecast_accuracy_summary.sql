@@ -0,0 +1,54 @@
+-- Pre-aggregated accuracy metrics (services/accuracy_summary.py)
+-- Additive error sums per store/product over trailing windows, rebuilt per store
+-- whenever forecast_accuracy is recomputed.
+
+CREATE TABLE IF NOT EXISTS forecast_accuracy_summary (
+  store_id INTEGER NOT NULL,
+  product_id INTEGER NOT NULL,
+  window_days INTEGER NOT NULL,
+  window_end DATE NOT NULL,
+  samples INTEGER NOT NULL,
+  pct_samples INTEGER NOT NULL,           -- rows with planned_quantity > 0
+  sum_abs_error NUMERIC NOT NULL,
+  sum_error NUMERIC NOT NULL,
+  sum_abs_pct NUMERIC NOT NULL,
+  sum_pct NUMERIC NOT NULL,
+  sum_actual_sold NUMERIC NOT NULL,
+  last_target_date DATE,
+  PRIMARY KEY (store_id, product_id, window_days)
+);
+
+CREATE INDEX IF NOT EXISTS idx_forecast_accuracy_summary_window
+  ON forecast_accuracy_summary (window_days, store_id);
+
+-- Store-scoped range scans for recompute and summary refresh
+CREATE INDEX IF NOT EXISTS idx_forecast_accuracy_store_date
+  ON forecast_accuracy (store_id, target_date);
+
+-- Seed from existing forecast_accuracy rows so GET /forecast/accuracy has data right
+-- after deploy (same sums as refresh_accuracy_summary). If forecast_accuracy is not
+-- current, run scripts/compute_accuracy.py for the last 90 days first, which also
+-- refreshes this table.
+INSERT INTO forecast_accuracy_summary
+(store_id, product_id, window_days, window_end, samples, pct_samples,
+ sum_abs_error, sum_error, sum_abs_pct, sum_pct, sum_actual_sold, last_target_date)
+SELECT
+  fa.store_id,
+  fa.product_id,
+  w.window_days,
+  CURRENT_DATE,
+  COUNT(*),
+  COUNT(*) FILTER (WHERE fa.planned_quantity > 0),
+  SUM(ABS(fa.error_quantity)),
+  SUM(fa.error_quantity),
+  COALESCE(SUM(ABS(fa.error_percent)) FILTER (WHERE fa.planned_quantity > 0), 0),
+  COALESCE(SUM(fa.error_percent) FILTER (WHERE fa.planned_quantity > 0), 0),
+  SUM(fa.actual_sold),
+  MAX(fa.target_date)
+FROM forecast_accuracy fa
+JOIN (VALUES (7), (28), (90)) AS w(window_days)
+  ON fa.target_date > CURRENT_DATE - w.window_days
+WHERE fa.target_date > CURRENT_DATE - 90
+  AND fa.target_date <= CURRENT_DATE
+GROUP BY fa.store_id, fa.product_id, w.window_days
+ON CONFLICT (store_id, product_id, window_days) DO NOTHING;
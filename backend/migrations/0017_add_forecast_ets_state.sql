@@ -0,0 +1,21 @@
+-- Exponential-smoothing forecast state (services/forecast_ets.py, model_version 'ets-v2')
+-- One damped-trend level/trend row per store, ISO weekday and product, folded forward
+-- as daily_throwaway rows land. prev_* is the state before the latest observation so
+-- that observation can be revised (waste approvals) without replaying history.
+
+CREATE TABLE IF NOT EXISTS forecast_ets_state (
+  store_id INTEGER NOT NULL,
+  isodow SMALLINT NOT NULL,                -- 1 = Monday .. 7 = Sunday
+  product_id INTEGER NOT NULL,
+  level DOUBLE PRECISION NOT NULL,
+  trend DOUBLE PRECISION NOT NULL,
+  observations INTEGER NOT NULL,
+  last_date DATE NOT NULL,
+  prev_level DOUBLE PRECISION,             -- NULL when last_date is the first observation
+  prev_trend DOUBLE PRECISION,
+  prev_observations INTEGER,
+  prev_date DATE,
+  updated_at TIMESTAMP NOT NULL DEFAULT now(),
+  -- (store_id, isodow) leads so a forecast reads one contiguous index range
+  PRIMARY KEY (store_id, isodow, product_id)
+);
@@ -1,5 +1,4 @@
 from models.db import get_connection
-from psycopg2.extras import RealDictCursor
 
 
 def insert_daily_entry(user_id, product_id, date, produced, waste):
@@ -25,7 +24,7 @@ def insert_daily_entry(user_id, product_id, date, produced, waste):
 
 def get_last_7_days(user_id):
     conn = get_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur = conn.cursor()
 
     cur.execute("""
         SELECT 
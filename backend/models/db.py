@@ -3,15 +3,102 @@ import logging
 import psycopg2
 from psycopg2 import pool
 import psycopg2.extras
+import socket
 import sys
+import threading
 import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
-# Connection pool initialized at module level
+from utils.instrumentation import InstrumentedCursor, record_pool_wait
+
+# Connection pool, created by the background warm-up (start_pool_warmup) or on
+# first use by scripts that call get_connection() directly
 _connection_pool = None
 _logger = logging.getLogger(__name__)
 
+POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN", "2"))
+POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX", "10"))
+# How long a request waits for a warming pool before failing fast
+POOL_WAIT_TIMEOUT = float(os.getenv("DB_POOL_WAIT_TIMEOUT", "10"))
+# Seconds a resolved IPv4 address for the database host is reused
+DNS_CACHE_TTL = float(os.getenv("DB_DNS_TTL", "300"))
+
+_pool_lock = threading.Lock()
+_pool_ready = threading.Event()
+# status: cold -> warming -> ready | failed
+_pool_state = {"status": "cold", "error": None, "pid": None, "started": None, "warmup_ms": None}
+_dns_cache = {}
+
+# JSON read endpoints (dashboard, accuracy, forecast history) can ask for NUMERIC
+# values (error percentages, AVG/ROUND aggregates) as int/float instead of Decimal:
+# cheaper to build and encoded as JSON numbers rather than strings. Everything else
+# keeps psycopg2's Decimal. DB_NUMERIC_AS_FLOAT=0 turns numeric_as_number into a no-op.
+NUMERIC_AS_FLOAT = os.getenv("DB_NUMERIC_AS_FLOAT", "1") != "0"
+
+
+def _cast_numeric(value, cur):
+    if value is None:
+        return None
+    if value.lstrip("-").isdigit():
+        return int(value)
+    return float(value)
+
+
+NUMERIC_AS_NUMBER = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, "NUMERIC_AS_NUMBER", _cast_numeric
+)
+
+
+def numeric_as_number(cur):
+    """Make `cur` return NUMERIC columns as int/float, for results that only go out as JSON."""
+    if NUMERIC_AS_FLOAT:
+        psycopg2.extensions.register_type(NUMERIC_AS_NUMBER, cur)
+    return cur
+
+
+class WarmConnectionPool(pool.ThreadedConnectionPool):
+    """Thread-safe pool (gunicorn runs gthread workers) that opens its minconn connections in parallel."""
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(0, maxconn, *args, **kwargs)
+        self.minconn = minconn
+        if minconn:
+            try:
+                with ThreadPoolExecutor(max_workers=minconn) as executor:
+                    list(executor.map(lambda _: self._connect(), range(minconn)))
+            except Exception:
+                self.closeall()
+                raise
+
+    def usage(self):
+        """Connections checked out and idle in this process."""
+        with self._lock:
+            return {"in_use": len(self._used), "idle": len(self._pool)}
+
+
+def _resolve_ipv4(host, port):
+    """First IPv4 address for host, cached for DNS_CACHE_TTL seconds."""
+    now = time.monotonic()
+    cached = _dns_cache.get((host, port))
+    if cached and cached[1] > now:
+        return cached[0]
+
+    hostaddr = None
+    try:
+        infos = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM)
+        if infos:
+            hostaddr = infos[0][4][0]
+            _logger.info("Resolved %s to IPv4: %s", host, hostaddr)
+    except Exception as exc:
+        _logger.error("DNS resolution failed for %s: %s", host, exc)
+    if hostaddr:
+        _dns_cache[(host, port)] = (hostaddr, now + DNS_CACHE_TTL)
+    return hostaddr
+
+
 def init_connection_pool(retry_count=0, max_retries=3):
-    """Initialize the connection pool with retry logic. Call this on app startup."""
+    """Create the connection pool with retry logic. Blocks; the app uses start_pool_warmup() instead."""
     global _connection_pool
     DATABASE_URL = os.getenv("DATABASE_URL")
     
@@ -25,26 +112,15 @@ def init_connection_pool(retry_count=0, max_retries=3):
         print(error_msg, file=sys.stderr)
         raise RuntimeError(error_msg)
     
+    host = hostaddr = port = None
     try:
         # Parse the DATABASE_URL to extract components and force IPv4.
         # This avoids IPv6-only attempts that can fail on some hosts.
-        import socket
-        import urllib.parse
         parsed = urllib.parse.urlparse(DATABASE_URL)
 
         host = parsed.hostname
         port = parsed.port or 5432
-        hostaddr = None
-        if host:
-            try:
-                # Prefer the first IPv4 address if available.
-                infos = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM)
-                if infos:
-                    hostaddr = infos[0][4][0]
-                    _logger.info("Resolved %s to IPv4: %s", host, hostaddr)
-            except Exception as exc:
-                _logger.error("DNS resolution failed for %s: %s", host, exc)
-                hostaddr = None
+        hostaddr = _resolve_ipv4(host, port) if host else None
 
         connection_params = {
             'host': host,
@@ -60,11 +136,12 @@ def init_connection_pool(retry_count=0, max_retries=3):
         # Filter out None values
         connection_params = {k: v for k, v in connection_params.items() if v is not None}
         
-        _connection_pool = pool.SimpleConnectionPool(
-            minconn=2,
-            maxconn=10,
+        new_pool = WarmConnectionPool(
+            minconn=POOL_MIN_CONN,
+            maxconn=POOL_MAX_CONN,
             **connection_params
         )
+        _connection_pool = new_pool
         print("[OK] Connection pool initialized successfully", file=sys.stderr)
     except psycopg2.OperationalError as e:
         error_msg = (
@@ -83,6 +160,8 @@ def init_connection_pool(retry_count=0, max_retries=3):
             print("TIP: Connection refused - verify the port is correct and database is running", file=sys.stderr)
         
         if retry_count < max_retries:
+            # A stale cached address may be the cause; resolve again on retry
+            _dns_cache.pop((host, port), None)
             wait_time = 2 ** retry_count  # Exponential backoff: 1s, 2s, 4s
             print(f"Retrying in {wait_time}s...", file=sys.stderr)
             time.sleep(wait_time)
@@ -97,20 +176,71 @@ def init_connection_pool(retry_count=0, max_retries=3):
         print(error_msg, file=sys.stderr)
         raise RuntimeError(error_msg)
 
-def get_connection():
-    """Get a connection from the pool with RealDictCursor."""
-    global _connection_pool
-    if _connection_pool is None:
+
+def _warm_up():
+    started = time.perf_counter()
+    try:
         init_connection_pool()
+    except Exception as e:
+        _pool_state.update(status="failed", error=str(e))
+    else:
+        _pool_state.update(status="ready", error=None, warmup_ms=round((time.perf_counter() - started) * 1000))
+    finally:
+        # Wake waiting requests either way; they re-check the status
+        _pool_ready.set()
+
+
+def start_pool_warmup():
+    """Create the pool on a background thread so worker boot and /health never wait on the database.
+
+    Safe to call repeatedly: it is a no-op while warming or ready in this process,
+    and restarts a failed warm-up (or one inherited across a fork).
+    """
+    with _pool_lock:
+        same_process = _pool_state["pid"] == os.getpid()
+        if same_process and _pool_state["status"] in ("warming", "ready"):
+            return False
+        _pool_state.update(status="warming", error=None, pid=os.getpid(), started=time.time(), warmup_ms=None)
+        _pool_ready.clear()
+    threading.Thread(target=_warm_up, name="db-pool-warmup", daemon=True).start()
+    return True
+
+
+def pool_status():
+    """Warm-up state for health checks: status is cold, warming, ready or failed."""
+    status = dict(_pool_state)
+    status.pop("pid")
+    status["minconn"] = POOL_MIN_CONN
+    status["maxconn"] = POOL_MAX_CONN
+    if status["status"] == "warming" and status["started"]:
+        status["waiting_ms"] = round((time.time() - status["started"]) * 1000)
+    if _connection_pool is not None:
+        status.update(_connection_pool.usage())
+    return status
+
+
+def get_connection():
+    """Get a connection from the pool with RealDictCursor (instrumented per request)."""
+    started = time.perf_counter()
     if _connection_pool is None:
-        raise RuntimeError("Connection pool initialization failed")
+        if _pool_state["status"] == "cold":
+            # Not started by the app (scripts, shells): create the pool inline
+            init_connection_pool()
+            _pool_state.update(status="ready", pid=os.getpid())
+        else:
+            if _pool_state["status"] == "failed":
+                start_pool_warmup()
+            if not _pool_ready.wait(POOL_WAIT_TIMEOUT) or _connection_pool is None:
+                raise RuntimeError(
+                    f"Connection pool not ready ({_pool_state['status']}): {_pool_state['error'] or 'still warming up'}"
+                )
     conn = _connection_pool.getconn()
-    # Set RealDictCursor as the default cursor factory
-    conn.cursor_factory = psycopg2.extras.RealDictCursor
+    record_pool_wait(time.perf_counter() - started)
+    # RealDictCursor subclass that counts and times statements for the current request
+    conn.cursor_factory = InstrumentedCursor
     return conn
 
 def return_connection(conn):
     """Return a connection to the pool."""
-    global _connection_pool
     if _connection_pool and conn:
         _connection_pool.putconn(conn)
@@ -1,9 +1,8 @@
 from models.db import get_connection
-from psycopg2.extras import RealDictCursor
 
 def get_all_products():
     conn = get_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = conn.cursor()
 
     cursor.execute("""
         SELECT product_id, product_name, product_type, is_active
@@ -1,6 +1,5 @@
 from models.db import get_connection, return_connection
-import bcrypt
-from psycopg2.extras import RealDictCursor
+from utils.passwords import hash_password, check_password, PasswordPoolBusy
 import secrets
 from datetime import datetime, timedelta
 
@@ -14,11 +13,11 @@ def create_user(name, email, password, store_id=None, phone=None, role="employee
     import traceback
     conn = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # hash before taking a pool connection; runs on the bounded bcrypt pool
+        hashed = hash_password(password)
 
-        # hash and store as utf-8 string
-        hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode('utf-8')
+        conn = get_connection()
+        cursor = conn.cursor()
 
         # Use default store_id if not provided
         if store_id is None:
@@ -37,6 +36,8 @@ def create_user(name, email, password, store_id=None, phone=None, role="employee
         conn.commit()
         cursor.close()
         return {"status": "success", "user": user}
+    except PasswordPoolBusy:
+        return {"status": "error", "message": "Server busy, please try again"}
     except Exception as e:
         error_msg = f"Database error in create_user: {str(e)}"
         print(error_msg, file=sys.stderr)
@@ -57,7 +58,7 @@ def authenticate_user(email, password):
     conn = None
     try:
         conn = get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
 
         cursor.execute(
             "SELECT id, name, email, created_at, store_id, password_hash FROM users WHERE email=%s",
@@ -66,6 +67,10 @@ def authenticate_user(email, password):
         user = cursor.fetchone()
         cursor.close()
 
+        # release the connection before the (slow) password check
+        return_connection(conn)
+        conn = None
+
         if not user:
             return {"status": "error", "message": "User not found"}
 
@@ -73,7 +78,7 @@ def authenticate_user(email, password):
         if not pw_hash:
             return {"status": "error", "message": "No password set for user"}
 
-        if not bcrypt.checkpw(password.encode(), pw_hash.encode()):
+        if not check_password(password, pw_hash):
             return {"status": "error", "message": "Incorrect password"}
 
         # remove password_hash from returned user
@@ -86,6 +91,8 @@ def authenticate_user(email, password):
         }
 
         return {"status": "success", "user": safe_user}
+    except PasswordPoolBusy:
+        return {"status": "error", "message": "Server busy, please try again"}
     except Exception as e:
         error_msg = f"Database error in authenticate_user: {str(e)}"
         print(error_msg, file=sys.stderr)
@@ -103,7 +110,7 @@ def request_password_reset(email):
     """
     conn = get_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
 
         # Check if user exists
         cursor.execute("SELECT id FROM users WHERE email=%s", (email,))
@@ -140,7 +147,7 @@ def validate_reset_token(token):
     """
     conn = get_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
 
         cursor.execute(
             """
@@ -175,9 +182,15 @@ def reset_password(token, new_password):
     
     Returns success/error status.
     """
+    # hash before taking a pool connection; runs on the bounded bcrypt pool
+    try:
+        hashed = hash_password(new_password)
+    except PasswordPoolBusy:
+        return {"status": "error", "message": "Server busy, please try again"}
+
     conn = get_connection()
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
 
         # Validate token
         cursor.execute(
@@ -201,8 +214,6 @@ def reset_password(token, new_password):
         if expires_at < datetime.utcnow():
             return {"status": "error", "message": "Token has expired"}
 
-        # Hash new password
-        hashed = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode('utf-8')
         user_id = token_record["user_id"]
         token_id = token_record["id"]
 
@@ -5,6 +5,7 @@ Separate from the authenticated product-based waste submission system
 """
 from flask import Blueprint, jsonify, request
 from models.db import get_connection, return_connection
+from services.store_pin_cache import store_pin_cache
 from datetime import datetime, date
 
 anonymous_waste_bp = Blueprint("anonymous_waste", __name__, url_prefix="/api/v1/anonymous-waste")
@@ -90,33 +91,34 @@ def submit_waste_anonymous():
         if total_waste == 0:
             return jsonify({"error": "At least one product must have waste quantity greater than 0"}), 400
         
+        try:
+            store_id = int(store_id)
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid store ID"}), 404
+        
+        # Check if store exists and get PIN requirement (cached, incl. unknown stores)
+        store = store_pin_cache.get(store_id)
+        
+        if not store.exists:
+            return jsonify({"error": "Invalid store ID"}), 404
+        
+        # PIN is MANDATORY - all stores must have one for waste submission to work
+        if not store.pin_required:
+            return jsonify({
+                "error": "Store is not set up for waste submission. Contact your store manager.",
+                "pin_required": True
+            }), 400
+        
+        if not store_pin:
+            return jsonify({"error": "Store PIN is required", "pin_required": True}), 401
+        
+        if not store.pin_matches(store_pin):
+            return jsonify({"error": "Invalid store PIN", "pin_required": True}), 401
+        
         conn = get_connection()
         
         try:
             with conn.cursor() as cur:
-                # Check if store exists and get PIN requirement
-                cur.execute('SELECT id, store_pin FROM stores WHERE id = %s AND is_active = true', (store_id,))
-                store = cur.fetchone()
-                
-                if not store:
-                    return jsonify({"error": "Invalid store ID"}), 404
-                
-                # Validate PIN if store has one set
-                stored_pin = store['store_pin'] if isinstance(store, dict) else store[1]
-                
-                # PIN is MANDATORY - all stores must have one for waste submission to work
-                if not stored_pin:
-                    return jsonify({
-                        "error": "Store is not set up for waste submission. Contact your store manager.",
-                        "pin_required": True
-                    }), 400
-                
-                if not store_pin:
-                    return jsonify({"error": "Store PIN is required", "pin_required": True}), 401
-                
-                if store_pin != stored_pin:
-                    return jsonify({"error": "Invalid store PIN", "pin_required": True}), 401
-                
                 # Get client info for audit
                 ip_address = request.remote_addr
                 user_agent = request.headers.get('User-Agent', '')
@@ -173,26 +175,15 @@ def check_pin_requirement(store_id):
     Public endpoint to help frontend show/hide PIN field
     """
     try:
-        conn = get_connection()
+        store = store_pin_cache.get(store_id)
         
-        try:
-            with conn.cursor() as cur:
-                cur.execute('SELECT store_pin FROM stores WHERE id = %s AND is_active = true', (store_id,))
-                result = cur.fetchone()
-                
-                if not result:
-                    return jsonify({"error": "Store not found"}), 404
-                
-                store_pin = result['store_pin'] if isinstance(result, dict) else result[0]
-                pin_required = bool(store_pin)
-                
-                return jsonify({
-                    "store_id": store_id,
-                    "pin_required": pin_required
-                }), 200
-                
-        finally:
-            return_connection(conn)
+        if not store.exists:
+            return jsonify({"error": "Store not found"}), 404
+        
+        return jsonify({
+            "store_id": store_id,
+            "pin_required": store.pin_required
+        }), 200
             
     except Exception as e:
         print(f"Error checking PIN requirement: {e}")
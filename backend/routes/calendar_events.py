@@ -1,19 +1,48 @@
+from datetime import date
 from flask import Blueprint, request, jsonify, abort
 from models.db import get_connection, return_connection
+from services.calendar_service import MAX_EVENT_MULTIPLIER, calendar_cache
+from utils.jwt_handler import has_cross_store_role, require_auth
+from utils.pagination import paginated_list
+from utils.validation import validate_json
 
 bp = Blueprint('calendar_events', __name__, url_prefix='/api/v1/calendar_events')
 
+# calendar_events has no store column: every row changes every store's forecast,
+# so writes need a cross-store role and a bounded multiplier
+event_schema = {
+    "type": "object",
+    "properties": {
+        "event_id": {"type": "integer"},
+        "event_date": {"type": "string", "pattern": r"^\d{4}-\d{2}-\d{2}$"},
+        "event_name": {"type": ["string", "null"], "maxLength": 255},
+        "multiplier": {"type": "number", "exclusiveMinimum": 0, "maximum": MAX_EVENT_MULTIPLIER},
+    },
+    "required": ["event_date", "multiplier"],
+}
+
+
+def _validated_event():
+    """The request's event body, or an error response tuple."""
+    data = validate_json(request, event_schema)
+    if isinstance(data, tuple):
+        return data
+    try:
+        date.fromisoformat(data['event_date'])
+    except ValueError:
+        return jsonify({"status": "error", "message": "event_date must be a valid YYYY-MM-DD date"}), 400
+    return data
+
+
+def _forbidden(cur):
+    if has_cross_store_role(cur):
+        return None
+    return jsonify({"status": "error", "message": "Only admins and owners can change calendar events"}), 403
+
 
 @bp.route('/', methods=['GET'])
 def list_events():
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM calendar_events;')
-            rows = cur.fetchall()
-        return jsonify(rows), 200
-    finally:
-        return_connection(conn)
+    return paginated_list('calendar_events', ('event_id',))
 
 
 @bp.route('/<int:event_id>', methods=['GET'])
@@ -31,40 +60,59 @@ def get_event(event_id):
 
 
 @bp.route('/', methods=['POST'])
+@require_auth
 def create_event():
-    data = request.get_json() or {}
+    data = _validated_event()
+    if isinstance(data, tuple):
+        return data
     cols = ('event_id', 'event_date', 'event_name', 'multiplier')
     vals = tuple(data.get(c) for c in cols)
     conn = get_connection()
     try:
         with conn.cursor() as cur:
+            denied = _forbidden(cur)
+            if denied:
+                return denied
             cur.execute('INSERT INTO calendar_events (event_id, event_date, event_name, multiplier) VALUES (%s,%s,%s,%s);', vals)
             conn.commit()
+        calendar_cache.invalidate()
         return jsonify({'status':'success'}), 201
     finally:
         return_connection(conn)
 
 
 @bp.route('/<int:event_id>', methods=['PUT'])
+@require_auth
 def update_event(event_id):
-    data = request.get_json() or {}
+    data = _validated_event()
+    if isinstance(data, tuple):
+        return data
     conn = get_connection()
     try:
         with conn.cursor() as cur:
+            denied = _forbidden(cur)
+            if denied:
+                return denied
             cur.execute('UPDATE calendar_events SET event_date=%s, event_name=%s, multiplier=%s WHERE event_id=%s;', (data.get('event_date'), data.get('event_name'), data.get('multiplier'), event_id))
             conn.commit()
+        calendar_cache.invalidate()
         return jsonify({'status':'updated'}), 200
     finally:
         return_connection(conn)
 
 
 @bp.route('/<int:event_id>', methods=['DELETE'])
+@require_auth
 def delete_event(event_id):
     conn = get_connection()
     try:
         with conn.cursor() as cur:
+            denied = _forbidden(cur)
+            if denied:
+                return denied
             cur.execute('DELETE FROM calendar_events WHERE event_id=%s;', (event_id,))
             conn.commit()
+        calendar_cache.invalidate()
         return jsonify({'status':'deleted'}), 200
     finally:
         return_connection(conn)
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from models.db import get_connection, return_connection
+from services.forecast_ets import fold_new_rows
 
 daily_bp = Blueprint("daily", __name__)
 
@@ -39,6 +40,7 @@ def upload_daily():
                 ON CONFLICT (store_id, product_id, date)
                 DO UPDATE SET waste = EXCLUDED.waste
             """, (store_id, product_id, date, waste))
+            fold_new_rows(cur, store_id, [date])
 
         conn.commit()
         return jsonify({"message": "Daily data saved"})
@@ -1,19 +1,13 @@
 from flask import Blueprint, request, jsonify, abort
 from models.db import get_connection, return_connection
+from utils.pagination import paginated_list
 
 bp = Blueprint('daily_production', __name__, url_prefix='/api/v1/daily_production')
 
 
 @bp.route('/', methods=['GET'])
 def list_production():
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM daily_production;')
-            rows = cur.fetchall()
-        return jsonify(rows), 200
-    finally:
-        return_connection(conn)
+    return paginated_list('daily_production', ('id',))
 
 
 @bp.route('/<int:id>', methods=['GET'])
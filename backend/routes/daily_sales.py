@@ -1,19 +1,13 @@
 from flask import Blueprint, request, jsonify, abort
 from models.db import get_connection, return_connection
+from utils.pagination import paginated_list
 
 bp = Blueprint('daily_sales', __name__, url_prefix='/api/v1/daily_sales')
 
 
 @bp.route('/', methods=['GET'])
 def list_sales():
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM daily_sales;')
-            rows = cur.fetchall()
-        return jsonify(rows), 200
-    finally:
-        return_connection(conn)
+    return paginated_list('daily_sales', ('sale_id',))
 
 
 @bp.route('/<int:sale_id>', methods=['GET'])
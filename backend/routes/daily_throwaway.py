@@ -1,19 +1,13 @@
 from flask import Blueprint, request, jsonify, abort
 from models.db import get_connection, return_connection
+from utils.pagination import paginated_list
 
 bp = Blueprint('daily_throwaway', __name__, url_prefix='/api/v1/daily_throwaway')
 
 
 @bp.route('/', methods=['GET'])
 def list_throwaways():
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM daily_throwaway;')
-            rows = cur.fetchall()
-        return jsonify(rows), 200
-    finally:
-        return_connection(conn)
+    return paginated_list('daily_throwaway', ('id',))
 
 
 @bp.route('/<int:id>', methods=['GET'])
@@ -1,19 +1,13 @@
 from flask import Blueprint, request, jsonify, abort
 from models.db import get_connection, return_connection
+from utils.pagination import paginated_list
 
 bp = Blueprint('daily_waste', __name__, url_prefix='/api/v1/daily_waste')
 
 
 @bp.route('/', methods=['GET'])
 def list_waste():
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM daily_waste;')
-            rows = cur.fetchall()
-        return jsonify(rows), 200
-    finally:
-        return_connection(conn)
+    return paginated_list('daily_waste', ('id',))
 
 
 @bp.route('/<int:id>', methods=['GET'])
@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from models.db import get_connection, return_connection
+from models.db import get_connection, numeric_as_number, return_connection
 from datetime import date, timedelta
 
 dashboard_bp = Blueprint("dashboard", __name__)
@@ -14,7 +14,7 @@ def daily_snapshot():
 
     conn = get_connection()
     try:
-        cur = conn.cursor()
+        cur = numeric_as_number(conn.cursor())
         cur.execute("""
             SELECT
                 p.product_name,
@@ -62,7 +62,7 @@ def accuracy_trend():
 
     conn = get_connection()
     try:
-        cur = conn.cursor()
+        cur = numeric_as_number(conn.cursor())
         cur.execute("""
             SELECT
                 target_date,
@@ -87,7 +87,7 @@ def learning_status():
 
     conn = get_connection()
     try:
-        cur = conn.cursor()
+        cur = numeric_as_number(conn.cursor())
         cur.execute("""
             SELECT
                 p.product_name,
@@ -4,8 +4,9 @@ Provides endpoints for displaying imported data and analytics to the frontend
 """
 
 from flask import Blueprint, request, jsonify
-from models.db import get_connection, return_connection
+from models.db import get_connection, numeric_as_number, return_connection
 from utils.jwt_handler import require_auth
+from utils.streaming import iter_query, streamed_json_response
 from datetime import datetime, timedelta
 
 bp = Blueprint("dashboard_data", __name__, url_prefix="/api/v1/dashboard")
@@ -68,7 +69,7 @@ def get_recent_imports():
             ORDER BY import_date DESC
         """, (store_id, days_back))
         
-        throwaway_imports = [dict(row) for row in cur.fetchall()]
+        throwaway_imports = cur.fetchall()
         
         # Get production imports
         cur.execute("""
@@ -86,7 +87,7 @@ def get_recent_imports():
             ORDER BY import_date DESC
         """, (store_id, days_back))
         
-        production_imports = [dict(row) for row in cur.fetchall()]
+        production_imports = cur.fetchall()
         
         cur.close()
         return_connection(conn)
@@ -136,11 +137,44 @@ def get_production_summary():
             return jsonify({"error": "store_id required"}), 400
         
         conn = get_connection()
-        cur = conn.cursor()
+        cur = numeric_as_number(conn.cursor())
         
-                # Daily production trend (use imported throwaway produced values)
-        if product_id:
+        # Summary stats
+        if product_type:
+            cur.execute("""
+                SELECT
+                    COUNT(DISTINCT dt.date) AS days_with_data,
+                    COUNT(DISTINCT dt.product_id) AS unique_products,
+                    SUM(dt.produced) AS total_produced,
+                    SUM(dt.waste) AS total_waste,
+                    AVG(dt.produced) AS avg_daily_production,
+                    MAX(dt.produced) AS peak_production
+                FROM public.daily_throwaway dt
+                JOIN public.products p ON p.product_id = dt.product_id
+                WHERE dt.store_id = %s
+                  AND LOWER(p.product_type) = LOWER(%s)
+                  AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
+            """, (store_id, product_type, days_back))
+        else:
             cur.execute("""
+                SELECT
+                    COUNT(DISTINCT dt.date) AS days_with_data,
+                    COUNT(DISTINCT dt.product_id) AS unique_products,
+                    SUM(dt.produced) AS total_produced,
+                    SUM(dt.waste) AS total_waste,
+                    AVG(dt.produced) AS avg_daily_production,
+                    MAX(dt.produced) AS peak_production
+                FROM public.daily_throwaway dt
+                WHERE dt.store_id = %s
+                  AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
+            """, (store_id, days_back))
+        
+        summary = cur.fetchone()
+        cur.close()
+        
+        # Daily production trend (use imported throwaway produced values)
+        if product_id:
+            daily_sql, daily_params = """
                 SELECT
                             dt.date,
                             dt.produced AS quantity,
@@ -152,9 +186,9 @@ def get_production_summary():
                                     AND dt.product_id = %s
                                     AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
                                 ORDER BY dt.date DESC
-            """, (store_id, product_id, days_back))
+            """, (store_id, product_id, days_back)
         elif product_type:
-            cur.execute("""
+            daily_sql, daily_params = """
                 SELECT
                     dt.date,
                     SUM(dt.produced) AS total_quantity,
@@ -167,9 +201,9 @@ def get_production_summary():
                   AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
                 GROUP BY dt.date
                 ORDER BY dt.date DESC
-            """, (store_id, product_type, days_back))
+            """, (store_id, product_type, days_back)
         else:
-            cur.execute("""
+            daily_sql, daily_params = """
                 SELECT
                                         dt.date,
                                         SUM(dt.produced) AS total_quantity,
@@ -180,50 +214,13 @@ def get_production_summary():
                                     AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
                                 GROUP BY dt.date
                                 ORDER BY dt.date DESC
-            """, (store_id, days_back))
+            """, (store_id, days_back)
         
-        daily_data = [dict(row) for row in cur.fetchall()]
-        
-        # Summary stats
-        if product_type:
-            cur.execute("""
-                SELECT
-                    COUNT(DISTINCT dt.date) AS days_with_data,
-                    COUNT(DISTINCT dt.product_id) AS unique_products,
-                    SUM(dt.produced) AS total_produced,
-                    SUM(dt.waste) AS total_waste,
-                    AVG(dt.produced) AS avg_daily_production,
-                    MAX(dt.produced) AS peak_production
-                FROM public.daily_throwaway dt
-                JOIN public.products p ON p.product_id = dt.product_id
-                WHERE dt.store_id = %s
-                  AND LOWER(p.product_type) = LOWER(%s)
-                  AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
-            """, (store_id, product_type, days_back))
-        else:
-            cur.execute("""
-                SELECT
-                    COUNT(DISTINCT dt.date) AS days_with_data,
-                    COUNT(DISTINCT dt.product_id) AS unique_products,
-                    SUM(dt.produced) AS total_produced,
-                    SUM(dt.waste) AS total_waste,
-                    AVG(dt.produced) AS avg_daily_production,
-                    MAX(dt.produced) AS peak_production
-                FROM public.daily_throwaway dt
-                WHERE dt.store_id = %s
-                  AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
-            """, (store_id, days_back))
-        
-        summary = dict(cur.fetchone())
-        
-        cur.close()
-        return_connection(conn)
-        
-        return jsonify({
-            "status": "success",
-            "summary": summary,
-            "daily_data": daily_data
-        }), 200
+        # daily_data is streamed from a server-side cursor after the summary
+        daily_data = iter_query(conn, daily_sql, daily_params)
+        return streamed_json_response(
+            daily_data, fields={"status": "success", "summary": summary}, key="daily_data"
+        ), 200
         
     except Exception as e:
         print(f"[ERROR] get_production_summary: {e}")
@@ -253,14 +250,33 @@ def get_waste_summary():
         if not store_id:
             return jsonify({"error": "store_id required"}), 400
         
-        print(f"[WASTE-SUMMARY DEBUG] Fetching waste for store_id={store_id}, days={days_back}")
-        
         conn = get_connection()
-        cur = conn.cursor()
+        cur = numeric_as_number(conn.cursor())
+        
+        # Summary stats
+        cur.execute("""
+            SELECT
+                COUNT(DISTINCT dt.date) AS days_with_data,
+                COUNT(DISTINCT dt.product_id) AS unique_products,
+                SUM(dt.produced) AS total_produced,
+                SUM(dt.waste) AS total_waste,
+                CASE 
+                    WHEN SUM(dt.produced) > 0 THEN ROUND(100.0 * SUM(dt.waste) / SUM(dt.produced), 2)
+                    ELSE 0
+                END AS overall_waste_percentage,
+                AVG(dt.waste) AS avg_daily_waste,
+                MAX(dt.waste) AS peak_waste
+            FROM public.daily_throwaway dt
+            WHERE dt.store_id = %s
+              AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
+        """, (store_id, days_back))
+        
+        summary = cur.fetchone()
+        cur.close()
         
         # Daily waste trend
         if product_id:
-            cur.execute("""
+            daily_sql, daily_params = """
                 SELECT
                     dt.date,
                     dt.produced,
@@ -276,9 +292,9 @@ def get_waste_summary():
                   AND dt.product_id = %s
                   AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
                 ORDER BY dt.date DESC
-            """, (store_id, product_id, days_back))
+            """, (store_id, product_id, days_back)
         else:
-            cur.execute("""
+            daily_sql, daily_params = """
                 SELECT
                     dt.date,
                     SUM(dt.produced) AS total_produced,
@@ -293,41 +309,13 @@ def get_waste_summary():
                   AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
                 GROUP BY dt.date
                 ORDER BY dt.date DESC
-            """, (store_id, days_back))
-        
-        daily_data = [dict(row) for row in cur.fetchall()]
-        print(f"[WASTE-SUMMARY DEBUG] Found {len(daily_data)} daily records")
-        if daily_data:
-            print(f"[WASTE-SUMMARY DEBUG] Sample record: {daily_data[0]}")
+            """, (store_id, days_back)
         
-        # Summary stats
-        cur.execute("""
-            SELECT
-                COUNT(DISTINCT dt.date) AS days_with_data,
-                COUNT(DISTINCT dt.product_id) AS unique_products,
-                SUM(dt.produced) AS total_produced,
-                SUM(dt.waste) AS total_waste,
-                CASE 
-                    WHEN SUM(dt.produced) > 0 THEN ROUND(100.0 * SUM(dt.waste) / SUM(dt.produced), 2)
-                    ELSE 0
-                END AS overall_waste_percentage,
-                AVG(dt.waste) AS avg_daily_waste,
-                MAX(dt.waste) AS peak_waste
-            FROM public.daily_throwaway dt
-            WHERE dt.store_id = %s
-              AND dt.date >= CURRENT_DATE - INTERVAL '%s days'
-        """, (store_id, days_back))
-        
-        summary = dict(cur.fetchone())
-        
-        cur.close()
-        return_connection(conn)
-        
-        return jsonify({
-            "status": "success",
-            "summary": summary,
-            "daily_data": daily_data
-        }), 200
+        # daily_data is streamed from a server-side cursor after the summary
+        daily_data = iter_query(conn, daily_sql, daily_params)
+        return streamed_json_response(
+            daily_data, fields={"status": "success", "summary": summary}, key="daily_data"
+        ), 200
         
     except Exception as e:
         print(f"[ERROR] get_waste_summary: {e}")
@@ -363,7 +351,7 @@ def get_quick_stats():
             return jsonify({"error": "Could not get database connection"}), 500
             
         try:
-            cur = conn.cursor()
+            cur = numeric_as_number(conn.cursor())
             
             # Last 7 days stats
             cur.execute("""
@@ -1,35 +1,216 @@
-from flask import Blueprint, send_file
-import pandas as pd
-from openpyxl.styles import PatternFill
-from models.db import get_connection
+from flask import Blueprint, Response, request, jsonify
+import csv
+import io
+from datetime import date
+from models.db import get_connection, return_connection
+from utils.jwt_handler import can_access_stores, require_auth
+from utils.security import rate_limit
+from utils.streaming import new_spool, streamed_file_response
 
 export_bp = Blueprint("export", __name__)
 
-@export_bp.get("/forecast")
-def export_forecast():
-    conn = get_connection()
-    df = pd.read_sql("""
+FORECAST_COLUMNS = ["product_name", "target_date", "predicted_quantity"]
+
+EXPORT_FORMATS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+def _fetch_forecast_rows(cur, store_id=None, start_date=None, end_date=None):
+    """Forecast rows for the export; today's forecasts when no date range is given."""
+    filters = []
+    params = []
+    if start_date or end_date:
+        if start_date:
+            filters.append("fh.target_date >= %s")
+            params.append(start_date)
+        if end_date:
+            filters.append("fh.target_date <= %s")
+            params.append(end_date)
+    else:
+        filters.append("fh.forecast_date = CURRENT_DATE")
+    if store_id:
+        filters.append("fh.store_id = %s")
+        params.append(store_id)
+
+    cur.execute(f"""
         SELECT
             p.product_name,
             fh.target_date,
             fh.predicted_quantity
         FROM forecast_history fh
         JOIN products p ON fh.product_id = p.product_id
-        WHERE fh.forecast_date = CURRENT_DATE
-    """, conn)
+        WHERE {" AND ".join(filters)}
+        ORDER BY fh.target_date, p.product_name
+    """, params)
+    return cur.fetchall()
+
+
+def _store_access_error(cur, store_ids):
+    """None if the caller may read store_ids; otherwise the error response.
 
-    path = "/tmp/forecast.xlsx"
-    df.to_excel(path, index=False)
+    Leaving store_ids empty means every store, which needs a cross-store role.
+    """
+    if can_access_stores(cur, store_ids):
+        return None
+    if not store_ids:
+        return jsonify({"error": "store_id required"}), 400
+    return jsonify({"error": "Unauthorized access to this store"}), 403
 
-    from openpyxl import load_workbook
-    wb = load_workbook(path)
-    ws = wb.active
 
+def _render_xlsx(rows):
+    """Styled workbook in one pass: bold header, predicted_quantity filled green."""
+    # openpyxl is imported on first export to keep worker boot fast
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+
+    bold = Font(bold=True)
     green = PatternFill("solid", fgColor="C6EFCE")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    header = []
+    for name in FORECAST_COLUMNS:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = bold
+        header.append(cell)
+    ws.append(header)
+
+    for row in rows:
+        target_date = WriteOnlyCell(ws, value=row["target_date"])
+        target_date.number_format = "yyyy-mm-dd"
+        quantity = WriteOnlyCell(ws, value=row["predicted_quantity"])
+        quantity.fill = green
+        ws.append([row["product_name"], target_date, quantity])
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _iter_csv(rows):
+    """Stream CSV text one row at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FORECAST_COLUMNS)
+    for row in rows:
+        writer.writerow([row[col] for col in FORECAST_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def _render_parquet(rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({
+        "product_name": pa.array([r["product_name"] for r in rows], pa.string()).dictionary_encode(),
+        "target_date": pa.array([r["target_date"] for r in rows], pa.date32()),
+        "predicted_quantity": pa.array([r["predicted_quantity"] for r in rows], pa.int32()),
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
 
-    for row in ws.iter_rows(min_row=2):
-        row[2].fill = green
 
-    wb.save(path)
+@export_bp.get("/forecast")
+@require_auth
+@rate_limit("export")
+def export_forecast():
+    """
+    Export forecasts as xlsx (default), csv or parquet.
+
+    Query params:
+        store_id: limit to one store; required unless the caller has a
+            cross-store role (admin/owner), as is any store but their own
+        start_date, end_date: target_date range (YYYY-MM-DD); defaults to
+            forecasts generated today
+        format: xlsx | csv | parquet
+    """
+    output_format = (request.args.get("format") or "xlsx").lower()
+    if output_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    store_id = request.args.get("store_id", type=int)
+    try:
+        start_date = date.fromisoformat(request.args["start_date"]) if request.args.get("start_date") else None
+        end_date = date.fromisoformat(request.args["end_date"]) if request.args.get("end_date") else None
+    except ValueError:
+        return jsonify({"error": "start_date and end_date must be YYYY-MM-DD"}), 400
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            denied = _store_access_error(cur, [store_id] if store_id else [])
+            if denied:
+                return denied
+            rows = _fetch_forecast_rows(cur, store_id, start_date, end_date)
+    except Exception as e:
+        print(f"Error exporting forecast: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        return_connection(conn)
+
+    mimetype, extension = EXPORT_FORMATS[output_format]
+    headers = {"Content-Disposition": f"attachment; filename=forecast.{extension}"}
+
+    if output_format == "csv":
+        return Response(_iter_csv(rows), mimetype=mimetype, headers=headers)
+    if output_format == "parquet":
+        try:
+            body = _render_parquet(rows)
+        except ImportError:
+            return jsonify({"error": "Parquet export requires pyarrow"}), 501
+        return Response(body, mimetype=mimetype, headers=headers)
+    return Response(_render_xlsx(rows), mimetype=mimetype, headers=headers)
+
+
+@export_bp.get("/history/<table>")
+@require_auth
+@rate_limit("export")
+def export_history(table):
+    """
+    Stream a history table as Parquet for offline analytics.
+
+    table: daily_throwaway | forecast_history | forecast_accuracy
+    Query params:
+        store_id: repeatable or comma-separated store ids; required unless the
+            caller has a cross-store role (admin/owner), as is any store but their own
+        start_date, end_date: YYYY-MM-DD range on the table's date column
+    """
+    try:
+        from services.history_export import HISTORY_TABLES, write_parquet
+    except ImportError:
+        return jsonify({"error": "Parquet export requires pyarrow"}), 501
+
+    if table not in HISTORY_TABLES:
+        return jsonify({"error": f"table must be one of: {', '.join(HISTORY_TABLES)}"}), 400
+
+    try:
+        store_ids = [int(v) for raw in request.args.getlist("store_id") for v in raw.split(",") if v.strip()]
+        start_date = date.fromisoformat(request.args["start_date"]) if request.args.get("start_date") else None
+        end_date = date.fromisoformat(request.args["end_date"]) if request.args.get("end_date") else None
+    except ValueError:
+        return jsonify({"error": "store_id must be integers and dates YYYY-MM-DD"}), 400
+
+    spool = new_spool()
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            denied = _store_access_error(cur, store_ids)
+        if denied:
+            spool.close()
+            return denied
+        write_parquet(conn, spool, table, store_ids, start_date, end_date)
+    except Exception as e:
+        spool.close()
+        print(f"Error exporting {table} history: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        return_connection(conn)
 
-    return send_file(path, as_attachment=True)
+    spool.seek(0)
+    return streamed_file_response(spool, f"{table}.parquet", EXPORT_FORMATS["parquet"][0])
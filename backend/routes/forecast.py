@@ -1,9 +1,17 @@
+import os
+import time
 from flask import Blueprint, request, jsonify
 from models.db import get_connection, return_connection
 from datetime import date, timedelta
+from services.calendar_service import calendar_cache
+from services.forecast_models import MODELS, get_model, waste_target_divisor
+from utils.metrics import record_job
 
 forecast_bp = Blueprint("forecast", __name__)
 
+# Model behind /next-day when the request doesn't name one (any key of services.forecast_models.MODELS)
+FORECAST_MODEL = os.getenv("FORECAST_MODEL", "v1")
+
 DEFAULT_CUSTOM_MULTIPLIERS = {
     "busy_multiplier": 1.18,
     "normal_multiplier": 1.00,
@@ -98,36 +106,6 @@ def get_store_custom_multipliers(cur, store_id: int) -> dict:
     return settings
 
 
-def nth_weekday_of_month(year: int, month: int, weekday: int, n: int) -> date:
-    first_day = date(year, month, 1)
-    offset = (weekday - first_day.weekday() + 7) % 7
-    return first_day + timedelta(days=offset + (n - 1) * 7)
-
-
-def get_calendar_multiplier(target_date: date) -> float:
-    # Heuristic holiday/festival windows commonly affecting foot traffic.
-    fixed_windows = [
-        (date(target_date.year, 12, 25), 5, 1.15),  # Christmas week
-        (date(target_date.year, 1, 1), 3, 1.08),    # New Year window
-        (date(target_date.year, 7, 4), 3, 1.10),    # July 4th window
-        (date(target_date.year, 10, 31), 2, 1.06),  # Halloween
-        (date(target_date.year, 2, 14), 2, 1.05),   # Valentine's day
-    ]
-
-    for event_date, radius_days, factor in fixed_windows:
-        if abs((target_date - event_date).days) <= radius_days:
-            return factor
-
-    # Thanksgiving week (US): 4th Thursday of November, apply uplift week-wide.
-    thanksgiving = nth_weekday_of_month(target_date.year, 11, 3, 4)  # Thursday=3
-    week_start = thanksgiving - timedelta(days=4)
-    week_end = thanksgiving + timedelta(days=2)
-    if week_start <= target_date <= week_end:
-        return 1.12
-
-    return 1.0
-
-
 def get_expectation_multiplier(expectation: str | None, custom: dict | None = None) -> float:
     custom = custom or DEFAULT_CUSTOM_MULTIPLIERS
     if not expectation:
@@ -184,19 +162,24 @@ def next_day_forecast():
     if not store_id:
         return jsonify({"error": "store_id required"}), 400
 
+    model_version = request.args.get("model") or FORECAST_MODEL
+    if model_version not in MODELS:
+        return jsonify({"error": f"model must be one of: {', '.join(MODELS)}"}), 400
+    model = get_model(model_version)
+
     # Optional direct override; if not provided, use context + calendar heuristics.
     adjustment_override = request.args.get("adjustment", type=float)
 
+    started = time.perf_counter()
     conn = get_connection()
     try:
         cur = conn.cursor()
 
         target_date = request.args.get("target_date", type=lambda d: date.fromisoformat(d)) or (date.today() + timedelta(days=1))
-        target_isodow = target_date.isoweekday()
         custom_multipliers = get_store_custom_multipliers(cur, store_id)
 
         context_multiplier = 1.0
-        calendar_multiplier = get_calendar_multiplier(target_date) if bool(custom_multipliers.get("auto_calendar_events_enabled", True)) else 1.0
+        calendar_multiplier = calendar_cache.multiplier(target_date, cur=cur) if bool(custom_multipliers.get("auto_calendar_events_enabled", True)) else 1.0
         saved_expectation = None
         saved_reason = None
         total_points_used = 0
@@ -225,64 +208,40 @@ def next_day_forecast():
         cur.execute("SELECT product_id FROM products WHERE is_active = TRUE")
         products = cur.fetchall()
 
+        # One query for every product's estimate, whichever model
+        predictions = model.predict(cur, store_id, target_date)
+
+        # Convert demand into recommended production using manager waste target.
+        divisor = waste_target_divisor(
+            float(custom_multipliers.get("target_waste_min_pct", 8.0)),
+            float(custom_multipliers.get("target_waste_max_pct", 12.0)),
+        )
+
         forecast = {}
 
         for product in products:
             product_id = product["product_id"]
 
-            # Use recent same-weekday performance from imported throwaway sheets.
-            # sold ~= produced - waste.
-            cur.execute("""
-                SELECT
-                    GREATEST(COALESCE(dt.produced, 0) - COALESCE(dt.waste, 0), 0) AS sold
-                FROM daily_throwaway dt
-                WHERE dt.store_id = %s
-                  AND dt.product_id = %s
-                  AND dt.date < %s
-                  AND EXTRACT(ISODOW FROM dt.date) = %s
-                ORDER BY dt.date DESC
-                LIMIT 4
-            """, (store_id, product_id, target_date, target_isodow))
-
-            rows = cur.fetchall()
-            # Fallback: if no same-weekday history exists yet, use most recent rows.
-            if not rows:
-                cur.execute("""
-                    SELECT
-                        GREATEST(COALESCE(dt.produced, 0) - COALESCE(dt.waste, 0), 0) AS sold
-                    FROM daily_throwaway dt
-                    WHERE dt.store_id = %s
-                      AND dt.product_id = %s
-                      AND dt.date <= %s
-                    ORDER BY dt.date DESC
-                    LIMIT 4
-                """, (store_id, product_id, target_date))
-                rows = cur.fetchall()
-
-            if not rows:
+            prediction = predictions.get(product_id)
+            if prediction is None:
                 continue
+            avg_sold = max(int(round(prediction[0])), 0)
+            # Confidence stays on the v1 scale, where 4 points is a full history
+            points_used = min(prediction[1], 4)
 
-            points_used = len(rows)
             total_points_used += points_used
             products_with_history += 1
 
-            sold_values = [int(r["sold"] or 0) for r in rows]
-            avg_sold = max(int(round(sum(sold_values) / len(sold_values))), 0)
-
             # Apply final multiplier based on context + seasonal calendar heuristics.
             demand_quantity = max(int(round(avg_sold * final_multiplier)), 0)
 
-            # Convert demand into recommended production using manager waste target.
-            min_waste = float(custom_multipliers.get("target_waste_min_pct", 8.0))
-            max_waste = float(custom_multipliers.get("target_waste_max_pct", 12.0))
-            target_waste_ratio = max(0.0, min(0.4, ((min_waste + max_waste) / 2.0) / 100.0))
-            divisor = max(0.6, 1.0 - target_waste_ratio)
-            adjusted_quantity = max(int(round(demand_quantity / divisor)), 0)
+            # Production models already include their own waste allowance
+            adjusted_quantity = demand_quantity if model.produces == "production" else max(int(round(demand_quantity / divisor)), 0)
 
             cur.execute("""
                 INSERT INTO forecast_history
                 (store_id, product_id, forecast_date, target_date, predicted_quantity, model_version, status)
-                VALUES (%s, %s, CURRENT_DATE, %s, %s, 'v1', 'pending')
+                VALUES (%s, %s, CURRENT_DATE, %s, %s, %s, 'pending')
                 ON CONFLICT (store_id, product_id, target_date)
                 DO UPDATE SET
                     forecast_date = EXCLUDED.forecast_date,
@@ -290,16 +249,18 @@ def next_day_forecast():
                     model_version = EXCLUDED.model_version,
                     status = EXCLUDED.status,
                     created_at = NOW();
-            """, (store_id, product_id, target_date, adjusted_quantity))
+            """, (store_id, product_id, target_date, adjusted_quantity, model_version))
 
             forecast[product_id] = adjusted_quantity
 
         conn.commit()
         cur.close()
+        record_job("forecast_generation", time.perf_counter() - started, len(forecast), store_id=store_id)
 
         return jsonify({
             "store_id": store_id,
             "target_date": str(target_date),
+            "model_version": model_version,
             "forecast": forecast,
             "generated_products": len(forecast),
             "applied_multiplier": final_multiplier,
@@ -318,5 +279,8 @@ def next_day_forecast():
                 "label": "high" if products_with_history and (total_points_used / products_with_history) >= 3.5 else "medium" if products_with_history and (total_points_used / products_with_history) >= 2 else "low",
             },
         })
+    except Exception:
+        record_job("forecast_generation", time.perf_counter() - started, ok=False, store_id=store_id)
+        raise
     finally:
         return_connection(conn)
@@ -9,66 +9,108 @@ DO NOT:
 
 Read-only or controlled writes only.
 """
+import os
+from datetime import date
 from flask import Blueprint, request, jsonify
-from models.db import get_connection, return_connection
+from models.db import get_connection, numeric_as_number, return_connection
+from services.accuracy_summary import ACCURACY_WINDOWS, DEFAULT_WINDOW, get_accuracy_summary, refresh_stale_stores
 from services.forecast_accuracy import compute_forecast_accuracy
+from utils.jwt_handler import can_access_stores, has_cross_store_role, require_auth
+
+# Longest /compute range (days) without a cross-store role; bigger backfills: scripts/compute_accuracy.py
+ACCURACY_COMPUTE_MAX_DAYS = int(os.getenv("ACCURACY_COMPUTE_MAX_DAYS", "31"))
 
 forecast_accuracy_bp = Blueprint("forecast_accuracy", __name__)
 
 @forecast_accuracy_bp.route("", methods=["GET"])
 def get_accuracy_metrics():
+    """
+    MAE / MAPE / bias / WAPE from the maintained summary table; stores whose
+    summary predates today are rebuilt first (a controlled write).
+    Query params:
+        store_id (optional): one store; omitted = every store
+        product_id (optional): one product
+        window: trailing days, one of ACCURACY_WINDOWS (default 28)
+        by_product: true for a per-product breakdown
+    """
+    store_id = request.args.get("store_id", type=int)
+    product_id = request.args.get("product_id", type=int)
+    window_days = request.args.get("window", type=int, default=DEFAULT_WINDOW)
+    by_product = request.args.get("by_product", "").lower() in ("1", "true", "yes")
+
+    if window_days not in ACCURACY_WINDOWS:
+        return jsonify({"error": f"window must be one of {list(ACCURACY_WINDOWS)}"}), 400
+
     conn = get_connection()
     try:
-        cur = conn.cursor()
-
-        # Compute MAE (Mean Absolute Error)
-        cur.execute("SELECT AVG(ABS(error_pct)) FROM forecast_history WHERE error_pct IS NOT NULL")
-        mae_row = cur.fetchone()
-        mae = mae_row[0] if mae_row[0] else 0
-
-        # Compute MAPE (Mean Absolute Percentage Error) - assuming error_pct is already percentage
-        cur.execute("SELECT AVG(ABS(error_pct)) FROM forecast_history WHERE error_pct IS NOT NULL")
-        mape = mae  # if error_pct is percentage
-
-        # Bias
-        cur.execute("SELECT AVG(error_pct) FROM forecast_history WHERE error_pct IS NOT NULL")
-        bias_row = cur.fetchone()
-        bias = bias_row[0] if bias_row[0] else 0
-
-        # Last updated
-        cur.execute("SELECT MAX(target_date) FROM forecast_history")
-        last_row = cur.fetchone()
-        last_updated = str(last_row[0]) if last_row[0] else None
-
+        cur = numeric_as_number(conn.cursor())
+        refreshed = refresh_stale_stores(cur, store_id)
+        result = get_accuracy_summary(cur, store_id, product_id, window_days, by_product)
+        if refreshed:
+            conn.commit()
         cur.close()
-
-        return jsonify({
-            "mae": mae,
-            "mape": mape,
-            "bias": bias,
-            "last_updated": last_updated
-        })
     finally:
         return_connection(conn)
 
+    scope = {"store_id": store_id, "product_id": product_id, "window_days": window_days}
+    if by_product:
+        return jsonify({**scope, "products": result})
+
+    return jsonify({
+        **scope,
+        "mae": result["mae"] or 0,
+        "mape": result["mape"] or 0,
+        "bias": result["bias"] or 0,
+        "bias_units": result["bias_units"] or 0,
+        "wape": result["wape"] or 0,
+        "samples": result["samples"] or 0,
+        "last_updated": str(result["last_updated"]) if result["last_updated"] else None,
+        "as_of": str(result["as_of"]) if result["as_of"] else None,
+    })
+
 @forecast_accuracy_bp.route("/compute", methods=["POST"])
+@require_auth
 def compute_accuracy_route():
-    data = request.json
-    store_id = data.get("store_id")
-    target_date = data.get("target_date")
+    """
+    Recompute forecast_accuracy in one statement.
+    Body:
+        store_id (int) or store_ids (list), or all_stores: true
+        target_date, or start_date / end_date (YYYY-MM-DD, inclusive)
+    Stores other than the caller's own, all_stores, and ranges over
+    ACCURACY_COMPUTE_MAX_DAYS need an admin/owner role.
+    """
+    data = request.json or {}
+    store_ids = data.get("store_ids") or ([data["store_id"]] if data.get("store_id") else None)
+    all_stores = bool(data.get("all_stores"))
+    start_date = data.get("start_date") or data.get("target_date")
+    end_date = data.get("end_date") or start_date
+
+    if not (store_ids or all_stores) or not start_date:
+        return jsonify({"error": "store_id (or store_ids / all_stores) and target_date (or start_date) required"}), 400
 
-    if not store_id or not target_date:
-        return jsonify({"error": "store_id and target_date required"}), 400
+    try:
+        start_date = date.fromisoformat(str(start_date))
+        end_date = date.fromisoformat(str(end_date))
+        store_ids = None if all_stores else [int(s) for s in store_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "store ids must be integers and dates YYYY-MM-DD"}), 400
+    if end_date < start_date:
+        return jsonify({"error": "end_date must not be before start_date"}), 400
 
     conn = get_connection()
     try:
         cur = conn.cursor()
 
-        compute_forecast_accuracy(cur, store_id, target_date)
+        if not can_access_stores(cur, store_ids or []):
+            return jsonify({"error": "Unauthorized access to this store"}), 403
+        if (end_date - start_date).days + 1 > ACCURACY_COMPUTE_MAX_DAYS and not has_cross_store_role(cur):
+            return jsonify({"error": f"Date range is limited to {ACCURACY_COMPUTE_MAX_DAYS} days"}), 403
+
+        rows = compute_forecast_accuracy(cur, store_ids, start_date, end_date)
 
         conn.commit()
         cur.close()
 
-        return jsonify({"message": "Forecast accuracy computed"})
+        return jsonify({"message": "Forecast accuracy computed", "rows": rows})
     finally:
         return_connection(conn)
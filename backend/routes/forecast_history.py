@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, abort
 from models.db import get_connection, return_connection
+from utils.pagination import paginated_list
+from utils.streaming import iter_query, streamed_json_response
 
 bp = Blueprint('forecast_history', __name__, url_prefix='/api/v1/forecast_history')
 
@@ -8,48 +10,42 @@ bp = Blueprint('forecast_history', __name__, url_prefix='/api/v1/forecast_histor
 def list_history():
     store_id = request.args.get('store_id', type=int)
     days = request.args.get('days', type=int, default=7)
-    
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            if store_id:
-                # Filter by store_id and recent days, include approved pending waste
-                cur.execute('''
-                    SELECT store_id::bigint, product_id, forecast_date, target_date, 
-                           predicted_quantity, model_version, created_at, status,
-                           manager_override_quantity, confidence, notes, expectation,
-                           approved_by, approved_at, final_quantity,
-                           context_expectation, context_multiplier, adjusted_quantity,
-                           actual_sold, forecast_error, error_pct
-                    FROM forecast_history
-                    WHERE store_id = %s
-                      AND target_date >= CURRENT_DATE - INTERVAL '%s days'
-                    UNION ALL
-                    SELECT pws.store_id::bigint, pwi.product_id, NULL::date as forecast_date, 
-                           pws.submission_date as target_date, 
-                           NULL::integer as predicted_quantity, NULL::text as model_version, pws.submitted_at as created_at,
-                           'approved'::text as status, NULL::integer as manager_override_quantity,
-                           NULL::text as confidence, pws.notes::text as notes, NULL::text as expectation,
-                           pws.reviewed_by::text as approved_by, pws.reviewed_at::timestamp as approved_at,
-                           pwi.waste_quantity::integer as final_quantity,
-                           NULL::text as context_expectation, NULL::numeric as context_multiplier,
-                           NULL::integer as adjusted_quantity, NULL::integer as actual_sold,
-                           NULL::integer as forecast_error, NULL::numeric as error_pct
-                    FROM pending_waste_items pwi
-                    JOIN pending_waste_submissions pws ON pws.id = pwi.submission_id
-                    WHERE pws.store_id = %s
-                      AND pws.submission_date >= CURRENT_DATE - INTERVAL '%s days'
-                      AND pws.status IN ('approved', 'edited')
-                    ORDER BY target_date DESC
-                ''', (store_id, days, store_id, days))
-            else:
-                # No filtering, return all
-                cur.execute('SELECT * FROM forecast_history;')
-            
-            rows = cur.fetchall()
-        return jsonify(rows), 200
-    finally:
-        return_connection(conn)
+
+    if not store_id:
+        # Whole table: keyset pages in primary key order (?limit=&cursor=)
+        return paginated_list('forecast_history', ('store_id', 'product_id', 'target_date'))
+
+    # Filter by store_id and recent days, include approved pending waste.
+    # Rows go from a server-side cursor straight to the response (?format=ndjson for NDJSON).
+    rows = iter_query(get_connection(), '''
+        SELECT store_id::bigint, product_id, forecast_date, target_date, 
+               predicted_quantity, model_version, created_at, status,
+               manager_override_quantity, confidence, notes, expectation,
+               approved_by, approved_at, final_quantity,
+               context_expectation, context_multiplier, adjusted_quantity,
+               actual_sold, forecast_error, error_pct
+        FROM forecast_history
+        WHERE store_id = %s
+          AND target_date >= CURRENT_DATE - INTERVAL '%s days'
+        UNION ALL
+        SELECT pws.store_id::bigint, pwi.product_id, NULL::date as forecast_date, 
+               pws.submission_date as target_date, 
+               NULL::integer as predicted_quantity, NULL::text as model_version, pws.submitted_at as created_at,
+               'approved'::text as status, NULL::integer as manager_override_quantity,
+               NULL::text as confidence, pws.notes::text as notes, NULL::text as expectation,
+               pws.reviewed_by::text as approved_by, pws.reviewed_at::timestamp as approved_at,
+               pwi.waste_quantity::integer as final_quantity,
+               NULL::text as context_expectation, NULL::numeric as context_multiplier,
+               NULL::integer as adjusted_quantity, NULL::integer as actual_sold,
+               NULL::integer as forecast_error, NULL::numeric as error_pct
+        FROM pending_waste_items pwi
+        JOIN pending_waste_submissions pws ON pws.id = pwi.submission_id
+        WHERE pws.store_id = %s
+          AND pws.submission_date >= CURRENT_DATE - INTERVAL '%s days'
+          AND pws.status IN ('approved', 'edited')
+        ORDER BY target_date DESC
+    ''', (store_id, days, store_id, days))
+    return streamed_json_response(rows), 200
 
 
 @bp.route('/query', methods=['GET'])
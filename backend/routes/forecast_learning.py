@@ -12,6 +12,7 @@ Read-only or controlled writes only.
 from flask import Blueprint, request, jsonify
 from models.db import get_connection, return_connection
 from services.forecast_learning import update_learning
+from utils.jwt_handler import can_access_stores, require_auth
 
 forecast_learning_bp = Blueprint("forecast_learning", __name__)
 
@@ -40,22 +41,36 @@ def get_learning_summary():
         return_connection(conn)
 
 @forecast_learning_bp.post("/update")
+@require_auth
 def update_learning_route():
-    data = request.json
+    """
+    Fold newly approved forecasts into the learning state.
+    Body: {"store_id": 12345} for one store, or {"all_stores": true} for every store.
+    Stores other than the caller's own, and all_stores, need an admin/owner role.
+    """
+    data = request.json or {}
     store_id = data.get("store_id")
+    all_stores = bool(data.get("all_stores"))
 
-    if not store_id:
-        return jsonify({"error": "store_id required"}), 400
+    if not store_id and not all_stores:
+        return jsonify({"error": "store_id or all_stores required"}), 400
+    try:
+        store_id = None if all_stores else int(store_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "store_id must be an integer"}), 400
 
     conn = get_connection()
     try:
         cur = conn.cursor()
 
-        update_learning(cur, store_id)
+        if not can_access_stores(cur, [] if all_stores else [store_id]):
+            return jsonify({"error": "Unauthorized access to this store"}), 403
+
+        updated = update_learning(cur, store_id)
 
         conn.commit()
         cur.close()
 
-        return jsonify({"message": "Learning updated"})
+        return jsonify({"message": "Learning updated", "products_updated": updated})
     finally:
         return_connection(conn)
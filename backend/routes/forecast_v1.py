@@ -11,10 +11,9 @@ Read-only or controlled writes only.
 """
 from flask import Blueprint, request, jsonify
 from datetime import date, timedelta
-from models.db import get_connection, return_connection
+from models.db import get_connection, numeric_as_number, return_connection
 from services.forecast_engine import generate_forecast
 from services.context_adjuster import apply_context_adjustment
-print("DEBUG: forecast_v1 loaded with target_date parsing")
 forecast_v1_bp = Blueprint("forecast_v1", __name__)
 
 @forecast_v1_bp.route("/forecast", methods=["GET"])
@@ -91,7 +90,7 @@ def get_forecast_history():
 
     conn = get_connection()
     try:
-        cur = conn.cursor()
+        cur = numeric_as_number(conn.cursor())
 
         cur.execute("""
             SELECT
@@ -11,23 +11,31 @@ health_bp = Blueprint("health", __name__)
 @health_bp.get("/health")
 def health():
     """Health check endpoint with database connectivity info"""
-    from models.db import get_connection, _connection_pool
+    from models.db import get_connection, return_connection, pool_status
     
     db_status = "unknown"
     db_message = ""
     has_database_url = bool(os.getenv("DATABASE_URL"))
+    pool = pool_status()
     
     try:
-        # Try to get a connection without initializing a new pool
-        if _connection_pool is not None:
+        # Only check a pool that is ready; never wait on (or start) a connection here
+        if pool["status"] == "ready":
             conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            from models.db import return_connection
-            return_connection(conn)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+            finally:
+                return_connection(conn)
             db_status = "connected"
             db_message = "Database connection successful"
+        elif pool["status"] == "warming":
+            db_status = "warming"
+            db_message = f"Connection pool warming up ({pool.get('waiting_ms', 0)}ms so far)"
+        elif pool["status"] == "failed":
+            db_status = "failed"
+            db_message = f"Connection pool warm-up failed: {pool['error']}"
         else:
             db_status = "not_initialized"
             db_message = "Connection pool not initialized yet"
@@ -36,12 +44,13 @@ def health():
         db_message = f"Database connection failed: {str(e)}"
     
     response_data = {
-        "status": "healthy" if db_status == "connected" else "degraded",
+        "status": {"connected": "healthy", "warming": "warming"}.get(db_status, "degraded"),
         "message": "Backend is running",
         "database": {
             "status": db_status,
             "message": db_message,
-            "configured": has_database_url
+            "configured": has_database_url,
+            "pool": pool
         }
     }
     
@@ -52,9 +61,10 @@ def health():
 @health_bp.get("/health/db")
 def health_db():
     """Explicit database connectivity check"""
-    from models.db import get_connection
+    from models.db import get_connection, pool_status
     
     has_database_url = bool(os.getenv("DATABASE_URL"))
+    pool = pool_status()
     
     if not has_database_url:
         return jsonify({
@@ -63,6 +73,13 @@ def health_db():
             "solution": "Add DATABASE_URL to your environment variables"
         }), 500
     
+    if pool["status"] == "warming":
+        return jsonify({
+            "status": "warming",
+            "message": "Connection pool is still warming up",
+            "pool": pool
+        }), 503
+    
     try:
         conn = get_connection()
         cursor = conn.cursor()
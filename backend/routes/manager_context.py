@@ -1,19 +1,13 @@
 from flask import Blueprint, request, jsonify, abort
 from models.db import get_connection, return_connection
+from utils.pagination import paginated_list
 
 bp = Blueprint('manager_context', __name__, url_prefix='/api/v1/manager_context')
 
 
 @bp.route('/', methods=['GET'])
 def list_contexts():
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute('SELECT * FROM manager_context;')
-            rows = cur.fetchall()
-        return jsonify(rows), 200
-    finally:
-        return_connection(conn)
+    return paginated_list('manager_context', ('context_id',))
 
 
 @bp.route('/<int:context_id>', methods=['GET'])
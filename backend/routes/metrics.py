@@ -0,0 +1,33 @@
+"""
+Prometheus metrics endpoint
+GET /metrics returns the merged numbers of every gunicorn worker on this
+instance (see utils/metrics.py). When METRICS_TOKEN is set the scraper must
+send "Authorization: Bearer <token>"; otherwise only local requests are served.
+"""
+import hmac
+import os
+
+from flask import Blueprint, Response, request, jsonify
+
+from utils.metrics import render_metrics
+from utils.security import limiter
+
+metrics_bp = Blueprint("metrics", __name__)
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _authorized():
+    if METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        return hmac.compare_digest(supplied, METRICS_TOKEN)
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@metrics_bp.get("/metrics")
+@limiter.exempt
+def metrics():
+    if not _authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return Response(render_metrics(), mimetype=PROMETHEUS_MIMETYPE)
@@ -5,6 +5,7 @@ Allows managers to view, approve, edit, or discard employee waste submissions
 from flask import Blueprint, jsonify, request, g
 import traceback
 from models.db import get_connection, return_connection
+from services.forecast_ets import fold_new_rows
 from utils.jwt_handler import require_auth
 from datetime import datetime, date
 
@@ -59,42 +60,13 @@ def get_pending_submissions():
                         LIMIT 100
                     ''', (store_id, status))
                 
-                rows = cur.fetchall()
-                
-                # Convert to list of dicts
-                submissions = []
-                for row in rows:
-                    if isinstance(row, dict) or hasattr(row, "keys"):
-                        row_dict = dict(row)
-                        submissions.append({
-                            "id": row_dict.get("id"),
-                            "store_id": row_dict.get("store_id"),
-                            "submitter_name": row_dict.get("submitter_name"),
-                            "donut_count": row_dict.get("donut_count"),
-                            "munchkin_count": row_dict.get("munchkin_count"),
-                            "other_count": row_dict.get("other_count"),
-                            "notes": row_dict.get("notes"),
-                            "submission_date": row_dict.get("submission_date").isoformat() if row_dict.get("submission_date") and hasattr(row_dict.get("submission_date"), 'isoformat') else str(row_dict.get("submission_date")) if row_dict.get("submission_date") else None,
-                            "submitted_at": row_dict.get("submitted_at").isoformat() if row_dict.get("submitted_at") and hasattr(row_dict.get("submitted_at"), 'isoformat') else str(row_dict.get("submitted_at")) if row_dict.get("submitted_at") else None,
-                            "status": row_dict.get("status"),
-                            "reviewed_by": row_dict.get("reviewed_by"),
-                            "reviewed_at": row_dict.get("reviewed_at").isoformat() if row_dict.get("reviewed_at") and hasattr(row_dict.get("reviewed_at"), 'isoformat') else str(row_dict.get("reviewed_at")) if row_dict.get("reviewed_at") else None
-                        })
-                    else:
-                        submissions.append({
-                            "id": row[0],
-                            "store_id": row[1],
-                            "submitter_name": row[2],
-                            "donut_count": row[3],
-                            "munchkin_count": row[4],
-                            "other_count": row[5],
-                            "notes": row[6],
-                            "submission_date": row[7].isoformat() if hasattr(row[7], 'isoformat') else str(row[7]),
-                            "submitted_at": row[8].isoformat() if hasattr(row[8], 'isoformat') else str(row[8]),
-                            "status": row[9],
-                            "reviewed_by": row[10],
-                            "reviewed_at": row[11].isoformat() if row[11] and hasattr(row[11], 'isoformat') else str(row[11]) if row[11] else None
-                        })
+                submissions = cur.fetchall()
+
+                # Dates go out as ISO strings (the list view parses submitted_at as local time)
+                for submission in submissions:
+                    for field in ("submission_date", "submitted_at", "reviewed_at"):
+                        value = submission[field]
+                        submission[field] = value.isoformat() if value is not None else None
                 
                 # Attach item-level details for each submission
                 submission_ids = [s["id"] for s in submissions if s.get("id")]
@@ -111,25 +83,7 @@ def get_pending_submissions():
                         item_rows = cur.fetchall()
 
                         for item in item_rows:
-                            if isinstance(item, dict) or hasattr(item, "keys"):
-                                item_dict = dict(item)
-                                submission_id = item_dict.get("submission_id")
-                                item_payload = {
-                                    "product_id": item_dict.get("product_id"),
-                                    "product_name": item_dict.get("product_name"),
-                                    "product_type": item_dict.get("product_type"),
-                                    "waste_quantity": item_dict.get("waste_quantity")
-                                }
-                            else:
-                                submission_id = item[0]
-                                item_payload = {
-                                    "product_id": item[1],
-                                    "product_name": item[2],
-                                    "product_type": item[3],
-                                    "waste_quantity": item[4]
-                                }
-
-                            items_by_submission.setdefault(submission_id, []).append(item_payload)
+                            items_by_submission.setdefault(item.pop("submission_id"), []).append(item)
                     except Exception as item_error:
                         print(f"Warning: Could not load pending waste items: {item_error}")
 
@@ -342,6 +296,8 @@ def approve_submission():
                             skipped_count += 1
                     
                     print(f"[APPROVE DEBUG] Summary: inserted={inserted_count}, updated={updated_count}, skipped={skipped_count}", flush=True)
+                    if inserted_count or updated_count:
+                        fold_new_rows(cur, store_id, [submission_date])
                     cur.execute("RELEASE SAVEPOINT pending_approve_daily_throwaway")
                 except Exception as insert_error:
                     print(f"[APPROVE ERROR] Failed to insert into daily_throwaway: {insert_error}", flush=True)
@@ -574,6 +530,8 @@ def edit_and_save_submission():
                             inserted_count += 1
                     
                     print(f"[EDIT DEBUG] Summary: inserted={inserted_count}, updated={updated_count}", flush=True)
+                    if inserted_count or updated_count:
+                        fold_new_rows(cur, store_id, [submission_date])
                     cur.execute("RELEASE SAVEPOINT pending_edit_daily_throwaway")
                 except Exception as insert_error:
                     print(f"[EDIT ERROR] Failed to insert into daily_throwaway: {insert_error}", flush=True)
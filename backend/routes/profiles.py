@@ -0,0 +1,40 @@
+"""
+Stored request profiles (see utils/profiler.py)
+Same X-Profile: <PROFILER_TOKEN> header as the profiling trigger; 404 when the
+profiler is disabled.
+"""
+from flask import Blueprint, request, jsonify, send_from_directory
+
+from utils.profiler import list_profiles, profile_path, profiler_enabled, token_matches
+
+profiles_bp = Blueprint("profiles", __name__)
+
+
+def _check_access():
+    if not profiler_enabled():
+        return jsonify({"error": "Profiler is disabled"}), 404
+    if not token_matches(request.headers.get("X-Profile")):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+
+@profiles_bp.get("/profiles")
+def get_profiles():
+    """List stored profiles, newest first."""
+    failure = _check_access()
+    if failure is not None:
+        return failure
+    return jsonify({"profiles": list_profiles()})
+
+
+@profiles_bp.get("/profiles/<request_id>")
+def download_profile(request_id):
+    """Download one profile: .collapsed (text) or .pstats (binary)."""
+    failure = _check_access()
+    if failure is not None:
+        return failure
+    found = profile_path(request_id)
+    if found is None:
+        return jsonify({"error": "Profile not found"}), 404
+    directory, filename = found
+    return send_from_directory(directory, filename, as_attachment=True)
@@ -2,14 +2,14 @@ from flask import Blueprint, jsonify, send_file, request, current_app
 from models.db import get_connection, return_connection
 from utils.jwt_handler import require_auth
 from utils.security import rate_limit
+from services.audit_logger import enqueue_qr_access
+from services.store_pin_cache import store_pin_cache
 from flask import g
-import qrcode
 import io
 import base64
 import os
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-import bcrypt
+from utils.passwords import check_password, PasswordPoolBusy
 
 qr_bp = Blueprint("qr", __name__)
 
@@ -28,19 +28,9 @@ elif FRONTEND_BASE.startswith('http://localhost') or FRONTEND_BASE.startswith('h
     print(f"[INFO] Using local frontend URL: {FRONTEND_BASE}")
 
 def log_qr_action(store_id, qr_code_id, action='view'):
-    """Log QR code access for audit purposes"""
+    """Queue a QR code access record for audit purposes (written in the background)"""
     try:
-        conn = get_connection()
-        with conn.cursor() as cur:
-            ip_address = request.remote_addr
-            user_agent = request.headers.get('User-Agent', '')
-            
-            cur.execute('''
-                INSERT INTO qr_access_log (qr_code_id, store_id, ip_address, user_agent, action)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (qr_code_id, store_id, ip_address, user_agent, action))
-            conn.commit()
-        return_connection(conn)
+        enqueue_qr_access(qr_code_id, store_id, action)
     except Exception as e:
         print(f"Error logging QR action: {e}")
 
@@ -63,6 +53,10 @@ def create_qr_with_header(url, store_id):
     Create QR code with header text
     Returns: (PIL Image object)
     """
+    # qrcode / Pillow are imported on first use to keep worker boot fast
+    import qrcode
+    from PIL import Image, ImageDraw, ImageFont
+
     # Create QR code
     qr = qrcode.QRCode(
         version=1,
@@ -178,6 +172,7 @@ def get_or_create_qr(store_id):
         url = f"{FRONTEND_BASE}/waste?store_id={store_id}"
         
         # Generate QR code
+        import qrcode
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_H,  # type: ignore
@@ -224,6 +219,7 @@ def download_qr(store_id):
         # Decode base64 QR
         qr_data = existing['qr_data']
         qr_bytes = base64.b64decode(qr_data)
+        from PIL import Image
         qr_img = Image.open(io.BytesIO(qr_bytes))
         
         # Create image with header
@@ -312,6 +308,7 @@ def regenerate_qr(store_id):
         # Point to /waste path instead of root - this avoids landing page redirect
         url = f"{FRONTEND_BASE}/waste?store_id={store_id}"
         
+        import qrcode
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_H,  # type: ignore
@@ -414,7 +411,11 @@ def change_store_pin(store_id):
             return jsonify({"error": "User does not belong to this store"}), 403
 
         stored_hash = user_row.get("password_hash")
-        if not stored_hash or not bcrypt.checkpw(current_password.encode(), str(stored_hash).encode()):
+        try:
+            password_ok = bool(stored_hash) and check_password(current_password, stored_hash)
+        except PasswordPoolBusy:
+            return jsonify({"error": "Server busy, please try again"}), 503
+        if not password_ok:
             return jsonify({"error": "Password verification failed"}), 401
 
         role = str(user_row.get("role") or "").strip().lower().replace(" ", "_").replace("-", "_")
@@ -434,6 +435,7 @@ def change_store_pin(store_id):
             return jsonify({"error": "Store not found"}), 404
 
         conn.commit()
+        store_pin_cache.invalidate(store_id)
         return jsonify({"message": "Store PIN updated successfully", "store_id": store_id}), 200
     finally:
         return_connection(conn)
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
-import pandas as pd
 import psycopg2
+import time
 from datetime import timedelta, datetime
 from models.db import get_connection, return_connection
+from services.forecast_ets import fold_new_rows
 from utils.jwt_handler import require_auth
+from utils.metrics import record_job
 
 throwaway_import_bp = Blueprint("throwaway_import", __name__)
 
@@ -11,7 +13,7 @@ throwaway_import_bp = Blueprint("throwaway_import", __name__)
 def safe_int(x):
     """Convert value to int, return 0 if invalid"""
     try:
-        if pd.isna(x):
+        if x is None or x != x:  # None, NaN, NaT
             return 0
         x = str(x).strip()
         if x == "":
@@ -32,6 +34,8 @@ def upload_throwaways():
     - AM columns (even indexes): produced
     - PM columns (odd indexes): waste
     """
+    started = time.perf_counter()
+    store_id = None
     try:
         if "file" not in request.files:
             return jsonify({"error": "No file uploaded"}), 400
@@ -42,6 +46,8 @@ def upload_throwaways():
         if not store_id:
             return jsonify({"error": "store_id is required"}), 400
 
+        import pandas as pd  # deferred: pandas dominates worker boot time
+
         # Read Excel without headers
         df = pd.read_excel(file, header=None)
 
@@ -82,6 +88,7 @@ def upload_throwaways():
         }
 
         imported_count = 0
+        rows_written = 0
 
         # Process each product row
         for row_idx in range(start_row, len(df)):
@@ -170,12 +177,17 @@ def upload_throwaways():
                           AND product_id = %s 
                           AND date = %s;
                     """, (produced, waste, store_id, product_id, date))
+                rows_written += 1
 
             imported_count += 1
 
+        if rows_written:
+            fold_new_rows(cur, store_id, dates)
+
         conn.commit()
         cur.close()
         return_connection(conn)
+        record_job("throwaway_import", time.perf_counter() - started, rows_written, store_id=store_id)
 
         return jsonify({
             "status": "success",
@@ -187,6 +199,7 @@ def upload_throwaways():
 
     except Exception as e:
         print(f"Error importing throwaways: {e}")
+        record_job("throwaway_import", time.perf_counter() - started, ok=False, store_id=store_id)
         return jsonify({"error": str(e)}), 500
 
 @throwaway_import_bp.get("/recent")
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from models.db import get_connection, return_connection
 from datetime import date
 from services.forecast_accuracy import compute_forecast_accuracy
+from services.forecast_ets import fold_new_rows
 
 # 1. DEFINE BLUEPRINT FIRST
 waste_submission_bp = Blueprint("waste_submission", __name__)
@@ -131,6 +132,7 @@ def approve_waste():
                     waste_qty
                 ))
         compute_forecast_accuracy(cur, store_id, waste_date)
+        fold_new_rows(cur, store_id, [waste_date])
 
 
 
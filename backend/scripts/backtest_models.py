@@ -0,0 +1,96 @@
+"""Backtest forecast models side by side over stored history.
+
+Usage:
+  python backend/scripts/backtest_models.py                          # every model, every store
+  python backend/scripts/backtest_models.py --models v1,ets-v2 --store-id 12345 [--store-id 12346]
+      [--start 2025-01-01] [--end 2025-12-31] [--workers 8] [--by-store] [--output results.json]
+
+Every day is a one-day-ahead forecast origin using only earlier days; see
+services/backtest.py for the metrics. Reads DATABASE_URL from the environment /
+.env like the other scripts.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+load_dotenv(dotenv_path=os.path.join(PROJECT_ROOT, ".env"))
+
+from models.db import get_connection, return_connection
+from services.backtest import BACKTEST_WORKERS, backtest
+from services.forecast_models import MODELS
+
+
+def print_table(title, metrics):
+    print(title)
+    print(f"  {'model':<16} {'cells':>9} {'WAPE %':>8} {'bias %':>8} {'waste':>10} {'short':>10} {'cost':>12}")
+    for version, m in metrics.items():
+        if m is None:
+            print(f"  {version:<16} {'no data':>9}")
+            continue
+        print(f"  {version:<16} {m['cells']:>9} {m['wape'] if m['wape'] is not None else '-':>8} "
+              f"{m['bias'] if m['bias'] is not None else '-':>8} {m['waste_units']:>10} {m['short_units']:>10} "
+              f"{m['waste_cost']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest forecast models")
+    parser.add_argument("--models", help="comma-separated subset of: " + ", ".join(MODELS))
+    parser.add_argument("--store-id", type=int, action="append", dest="store_ids")
+    parser.add_argument("--start", type=date.fromisoformat, help="first scored day")
+    parser.add_argument("--end", type=date.fromisoformat, help="last scored day (inclusive)")
+    parser.add_argument("--min-history-days", type=int, default=28, help="unscored warm-up per store")
+    parser.add_argument("--target-waste-pct", type=float, default=10.0, help="waste target for demand models")
+    parser.add_argument("--unit-cost", type=float, default=1.0, help="cost per wasted unit")
+    parser.add_argument("--stockout-cost", type=float, default=0.0, help="cost per unit short")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--by-store", action="store_true", help="print a table per store")
+    parser.add_argument("--output", help="also write the full results as JSON")
+    args = parser.parse_args()
+
+    versions = args.models.split(",") if args.models else list(MODELS)
+    unknown = [v for v in versions if v not in MODELS]
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+
+    started = time.perf_counter()
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            store_ids = args.store_ids
+            if not store_ids:
+                cur.execute("SELECT DISTINCT store_id FROM daily_throwaway ORDER BY store_id")
+                store_ids = [row["store_id"] for row in cur.fetchall()]
+            results = backtest(
+                cur, store_ids, versions, workers=args.workers,
+                unit_cost=args.unit_cost, stockout_cost=args.stockout_cost,
+                start_date=args.start, end_date=args.end,
+                min_history_days=args.min_history_days, target_waste_pct=args.target_waste_pct,
+            )
+        conn.rollback()
+    finally:
+        return_connection(conn)
+    elapsed = time.perf_counter() - started
+
+    if args.by_store:
+        for store_id, metrics in results["stores"].items():
+            print_table(f"Store {store_id}", metrics)
+    print_table(f"All stores ({len(results['stores'])})", results["models"])
+    print(f"Backtested {len(versions)} models over {len(results['stores'])} stores in {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
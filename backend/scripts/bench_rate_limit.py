@@ -0,0 +1,78 @@
+"""Measure per-request overhead of the rate limiter for each storage backend.
+
+Usage:
+  python backend/scripts/bench_rate_limit.py [--requests 2000] [--strategy fixed-window]
+
+Runs a trivial Flask route through the test client with no limiter, then with
+the limiter on memory://, sqlite+limiter:// and (when DATABASE_URL is set)
+postgres+limiter://, and prints the mean added microseconds per request.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+import utils.rate_limit_storage  # noqa: F401  (registers storage schemes)
+
+
+def build_app(storage_uri=None, strategy="fixed-window"):
+    app = Flask(__name__)
+    if storage_uri:
+        limiter = Limiter(
+            key_func=get_remote_address,
+            default_limits=["1000000 per minute"],
+            storage_uri=storage_uri,
+            strategy=strategy,
+        )
+        limiter.init_app(app)
+        limiter.reset()
+
+    @app.get("/ping")
+    def ping():
+        return "ok"
+
+    return app
+
+
+def time_requests(app, n):
+    client = app.test_client()
+    for _ in range(50):  # warm up connections and caches
+        client.get("/ping")
+    started = time.perf_counter()
+    for _ in range(n):
+        client.get("/ping")
+    return (time.perf_counter() - started) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--strategy", default="fixed-window",
+                        choices=["fixed-window", "sliding-window-counter"])
+    args = parser.parse_args()
+
+    backends = [
+        ("memory", "memory://"),
+        ("sqlite", "sqlite+limiter:///" + os.path.join(tempfile.gettempdir(), "bench_rate_limits.db").lstrip("/")),
+    ]
+    if os.getenv("DATABASE_URL"):
+        backends.append(("postgres", "postgres+limiter://"))
+
+    baseline = time_requests(build_app(), args.requests)
+    print(f"baseline (no limiter): {baseline * 1e6:8.1f} us/request")
+    for name, uri in backends:
+        per_request = time_requests(build_app(uri, args.strategy), args.requests)
+        print(f"{name:<21}: {per_request * 1e6:8.1f} us/request  (+{(per_request - baseline) * 1e6:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
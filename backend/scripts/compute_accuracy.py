@@ -0,0 +1,49 @@
+"""Recompute forecast_accuracy for a date range, e.g. to backfill history.
+
+Usage:
+  python backend/scripts/compute_accuracy.py --start 2025-01-01 --end 2025-12-31 \
+      [--store-id 12345 --store-id 12346]
+
+Without --store-id every store is processed. Reads DATABASE_URL from the
+environment / .env like the other scripts.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+load_dotenv(dotenv_path=os.path.join(PROJECT_ROOT, ".env"))
+
+from models.db import get_connection, return_connection
+from services.forecast_accuracy import compute_forecast_accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute forecast accuracy")
+    parser.add_argument("--start", type=date.fromisoformat, required=True)
+    parser.add_argument("--end", type=date.fromisoformat, help="Inclusive (default: --start)")
+    parser.add_argument("--store-id", type=int, action="append", dest="store_ids")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            rows = compute_forecast_accuracy(cur, args.store_ids, args.start, args.end)
+        conn.commit()
+    finally:
+        return_connection(conn)
+
+    elapsed = time.perf_counter() - started
+    print(f"Upserted {rows} forecast_accuracy rows in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Export history tables to Parquet for offline analysis.
+
+Usage:
+  python backend/scripts/export_history.py forecast_history -o forecast_history.parquet \
+      [--store-id 12345 --store-id 12346] [--start 2025-01-01] [--end 2025-12-31]
+
+Reads DATABASE_URL from the environment / .env like the other scripts.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+load_dotenv(dotenv_path=os.path.join(PROJECT_ROOT, ".env"))
+
+from models.db import get_connection, return_connection
+from services.history_export import DEFAULT_BATCH_SIZE, HISTORY_TABLES, write_parquet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a history table to Parquet")
+    parser.add_argument("table", choices=sorted(HISTORY_TABLES))
+    parser.add_argument("-o", "--output", help="Output path (default: <table>.parquet)")
+    parser.add_argument("--store-id", type=int, action="append", dest="store_ids")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    output = args.output or f"{args.table}.parquet"
+    started = time.perf_counter()
+    conn = get_connection()
+    try:
+        rows = write_parquet(conn, output, args.table, args.store_ids, args.start, args.end, args.batch_size)
+    finally:
+        return_connection(conn)
+
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {rows} rows to {output} ({os.path.getsize(output)} bytes) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ print("DEBUG ENV PATH:", ENV_PATH)
 print("ENV FILE EXISTS:", os.path.exists(ENV_PATH))
 
 from models.db import get_connection, return_connection
+from services.forecast_ets import fold_new_rows
 
 
 # ---------------------------------------------------------
@@ -194,6 +195,7 @@ def main():
         print(f"[OK] Imported: {product_name}")
         imported_count += 1
 
+    fold_new_rows(cur, STORE_ID, dates)
     conn.commit()
     cur.close()
     return_connection(conn)
@@ -0,0 +1,49 @@
+"""Rebuild the ets-v2 forecast state (forecast_ets_state) from daily_throwaway history.
+
+Usage:
+  python backend/scripts/rebuild_ets_state.py                 # every store
+  python backend/scripts/rebuild_ets_state.py --store-id 12345 [--store-id 12346]
+
+Run once after applying migration 0017 (stores without state are otherwise
+built on their first ets-v2 forecast), and after bulk edits that bypass the
+import and approval paths. Reads DATABASE_URL from the environment / .env
+like the other scripts.
+"""
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+load_dotenv(dotenv_path=os.path.join(PROJECT_ROOT, ".env"))
+
+from models.db import get_connection, return_connection
+from services.forecast_ets import rebuild_ets_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild ets-v2 forecast state")
+    parser.add_argument("--store-id", type=int, action="append", dest="store_ids")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            written = rebuild_ets_state(cur, args.store_ids)
+        conn.commit()
+    finally:
+        return_connection(conn)
+
+    elapsed = time.perf_counter() - started
+    scope = f"stores {args.store_ids}" if args.store_ids else "all stores"
+    print(f"Rebuilt {written} forecast state rows for {scope} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
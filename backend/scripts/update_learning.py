@@ -0,0 +1,47 @@
+"""Fold newly approved forecasts into forecast_learning.
+
+Usage:
+  python backend/scripts/update_learning.py                 # every store
+  python backend/scripts/update_learning.py --store-id 12345 [--store-id 12346]
+
+Reads DATABASE_URL from the environment / .env like the other scripts.
+"""
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(CURRENT_DIR)
+PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+load_dotenv(dotenv_path=os.path.join(PROJECT_ROOT, ".env"))
+
+from models.db import get_connection, return_connection
+from services.forecast_learning import LEARNING_ALPHA, update_learning
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update forecast learning state")
+    parser.add_argument("--store-id", type=int, action="append", dest="store_ids")
+    parser.add_argument("--alpha", type=float, default=LEARNING_ALPHA)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            updated = update_learning(cur, args.store_ids, alpha=args.alpha)
+        conn.commit()
+    finally:
+        return_connection(conn)
+
+    elapsed = time.perf_counter() - started
+    scope = f"stores {args.store_ids}" if args.store_ids else "all stores"
+    print(f"Updated {updated} product learning rows for {scope} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Forecast accuracy summary
+forecast_accuracy_summary holds additive error sums per (store, product, window)
+for the trailing ACCURACY_WINDOWS days ending window_end. It is rebuilt for
+the affected stores whenever forecast_accuracy is recomputed, and reads only
+use rows whose window ends today: stores not refreshed since an earlier day
+are rebuilt first (refresh_stale_stores), so a store without recent approvals
+never reports an old window and an all-stores rollup never mixes windows.
+Because only sums are stored, any rollup (whole store, several products,
+every store) is an exact SUM over summary rows:
+
+    MAE  = sum_abs_error / samples               (units)
+    MAPE = sum_abs_pct / pct_samples             (% of plan, plans > 0 only)
+    bias = sum_pct / pct_samples                 (signed %; > 0 means sold more than planned)
+    WAPE = 100 * sum_abs_error / sum_actual_sold
+
+Refreshes run inside other transactions (waste approval, accuracy recompute),
+so they serialise on transaction-scoped advisory locks: one per store, with an
+all-stores refresh holding the whole-table key exclusively and per-store
+refreshes holding it shared.
+"""
+
+ACCURACY_WINDOWS = (7, 28, 90)
+DEFAULT_WINDOW = 28
+
+_METRICS_SQL = """
+    SUM(samples) AS samples,
+    SUM(sum_abs_error) / NULLIF(SUM(samples), 0) AS mae,
+    SUM(sum_abs_pct) / NULLIF(SUM(pct_samples), 0) AS mape,
+    SUM(sum_pct) / NULLIF(SUM(pct_samples), 0) AS bias,
+    SUM(sum_error) / NULLIF(SUM(samples), 0) AS bias_units,
+    100.0 * SUM(sum_abs_error) / NULLIF(SUM(sum_actual_sold), 0) AS wape,
+    MAX(last_target_date) AS last_updated,
+    MAX(window_end) AS as_of
+"""
+
+
+def _as_list(store_ids):
+    if store_ids is None:
+        return None
+    return list(store_ids) if isinstance(store_ids, (list, tuple, set)) else [store_ids]
+
+
+def _lock_stores(cur, store_ids):
+    """Block until no other transaction is refreshing these stores (held until commit/rollback)."""
+    if store_ids is None:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('forecast_accuracy_summary'), 0)")
+        return
+    cur.execute("SELECT pg_advisory_xact_lock_shared(hashtext('forecast_accuracy_summary'), 0)")
+    # Sorted so two multi-store refreshes cannot deadlock on each other
+    cur.execute("""
+        SELECT pg_advisory_xact_lock(hashtext('forecast_accuracy_summary'), s)
+        FROM (SELECT DISTINCT unnest(%s::int[]) AS s ORDER BY 1) ids
+    """, (store_ids,))
+
+
+def refresh_accuracy_summary(cur, store_ids=None):
+    """Rebuild summary rows for `store_ids` (None = every store) in one pass over the longest window."""
+    store_ids = _as_list(store_ids)
+    _lock_stores(cur, store_ids)
+    store_filter = "WHERE store_id = ANY(%(store_ids)s)" if store_ids is not None else ""
+    fa_store_filter = "AND fa.store_id = ANY(%(store_ids)s)" if store_ids is not None else ""
+    params = {"store_ids": store_ids, "windows": list(ACCURACY_WINDOWS), "max_window": max(ACCURACY_WINDOWS)}
+
+    cur.execute(f"DELETE FROM forecast_accuracy_summary {store_filter}", params)
+    cur.execute(f"""
+        INSERT INTO forecast_accuracy_summary
+        (store_id, product_id, window_days, window_end, samples, pct_samples,
+         sum_abs_error, sum_error, sum_abs_pct, sum_pct, sum_actual_sold, last_target_date)
+        SELECT
+            fa.store_id,
+            fa.product_id,
+            w.window_days,
+            CURRENT_DATE,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE fa.planned_quantity > 0),
+            SUM(ABS(fa.error_quantity)),
+            SUM(fa.error_quantity),
+            COALESCE(SUM(ABS(fa.error_percent)) FILTER (WHERE fa.planned_quantity > 0), 0),
+            COALESCE(SUM(fa.error_percent) FILTER (WHERE fa.planned_quantity > 0), 0),
+            SUM(fa.actual_sold),
+            MAX(fa.target_date)
+        FROM forecast_accuracy fa
+        JOIN unnest(%(windows)s::int[]) AS w(window_days)
+          ON fa.target_date > CURRENT_DATE - w.window_days
+        WHERE fa.target_date > CURRENT_DATE - %(max_window)s
+          AND fa.target_date <= CURRENT_DATE
+          {fa_store_filter}
+        GROUP BY fa.store_id, fa.product_id, w.window_days
+        ON CONFLICT (store_id, product_id, window_days) DO UPDATE SET
+            window_end = EXCLUDED.window_end,
+            samples = EXCLUDED.samples,
+            pct_samples = EXCLUDED.pct_samples,
+            sum_abs_error = EXCLUDED.sum_abs_error,
+            sum_error = EXCLUDED.sum_error,
+            sum_abs_pct = EXCLUDED.sum_abs_pct,
+            sum_pct = EXCLUDED.sum_pct,
+            sum_actual_sold = EXCLUDED.sum_actual_sold,
+            last_target_date = EXCLUDED.last_target_date
+    """, params)
+    return cur.rowcount
+
+
+def refresh_stale_stores(cur, store_id=None):
+    """Rebuild summary rows for stores (one, or None = all) whose windows end before today.
+
+    Returns the number of stores refreshed; the caller commits.
+    """
+    store_filter = "AND store_id = %s" if store_id is not None else ""
+    cur.execute(f"""
+        SELECT DISTINCT store_id FROM forecast_accuracy_summary
+        WHERE window_end < CURRENT_DATE {store_filter}
+    """, [store_id] if store_id is not None else [])
+    stale = [row["store_id"] for row in cur.fetchall()]
+    if stale:
+        refresh_accuracy_summary(cur, stale)
+    return len(stale)
+
+
+def get_accuracy_summary(cur, store_id=None, product_id=None, window_days=DEFAULT_WINDOW, by_product=False):
+    """MAE / MAPE / bias / WAPE for the filters, read from the summary table.
+
+    Only windows ending today are read; call refresh_stale_stores first.
+    Returns one dict, or a list of per-product dicts (with product_name) when by_product.
+    """
+    filters = ["s.window_days = %s", "s.window_end = CURRENT_DATE"]
+    params = [window_days]
+    if store_id is not None:
+        filters.append("s.store_id = %s")
+        params.append(store_id)
+    if product_id is not None:
+        filters.append("s.product_id = %s")
+        params.append(product_id)
+    where = " AND ".join(filters)
+
+    if by_product:
+        cur.execute(f"""
+            SELECT s.product_id, p.product_name, {_METRICS_SQL}
+            FROM forecast_accuracy_summary s
+            JOIN products p ON p.product_id = s.product_id
+            WHERE {where}
+            GROUP BY s.product_id, p.product_name
+            ORDER BY p.product_name
+        """, params)
+        return cur.fetchall()
+
+    cur.execute(f"SELECT {_METRICS_SQL} FROM forecast_accuracy_summary s WHERE {where}", params)
+    return cur.fetchone()
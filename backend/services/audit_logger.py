@@ -4,9 +4,240 @@ Logs all significant actions (login, data changes, exports, etc.)
 """
 
 from models.db import get_connection, return_connection
-from datetime import datetime
-from flask import request
+from flask import request, has_request_context
+from psycopg2.extras import Json, execute_values
+import atexit
 import os
+import queue
+import sys
+import threading
+import time
+
+# Queue/flush tuning (override via environment)
+AUDIT_QUEUE_MAXSIZE = int(os.getenv('AUDIT_QUEUE_MAXSIZE', '10000'))
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv('AUDIT_FLUSH_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv('AUDIT_FLUSH_INTERVAL_MS', '1000'))
+AUDIT_ENQUEUE_TIMEOUT_MS = int(os.getenv('AUDIT_ENQUEUE_TIMEOUT_MS', '5'))
+
+# Insert statement and row template per target table, used with execute_values.
+# Timestamps are taken by the database (NOW() / the column default), as before batching.
+_INSERT_SQL = {
+    'audit_log': '''
+        INSERT INTO audit_log (
+            user_id, action_type, resource_type, resource_id,
+            ip_address, user_agent, details, status, created_at
+        ) VALUES %s
+    ''',
+    'qr_access_log': '''
+        INSERT INTO qr_access_log (
+            qr_code_id, store_id, ip_address, user_agent, action
+        ) VALUES %s
+    ''',
+}
+_INSERT_TEMPLATES = {
+    'audit_log': '(%s, %s, %s, %s, %s, %s, %s, %s, NOW())',
+    'qr_access_log': None,
+}
+
+
+class AuditWriter:
+    """
+    Bounded in-process queue of audit rows drained by a background thread.
+
+    Request handlers only enqueue a tuple; the writer thread groups rows per
+    table and flushes them with one execute_values INSERT and one commit every
+    AUDIT_FLUSH_BATCH_SIZE rows or AUDIT_FLUSH_INTERVAL_MS, whichever comes first.
+    If a batch fails it is retried one table at a time, then one row at a time,
+    so a bad row (FK violation, oversized value) only loses itself.
+    When the queue is full the enqueue waits briefly, then drops the event and
+    counts it rather than blocking the request.
+    """
+
+    def __init__(self, maxsize=AUDIT_QUEUE_MAXSIZE, batch_size=AUDIT_FLUSH_BATCH_SIZE,
+                 flush_interval_ms=AUDIT_FLUSH_INTERVAL_MS, enqueue_timeout_ms=AUDIT_ENQUEUE_TIMEOUT_MS):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_interval_ms) / 1000.0
+        self.enqueue_timeout = max(0, enqueue_timeout_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def _ensure_started(self):
+        """Start the writer thread lazily so each forked gunicorn worker gets its own."""
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            if self._pid != pid:
+                # Forked child: the parent's queue contents and locks are not ours.
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._flush_lock = threading.Lock()
+            self._pid = pid
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, table, row):
+        """Queue a row for `table`. Returns False if the event was dropped."""
+        if table not in _INSERT_SQL:
+            raise ValueError(f"Unknown audit table: {table}")
+        self._ensure_started()
+        try:
+            if self.enqueue_timeout:
+                self._queue.put((table, row), timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _drain(self, first=None):
+        """Collect up to batch_size queued items (plus `first`) without blocking."""
+        items = [first] if first is not None else []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _insert(self, conn, by_table):
+        """Insert {table: rows} in one transaction; rolls back and re-raises on error."""
+        try:
+            with conn.cursor() as cur:
+                for table, rows in by_table.items():
+                    execute_values(cur, _INSERT_SQL[table], rows, template=_INSERT_TEMPLATES[table],
+                                   page_size=self.batch_size)
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+
+    def _write(self, items):
+        if not items:
+            return
+        by_table = {}
+        for table, row in items:
+            by_table.setdefault(table, []).append(row)
+
+        conn = None
+        try:
+            conn = get_connection()
+        except Exception as e:
+            self.failed += len(items)
+            print(f"Error flushing {len(items)} audit events: {e}", file=sys.stderr)
+            return
+        try:
+            try:
+                self._insert(conn, by_table)
+                self.written += len(items)
+                self.flushes += 1
+                return
+            except Exception as e:
+                print(f"Error flushing {len(items)} audit events, retrying per table: {e}", file=sys.stderr)
+
+            for table, rows in by_table.items():
+                try:
+                    self._insert(conn, {table: rows})
+                    self.written += len(rows)
+                    self.flushes += 1
+                    continue
+                except Exception as e:
+                    if len(rows) == 1:
+                        self.failed += 1
+                        print(f"Error writing {table} row: {e}", file=sys.stderr)
+                        continue
+                for row in rows:
+                    try:
+                        self._insert(conn, {table: [row]})
+                        self.written += 1
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"Error writing {table} row: {e}", file=sys.stderr)
+                self.flushes += 1
+        finally:
+            return_connection(conn)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.extend(self._drain(item))
+            if batch:
+                with self._flush_lock:
+                    self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything currently queued (used on shutdown)."""
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                self._write(batch)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the writer thread and flush remaining events."""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'flushes': self.flushes,
+        }
+
+
+# Process-wide writer shared by AuditLogger and the QR access log
+audit_writer = AuditWriter()
+atexit.register(audit_writer.shutdown)
+
+
+def _request_client_info():
+    """Return (ip_address, user_agent) for the current request, if any."""
+    if not has_request_context():
+        return None, ''
+    return request.remote_addr, request.headers.get('User-Agent', '')
+
+
+def enqueue_qr_access(qr_code_id, store_id, action='view'):
+    """Queue a qr_access_log row; captures client info from the current request."""
+    ip_address, user_agent = _request_client_info()
+    return audit_writer.enqueue('qr_access_log', (
+        qr_code_id, store_id, ip_address, user_agent, action
+    ))
+
 
 class AuditLogger:
     """Logs user actions to audit_log table for security and compliance"""
@@ -41,7 +272,10 @@ class AuditLogger:
         status: str = 'success'
     ):
         """
-        Log an action to database
+        Queue an action for the audit_log table.
+
+        The row is written by the background audit writer, so this never takes
+        a pool connection or commits on the request path.
         
         Args:
             user_id: ID of user performing action (optional)
@@ -51,34 +285,21 @@ class AuditLogger:
             details: Additional JSON details
             status: 'success', 'failure', 'warning'
         """
-        conn = None
         try:
-            conn = get_connection()
-            with conn.cursor() as cur:
-                ip_address = request.remote_addr if request else None
-                user_agent = request.headers.get('User-Agent', '') if request else ''
-                
-                cur.execute('''
-                    INSERT INTO audit_log (
-                        user_id, action_type, resource_type, resource_id, 
-                        ip_address, user_agent, details, status, created_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
-                ''', (
-                    user_id,
-                    action_type,
-                    resource_type,
-                    resource_id,
-                    ip_address,
-                    user_agent,
-                    details,
-                    status
-                ))
-                conn.commit()
+            ip_address, user_agent = _request_client_info()
+            return audit_writer.enqueue('audit_log', (
+                user_id,
+                action_type,
+                resource_type,
+                resource_id,
+                ip_address,
+                user_agent,
+                Json(details) if details is not None else None,
+                status,
+            ))
         except Exception as e:
             print(f"Error logging audit action: {e}")
-        finally:
-            if conn:
-                return_connection(conn)
+            return False
     
     @staticmethod
     def log_login(user_id: int, success: bool = True):
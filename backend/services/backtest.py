@@ -0,0 +1,167 @@
+"""
+Forecast backtesting
+Replays registered forecast models (services/forecast_models.py) over a store's
+history, with every day as a rolling one-day-ahead origin, and scores them side
+by side.
+
+Each store's daily_throwaway history is read once into dense NumPy arrays;
+every model then predicts all (product, day) cells in a handful of vectorised
+passes. Stores are scored in a process pool while the parent streams the next
+store's history from the database.
+
+Scoring runs over the cells every selected model could predict, so models are
+compared on the same days:
+- wape / bias: the model's quantity against units sold, in percent of units sold
+  (positive bias = over-forecast)
+- the production plan is the quantity itself for production models, and demand
+  divided by the waste-target divisor for demand models, as /forecast/next-day does
+- waste_units / short_units: planned minus sold, split by sign
+- waste_cost = waste_units * unit_cost + short_units * stockout_cost
+
+Units sold are produced - waste, so sell-outs understate demand; short_units is
+a lower bound on lost sales. Context and calendar multipliers are not replayed.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from services.forecast_models import MODELS, StoreHistory, get_model, waste_target_divisor
+
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "0")) or os.cpu_count() or 1
+
+_SUM_FIELDS = ("cells", "sold", "abs_error", "error", "waste_units", "short_units")
+
+
+def load_store_history(cur, store_id):
+    """The store's full daily_throwaway history as a StoreHistory, or None without rows."""
+    cur.execute("""
+        SELECT product_id, date, COALESCE(produced, 0) AS produced, COALESCE(waste, 0) AS waste,
+               produced IS NOT NULL AND waste IS NOT NULL AS complete
+        FROM daily_throwaway
+        WHERE store_id = %s
+    """, (store_id,))
+    rows = cur.fetchall()
+    if not rows:
+        return None
+
+    start_date = min(row["date"] for row in rows)
+    days = (max(row["date"] for row in rows) - start_date).days + 1
+    product_ids = sorted({row["product_id"] for row in rows})
+    product_index = {product_id: i for i, product_id in enumerate(product_ids)}
+
+    cells = (
+        np.fromiter((product_index[row["product_id"]] for row in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter(((row["date"] - start_date).days for row in rows), dtype=np.int64, count=len(rows)),
+    )
+    produced = np.full((len(product_ids), days), np.nan)
+    waste = np.full((len(product_ids), days), np.nan)
+    produced[cells] = np.fromiter((float(row["produced"]) for row in rows), dtype=float, count=len(rows))
+    waste[cells] = np.fromiter((float(row["waste"]) for row in rows), dtype=float, count=len(rows))
+    complete = np.zeros((len(product_ids), days), dtype=bool)
+    complete[cells] = np.fromiter((bool(row["complete"]) for row in rows), dtype=bool, count=len(rows))
+    return StoreHistory(store_id, product_ids, start_date, produced, waste, complete)
+
+
+def _sums(quantity, plan, sold):
+    error = quantity - sold
+    over = plan - sold
+    return {
+        "cells": int(sold.size),
+        "sold": float(sold.sum()),
+        "abs_error": float(np.abs(error).sum()),
+        "error": float(error.sum()),
+        "waste_units": float(np.maximum(over, 0).sum()),
+        "short_units": float(np.maximum(-over, 0).sum()),
+    }
+
+
+def score(sums, unit_cost=1.0, stockout_cost=0.0):
+    """Metrics from additive sums (one store or several added together)."""
+    sold = sums["sold"]
+    return {
+        "cells": sums["cells"],
+        "units_sold": round(sold, 1),
+        "wape": round(sums["abs_error"] / sold * 100, 2) if sold else None,
+        "bias": round(sums["error"] / sold * 100, 2) if sold else None,
+        "waste_units": round(sums["waste_units"], 1),
+        "short_units": round(sums["short_units"], 1),
+        "waste_cost": round(sums["waste_units"] * unit_cost + sums["short_units"] * stockout_cost, 2),
+    }
+
+
+def backtest_store(history, model_versions, start_date=None, end_date=None, min_history_days=28,
+                   target_waste_pct=10.0):
+    """{model_version: additive sums} for one StoreHistory.
+
+    Days before start_date / after end_date, and the first min_history_days of
+    the store's history, are not scored.
+    """
+    first_day = min_history_days
+    if start_date is not None:
+        first_day = max(first_day, (start_date - history.start_date).days)
+    last_day = history.days if end_date is None else min(history.days, (end_date - history.start_date).days + 1)
+
+    scored = history.valid.copy()
+    scored[:, :max(0, first_day)] = False
+    scored[:, max(0, last_day):] = False
+
+    predictions = {}
+    for version in model_versions:
+        predictions[version] = get_model(version).backtest(history)
+        scored &= ~np.isnan(predictions[version])
+
+    divisor = waste_target_divisor(target_waste_pct, target_waste_pct)
+    sold = history.sold[scored]
+    results = {}
+    for version, predicted in predictions.items():
+        quantity = predicted[scored]
+        plan = quantity if get_model(version).produces == "production" else np.rint(quantity / divisor)
+        results[version] = _sums(quantity, plan, sold)
+    return results
+
+
+def _add(total, sums):
+    for field in _SUM_FIELDS:
+        total[field] = total.get(field, 0) + sums[field]
+    return total
+
+
+def backtest(cur, store_ids, model_versions=None, workers=BACKTEST_WORKERS, unit_cost=1.0, stockout_cost=0.0,
+             **options):
+    """Score models across stores in a process pool.
+
+    options are passed to backtest_store (start_date, end_date, min_history_days,
+    target_waste_pct). Returns {"models": {version: metrics}, "stores": {store_id: {version: metrics}}}.
+    """
+    model_versions = list(model_versions or MODELS)
+    for version in model_versions:
+        get_model(version)
+
+    per_store = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {}
+        for store_id in store_ids:
+            history = load_store_history(cur, store_id)
+            if history is not None:
+                futures[pool.submit(backtest_store, history, model_versions, **options)] = store_id
+        for future in as_completed(futures):
+            per_store[futures[future]] = future.result()
+
+    totals = {version: {} for version in model_versions}
+    for results in per_store.values():
+        for version, sums in results.items():
+            _add(totals[version], sums)
+
+    return {
+        "models": {
+            version: score(sums, unit_cost, stockout_cost) if sums else None
+            for version, sums in totals.items()
+        },
+        "stores": {
+            store_id: {version: score(sums, unit_cost, stockout_cost) for version, sums in results.items()}
+            for store_id, results in sorted(per_store.items())
+        },
+    }
+
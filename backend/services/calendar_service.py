@@ -0,0 +1,264 @@
+"""
+Calendar multipliers for the next-day forecast
+Holiday windows (built in) and rows from calendar_events are flattened into
+sorted, non-overlapping date segments, so the multiplier for a day is one
+bisect and a date range is one bisect plus a walk over the segments it covers.
+
+Precedence, highest first:
+- calendar_events rows; several rows on the same date multiply together
+- built-in windows in HOLIDAY_WINDOWS order, then Thanksgiving week
+
+Built-in windows are clipped to their own calendar year (the New Year window
+covers Jan 1-4, not the last days of December) and generated per year as
+lookups reach them.
+
+The index is per worker process and shared by every store (calendar_events has
+no store column; stores opt out with auto_calendar_events_enabled). Writes
+through /api/v1/calendar_events invalidate the local copy; other workers pick
+them up within CALENDAR_CACHE_TTL seconds. Callers that already hold a
+connection pass their cursor so a reload doesn't check out a second one.
+"""
+
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from models.db import get_connection, return_connection
+
+CALENDAR_CACHE_TTL = float(os.getenv("CALENDAR_CACHE_TTL", "300"))
+
+# (month, day, radius in days, multiplier, name): heuristic windows commonly affecting foot traffic
+HOLIDAY_WINDOWS = (
+    (12, 25, 5, 1.15, "Christmas week"),
+    (1, 1, 3, 1.08, "New Year"),
+    (7, 4, 3, 1.10, "July 4th"),
+    (10, 31, 2, 1.06, "Halloween"),
+    (2, 14, 2, 1.05, "Valentine's Day"),
+)
+THANKSGIVING_MULTIPLIER = 1.12
+# Largest multiplier a calendar_events row may set (it applies to every store's plan)
+MAX_EVENT_MULTIPLIER = 3.0
+
+
+def nth_weekday_of_month(year: int, month: int, weekday: int, n: int) -> date:
+    first_day = date(year, month, 1)
+    offset = (weekday - first_day.weekday() + 7) % 7
+    return first_day + timedelta(days=offset + (n - 1) * 7)
+
+
+def holiday_windows(year):
+    """[(start, end, multiplier, name), ...] for one year, highest precedence first."""
+    first, last = date(year, 1, 1), date(year, 12, 31)
+    windows = []
+    for month, day, radius, multiplier, name in HOLIDAY_WINDOWS:
+        center = date(year, month, day)
+        windows.append((max(first, center - timedelta(days=radius)),
+                        min(last, center + timedelta(days=radius)), multiplier, name))
+    # Thanksgiving week (US): 4th Thursday of November, Sunday through Saturday
+    thanksgiving = nth_weekday_of_month(year, 11, 3, 4)
+    windows.append((thanksgiving - timedelta(days=4), thanksgiving + timedelta(days=2),
+                    THANKSGIVING_MULTIPLIER, "Thanksgiving week"))
+    return windows
+
+
+def flatten(intervals):
+    """Non-overlapping (start, end, multiplier, name) segments, sorted by start.
+
+    intervals are (start, end, multiplier, name) with inclusive ends, highest
+    precedence first; where they overlap the earliest one wins.
+    """
+    ordered = sorted((start, rank, end, multiplier, name)
+                     for rank, (start, end, multiplier, name) in enumerate(intervals) if start <= end)
+    boundaries = sorted({start for start, *_ in ordered} | {end + timedelta(days=1) for _, _, end, _, _ in ordered})
+
+    segments, active, i = [], [], 0
+    for lo, hi in zip(boundaries, boundaries[1:]):
+        while i < len(ordered) and ordered[i][0] <= lo:
+            start, rank, end, multiplier, name = ordered[i]
+            heapq.heappush(active, (rank, end, multiplier, name))
+            i += 1
+        while active and active[0][1] < lo:
+            heapq.heappop(active)
+        if not active:
+            continue
+        _, _, multiplier, name = active[0]
+        end = hi - timedelta(days=1)
+        if segments and segments[-1][1] + timedelta(days=1) == lo and segments[-1][2:] == (multiplier, name):
+            segments[-1] = (segments[-1][0], end, multiplier, name)
+        else:
+            segments.append((lo, end, multiplier, name))
+    return segments
+
+
+class CalendarIndex:
+    """Sorted non-overlapping date segments with bisect lookups; days outside every segment are 1.0."""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self._starts = [segment[0] for segment in segments]
+
+    def __len__(self):
+        return len(self.segments)
+
+    def _find(self, day):
+        i = bisect_right(self._starts, day) - 1
+        if i >= 0 and self.segments[i][1] >= day:
+            return self.segments[i]
+        return None
+
+    def multiplier(self, day):
+        segment = self._find(day)
+        return segment[2] if segment else 1.0
+
+    def event(self, day):
+        """Name of the event in effect on day, or None."""
+        segment = self._find(day)
+        return segment[3] if segment else None
+
+    def overlapping(self, start, end):
+        """Segments intersecting start..end (inclusive), clipped to it."""
+        i = max(0, bisect_right(self._starts, start) - 1)
+        out = []
+        while i < len(self.segments) and self.segments[i][0] <= end:
+            seg_start, seg_end, multiplier, name = self.segments[i]
+            if seg_end >= start:
+                out.append((max(seg_start, start), min(seg_end, end), multiplier, name))
+            i += 1
+        return out
+
+    def multipliers(self, start, end):
+        """{date: multiplier} for every day from start to end inclusive."""
+        result = {start + timedelta(days=n): 1.0 for n in range((end - start).days + 1)}
+        for seg_start, seg_end, multiplier, _ in self.overlapping(start, end):
+            for n in range((seg_end - seg_start).days + 1):
+                result[seg_start + timedelta(days=n)] = multiplier
+        return result
+
+
+class CalendarCache:
+    """One CalendarIndex per process, reloaded from calendar_events after the TTL or invalidate()."""
+
+    def __init__(self, ttl=CALENDAR_CACHE_TTL):
+        self.ttl = ttl
+        self._index = None
+        self._events = []
+        self._years = (0, -1)
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def index(self, start, end=None, cur=None):
+        """The CalendarIndex, covering built-in windows for every year from start to end.
+
+        cur: the caller's cursor to reload calendar_events with, if it holds one.
+        """
+        end = end or start
+        now = time.monotonic()
+        with self._lock:
+            fresh = self._index is not None and self._expires_at > now
+            if fresh and self._years[0] <= start.year and end.year <= self._years[1]:
+                self.hits += 1
+                return self._index
+            self.misses += 1
+            events = self._events
+            first, last = self._years if fresh else (start.year, end.year)
+            generation = self._generation
+
+        failed = False
+        if not fresh:
+            # On a failed read this call uses the last events that did load (or
+            # built-ins only), and nothing is cached so the next call retries
+            loaded = self._load(cur)
+            failed = loaded is None
+            if not failed:
+                events = loaded
+        first, last = min(first, start.year), max(last, end.year)
+        index = self._build(events, first, last)
+        with self._lock:
+            # An invalidate() while this was loading may have missed the write it
+            # announced: answer this call, but leave the next one to reload
+            if not failed and self._generation == generation:
+                self._index, self._events, self._years = index, events, (first, last)
+                if not fresh:
+                    self._expires_at = now + self.ttl
+        return index
+
+    def multiplier(self, day, cur=None):
+        return self.index(day, cur=cur).multiplier(day)
+
+    def multipliers(self, start, end, cur=None):
+        return self.index(start, end, cur=cur).multipliers(start, end)
+
+    @staticmethod
+    def _build(events, first_year, last_year):
+        by_date = {}
+        for event_date, multiplier, name in events:
+            total, names = by_date.get(event_date, (1.0, []))
+            by_date[event_date] = (total * multiplier, names + [name])
+        intervals = [(day, day, total, " + ".join(names)) for day, (total, names) in by_date.items()]
+        for year in range(first_year, last_year + 1):
+            intervals.extend(holiday_windows(year))
+        return CalendarIndex(flatten(intervals))
+
+    @staticmethod
+    def _select(cur):
+        cur.execute("""
+            SELECT event_date, multiplier, event_name
+            FROM calendar_events
+            WHERE event_date IS NOT NULL AND multiplier IS NOT NULL
+        """)
+        return [(row["event_date"], float(row["multiplier"]), row["event_name"] or "Calendar event")
+                for row in cur.fetchall()]
+
+    def _load(self, cur=None):
+        """[(event_date, multiplier, name), ...] from calendar_events, or None if it can't be read.
+
+        With cur the read runs behind a savepoint, so a failure leaves the
+        caller's transaction usable; otherwise it uses a pooled connection.
+        """
+        if cur is not None:
+            cur.execute("SAVEPOINT calendar_events")
+            try:
+                events = self._select(cur)
+                cur.execute("RELEASE SAVEPOINT calendar_events")
+                return events
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT calendar_events")
+                cur.execute("RELEASE SAVEPOINT calendar_events")
+                print(f"[CALENDAR] Could not load calendar_events: {e}", flush=True)
+                return None
+
+        try:
+            conn = get_connection()
+        except Exception as e:
+            print(f"[CALENDAR] Could not load calendar_events: {e}", flush=True)
+            return None
+        try:
+            with conn.cursor() as own_cur:
+                events = self._select(own_cur)
+            conn.rollback()
+        except Exception as e:
+            conn.rollback()
+            print(f"[CALENDAR] Could not load calendar_events: {e}", flush=True)
+            return None
+        finally:
+            return_connection(conn)
+        return events
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+            self._expires_at = 0.0
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._index) if self._index is not None else 0, "hits": self.hits, "misses": self.misses}
+
+
+calendar_cache = CalendarCache()
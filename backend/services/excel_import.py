@@ -1,6 +1,7 @@
+import time
 from flask import Blueprint, request, jsonify
-import pandas as pd
 from models.db import get_connection, return_connection
+from utils.metrics import record_job
 
 excel_bp = Blueprint("excel", __name__, url_prefix="/excel")
 
@@ -9,6 +10,9 @@ def upload_excel():
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
+    import pandas as pd  # deferred: pandas dominates worker boot time
+
+    started = time.perf_counter()
     file = request.files["file"]
     df = pd.read_excel(file)
 
@@ -23,6 +27,7 @@ def upload_excel():
     cur = conn.cursor()
 
     inserted = 0
+    rows_written = 0
 
     try:
         for _, row in df.iterrows():
@@ -41,6 +46,7 @@ def upload_excel():
                     ON CONFLICT (store_id, product_id, production_date)
                     DO UPDATE SET quantity_produced = EXCLUDED.quantity_produced
                 """, (store_id, product_id, date, produced))
+                rows_written += 1
 
             if waste > 0:
                 cur.execute("""
@@ -50,6 +56,7 @@ def upload_excel():
                     ON CONFLICT (store_id, product_id, throwaway_date)
                     DO UPDATE SET quantity_thrown = EXCLUDED.quantity_thrown
                 """, (store_id, product_id, date, waste))
+                rows_written += 1
 
             inserted += 1
 
@@ -57,12 +64,14 @@ def upload_excel():
 
     except Exception as e:
         conn.rollback()
+        record_job("excel_import", time.perf_counter() - started, ok=False)
         return jsonify({"error": str(e)}), 500
 
     finally:
         cur.close()
         return_connection(conn)
 
+    record_job("excel_import", time.perf_counter() - started, rows_written)
     return jsonify({
         "message": "Excel uploaded successfully",
         "rows_processed": inserted
@@ -1,53 +1,74 @@
-def compute_forecast_accuracy(cur, store_id, target_date):
-    cur.execute("""
+"""
+Forecast accuracy
+Compares the production plan against what was actually produced / thrown away
+and upserts forecast_accuracy in one INSERT ... SELECT, for any set of stores
+and any date range (a year-long backfill is still a single statement), then
+refreshes the accuracy summary for those stores.
+"""
+from services.accuracy_summary import refresh_accuracy_summary
+
+
+def compute_forecast_accuracy(cur, store_id=None, start_date=None, end_date=None):
+    """Upsert forecast_accuracy rows for plans with recorded throwaway data.
+
+    store_id: one id, a list of ids, or None for every store.
+    start_date / end_date: inclusive production_date range; end_date defaults
+    to start_date, so compute_forecast_accuracy(cur, store_id, target_date)
+    handles a single day. None on both sides means no date bound.
+    Returns the number of forecast_accuracy rows written.
+    """
+    if end_date is None:
+        end_date = start_date
+
+    filters = ["dt.produced IS NOT NULL", "dt.waste IS NOT NULL"]
+    params = []
+    if store_id is not None:
+        filters.append("dp.store_id = ANY(%s)")
+        params.append(list(store_id) if isinstance(store_id, (list, tuple, set)) else [store_id])
+    if start_date is not None:
+        filters.append("dp.production_date >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        filters.append("dp.production_date <= %s")
+        params.append(end_date)
+
+    cur.execute(f"""
+        INSERT INTO forecast_accuracy
+        (store_id, product_id, target_date,
+         planned_quantity, actual_produced,
+         actual_sold, actual_waste,
+         error_quantity, error_percent)
         SELECT
+            dp.store_id,
             dp.product_id,
+            dp.production_date,
             dp.planned_quantity,
             dt.produced,
-            dt.waste
+            dt.produced - dt.waste,
+            dt.waste,
+            (dt.produced - dt.waste) - dp.planned_quantity,
+            CASE
+                WHEN dp.planned_quantity > 0
+                THEN ((dt.produced - dt.waste) - dp.planned_quantity) * 100.0 / dp.planned_quantity
+                ELSE 0
+            END
         FROM daily_production_plan dp
         JOIN daily_throwaway dt
           ON dp.store_id = dt.store_id
          AND dp.product_id = dt.product_id
          AND dp.production_date = dt.date
-        WHERE dp.store_id = %s
-          AND dp.production_date = %s;
-    """, (store_id, target_date))
-
-    rows = cur.fetchall()
-
-    for r in rows:
-        sold = r["produced"] - r["waste"]
-        error_qty = sold - r["planned_quantity"]
-
-        error_pct = (
-            (error_qty / r["planned_quantity"]) * 100
-            if r["planned_quantity"] > 0 else 0
-        )
+        WHERE {" AND ".join(filters)}
+        ON CONFLICT (store_id, product_id, target_date)
+        DO UPDATE SET
+          planned_quantity = EXCLUDED.planned_quantity,
+          actual_produced = EXCLUDED.actual_produced,
+          actual_sold = EXCLUDED.actual_sold,
+          actual_waste = EXCLUDED.actual_waste,
+          error_quantity = EXCLUDED.error_quantity,
+          error_percent = EXCLUDED.error_percent,
+          created_at = now();
+    """, params)
+    written = cur.rowcount
 
-        cur.execute("""
-            INSERT INTO forecast_accuracy
-            (store_id, product_id, target_date,
-             planned_quantity, actual_produced,
-             actual_sold, actual_waste,
-             error_quantity, error_percent)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            ON CONFLICT (store_id, product_id, target_date)
-            DO UPDATE SET
-              actual_produced = EXCLUDED.actual_produced,
-              actual_sold = EXCLUDED.actual_sold,
-              actual_waste = EXCLUDED.actual_waste,
-              error_quantity = EXCLUDED.error_quantity,
-              error_percent = EXCLUDED.error_percent,
-              created_at = now();
-        """, (
-            store_id,
-            r["product_id"],
-            target_date,
-            r["planned_quantity"],
-            r["produced"],
-            sold,
-            r["waste"],
-            error_qty,
-            error_pct
-        ))
+    refresh_accuracy_summary(cur, store_id)
+    return written
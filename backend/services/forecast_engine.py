@@ -1,4 +1,4 @@
-from statistics import mean
+from services.forecast_models import get_model
 
 def apply_learning(cur, store_id, product_id, base_qty):
     cur.execute("""
@@ -11,10 +11,10 @@ def apply_learning(cur, store_id, product_id, base_qty):
     if not row:
         return base_qty, 0
 
-    adj = int(base_qty * row["avg_error_pct"])
+    adj = int(base_qty * float(row["avg_error_pct"]))
     return max(0, base_qty + adj), adj
 
-def generate_forecast(cur, store_id, target_date, expectation):
+def generate_forecast(cur, store_id, target_date, expectation, model_version="weekday-mean-9"):
 
     CONTEXT_MULTIPLIERS = {
         "busy": 1.15,
@@ -25,8 +25,6 @@ def generate_forecast(cur, store_id, target_date, expectation):
 
     multiplier = CONTEXT_MULTIPLIERS.get(expectation, 1.0)
 
-    weekday = target_date.weekday()  # Monday = 0
-
     cur.execute("""
         SELECT product_id, product_name
         FROM public.products
@@ -34,35 +32,19 @@ def generate_forecast(cur, store_id, target_date, expectation):
     """)
     products = cur.fetchall()
 
+    # Every product's estimate in one query (see services/forecast_models.py)
+    model = get_model(model_version)
+    predictions = model.predict(cur, store_id, target_date)
+
     forecasts = []
 
     for p in products:
         product_id = p["product_id"]
         product_name = p["product_name"]
 
-        # Fetch last 9 matching weekdays
-        cur.execute("""
-            SELECT
-              produced,
-              waste,
-              (produced - waste) AS sold
-            FROM public.daily_throwaway
-            WHERE store_id = %s
-              AND product_id = %s
-              AND EXTRACT(DOW FROM date) = %s
-              AND produced IS NOT NULL
-              AND waste IS NOT NULL
-            ORDER BY date DESC
-            LIMIT 9;
-        """, (store_id, product_id, weekday))
-
-        rows = cur.fetchall()
-        if len(rows) == 0:
+        if product_id not in predictions:
             continue
-
-        sold_values = [r["sold"] for r in rows]
-        avg_sold = mean(sold_values)
-        count = len(sold_values)
+        avg_sold, count = predictions[product_id]
 
         confidence = (
             "high" if count >= 6 else
@@ -92,7 +74,8 @@ def generate_forecast(cur, store_id, target_date, expectation):
             "avg_sold": round(avg_sold, 1),
             "confidence": confidence,
             "expectation": expectation,
-            "multiplier_used": multiplier
+            "multiplier_used": multiplier,
+            "model_version": model_version
         })
 
     return forecasts
@@ -0,0 +1,256 @@
+"""
+Exponential-smoothing forecast state (model_version 'ets-v2')
+Keeps a damped-trend (Holt) level and trend per (store, ISO weekday, product)
+in forecast_ets_state and folds new daily_throwaway rows into it as they land,
+so a forecast is one indexed read of the store's rows for that weekday and
+O(products) arithmetic, with no history scan.
+
+Each weekday is its own weekly series. Observing y (units sold) k weeks after
+the previous observation updates the state as
+    predicted = level + damped(k) * trend
+    level'    = alpha * y + (1 - alpha) * predicted
+    trend'    = beta * (level' - level) / k + (1 - beta) * phi ** k * trend
+with damped(h) = phi + phi**2 + ... + phi**h; the forecast h weeks after the
+last observation is level + damped(h) * trend. A new series starts at
+level = y, trend = 0.
+
+The state before the latest observation is kept (prev_*), so rewriting that
+day's row (approvals add waste to an existing day) refolds it in O(1). A row
+older than that rebuilds just its series from daily_throwaway.
+"""
+
+import os
+from collections import defaultdict
+
+from psycopg2.extras import execute_values
+
+ETS_MODEL_VERSION = "ets-v2"
+# Weight of the newest observation in the level, and of the newest level change in the trend
+ETS_ALPHA = float(os.getenv("ETS_ALPHA", "0.3"))
+ETS_BETA = float(os.getenv("ETS_BETA", "0.1"))
+# Trend damping per week; < 1 flattens the trend the further ahead we forecast
+ETS_PHI = float(os.getenv("ETS_PHI", "0.9"))
+
+_STATE_FIELDS = ("level", "trend", "observations", "last_date")
+_SOLD = "GREATEST(COALESCE(produced, 0) - COALESCE(waste, 0), 0)"
+# Only rows with a production count are observations of demand. Waste-only rows
+# (daily entry, QR waste submissions: produced NULL) and rows created by waste
+# approval (produced 0) would otherwise fold in as zero sales.
+_OBSERVED = "produced IS NOT NULL AND produced > 0"
+
+_UPSERT_SQL = """
+    INSERT INTO forecast_ets_state
+        (store_id, isodow, product_id, level, trend, observations, last_date,
+         prev_level, prev_trend, prev_observations, prev_date)
+    VALUES %s
+    ON CONFLICT (store_id, isodow, product_id) DO UPDATE SET
+        level = EXCLUDED.level,
+        trend = EXCLUDED.trend,
+        observations = EXCLUDED.observations,
+        last_date = EXCLUDED.last_date,
+        prev_level = EXCLUDED.prev_level,
+        prev_trend = EXCLUDED.prev_trend,
+        prev_observations = EXCLUDED.prev_observations,
+        prev_date = EXCLUDED.prev_date,
+        updated_at = now();
+"""
+
+
+def damped(h, phi=ETS_PHI):
+    """phi + phi**2 + ... + phi**h (h may be a NumPy array)"""
+    if phi == 1:
+        return h * 1.0
+    return phi * (1 - phi ** h) / (1 - phi)
+
+
+def fold(state, sold, on_date, alpha=ETS_ALPHA, beta=ETS_BETA, phi=ETS_PHI):
+    """State after observing `sold` on `on_date`; `state` is None for a new series."""
+    if state is None:
+        return {"level": float(sold), "trend": 0.0, "observations": 1, "last_date": on_date, "prev": None}
+    k = max(1, (on_date - state["last_date"]).days // 7)
+    predicted = state["level"] + damped(k, phi) * state["trend"]
+    level = alpha * sold + (1 - alpha) * predicted
+    trend = beta * (level - state["level"]) / k + (1 - beta) * phi ** k * state["trend"]
+    return {
+        "level": level,
+        "trend": trend,
+        "observations": state["observations"] + 1,
+        "last_date": on_date,
+        "prev": {field: state[field] for field in _STATE_FIELDS},
+    }
+
+
+def predict(state, target_date, phi=ETS_PHI):
+    """Forecast units sold on target_date (same weekday as the state's series)."""
+    h = max(0, (target_date - state["last_date"]).days // 7)
+    return max(0.0, state["level"] + damped(h, phi) * state["trend"])
+
+
+def _replay(observations, state=None):
+    for on_date, sold in observations:
+        state = fold(state, sold, on_date)
+    return state
+
+
+def _from_row(row):
+    state = {field: row[field] for field in _STATE_FIELDS}
+    state["prev"] = None
+    if row.get("prev_date") is not None:
+        state["prev"] = {
+            "level": row["prev_level"],
+            "trend": row["prev_trend"],
+            "observations": row["prev_observations"],
+            "last_date": row["prev_date"],
+        }
+    return state
+
+
+def _upsert(cur, store_id, states):
+    rows = []
+    for (isodow, product_id), state in states.items():
+        prev = state["prev"] or {}
+        rows.append((store_id, isodow, product_id, state["level"], state["trend"], state["observations"],
+                     state["last_date"], prev.get("level"), prev.get("trend"), prev.get("observations"),
+                     prev.get("last_date")))
+    if rows:
+        execute_values(cur, _UPSERT_SQL, rows)
+
+
+def _series(rows, keys=None):
+    """{(isodow, product_id): [(date, sold), ...]} from date-ordered rows."""
+    series = defaultdict(list)
+    for row in rows:
+        key = (row["date"].isoweekday(), row["product_id"])
+        if keys is None or key in keys:
+            series[key].append((row["date"], row["sold"]))
+    return series
+
+
+def update_ets_state(cur, store_id, dates):
+    """Fold the store's daily_throwaway rows on `dates` into forecast_ets_state.
+
+    Call after writing those rows, in the same transaction. Costs O(rows on
+    those dates) unless a row predates its series' latest observation, which
+    rebuilds that series. Returns the number of state rows written.
+    """
+    dates = sorted({str(d) for d in dates if d is not None})
+    if not dates:
+        return 0
+
+    cur.execute(f"""
+        SELECT product_id, date, {_SOLD} AS sold
+        FROM daily_throwaway
+        WHERE store_id = %s AND date = ANY(%s::date[]) AND {_OBSERVED}
+        ORDER BY date
+    """, (store_id, dates))
+    new = _series(cur.fetchall())
+    if not new:
+        return 0
+
+    cur.execute("""
+        SELECT isodow, product_id, level, trend, observations, last_date,
+               prev_level, prev_trend, prev_observations, prev_date
+        FROM forecast_ets_state
+        WHERE store_id = %s AND isodow = ANY(%s) AND product_id = ANY(%s)
+    """, (store_id, sorted({k[0] for k in new}), sorted({k[1] for k in new})))
+    states = {(row["isodow"], row["product_id"]): _from_row(row) for row in cur.fetchall()}
+
+    updated, stale = {}, set()
+    for key, observations in new.items():
+        state = states.get(key)
+        first_date = observations[0][0]
+        if state is None or first_date > state["last_date"]:
+            updated[key] = _replay(observations, state)
+        elif first_date == state["last_date"]:
+            # The latest observation was rewritten: refold it from the state before it
+            updated[key] = _replay(observations, state["prev"])
+        else:
+            stale.add(key)
+
+    if stale:
+        cur.execute(f"""
+            SELECT product_id, date, {_SOLD} AS sold
+            FROM daily_throwaway
+            WHERE store_id = %s
+              AND product_id = ANY(%s)
+              AND EXTRACT(ISODOW FROM date) = ANY(%s)
+              AND {_OBSERVED}
+            ORDER BY date
+        """, (store_id, sorted({k[1] for k in stale}), sorted({k[0] for k in stale})))
+        for key, observations in _series(cur.fetchall(), stale).items():
+            updated[key] = _replay(observations)
+
+    _upsert(cur, store_id, updated)
+    return len(updated)
+
+
+def fold_new_rows(cur, store_id, dates):
+    """update_ets_state behind a savepoint, for write paths that must not fail on it.
+
+    On error the state is left as it was (rebuild_ets_state repairs it) and the
+    caller's transaction stays usable.
+    """
+    cur.execute("SAVEPOINT forecast_ets_state")
+    try:
+        updated = update_ets_state(cur, store_id, dates)
+        cur.execute("RELEASE SAVEPOINT forecast_ets_state")
+        return updated
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT forecast_ets_state")
+        cur.execute("RELEASE SAVEPOINT forecast_ets_state")
+        print(f"[ETS] Could not update forecast state for store {store_id}: {e}", flush=True)
+        return 0
+
+
+def rebuild_ets_state(cur, store_id=None):
+    """Rebuild forecast_ets_state from the full daily_throwaway history.
+
+    store_id may be one id, a list of ids, or None for every store.
+    Returns the number of state rows written.
+    """
+    if store_id is None:
+        cur.execute(f"SELECT DISTINCT store_id FROM daily_throwaway WHERE {_OBSERVED} ORDER BY store_id")
+        store_ids = [row["store_id"] for row in cur.fetchall()]
+    else:
+        store_ids = list(store_id) if isinstance(store_id, (list, tuple, set)) else [store_id]
+
+    written = 0
+    for sid in store_ids:
+        cur.execute(f"""
+            SELECT product_id, date, {_SOLD} AS sold
+            FROM daily_throwaway
+            WHERE store_id = %s AND {_OBSERVED}
+            ORDER BY date
+        """, (sid,))
+        states = {key: _replay(observations) for key, observations in _series(cur.fetchall()).items()}
+        cur.execute("DELETE FROM forecast_ets_state WHERE store_id = %s", (sid,))
+        _upsert(cur, sid, states)
+        written += len(states)
+    return written
+
+
+def _read_state(cur, store_id, isodow):
+    cur.execute("""
+        SELECT product_id, level, trend, observations, last_date
+        FROM forecast_ets_state
+        WHERE store_id = %s AND isodow = %s
+    """, (store_id, isodow))
+    return cur.fetchall()
+
+
+def ets_predictions(cur, store_id, target_date):
+    """{product_id: {"quantity": float, "observations": int}} for target_date.
+
+    Reads only the state rows for the target weekday. A store without any state
+    yet (history imported before the model existed) is built once from history.
+    """
+    isodow = target_date.isoweekday()
+    rows = _read_state(cur, store_id, isodow)
+    if not rows:
+        cur.execute("SELECT 1 FROM forecast_ets_state WHERE store_id = %s LIMIT 1", (store_id,))
+        if cur.fetchone() is None and rebuild_ets_state(cur, store_id):
+            rows = _read_state(cur, store_id, isodow)
+    return {
+        row["product_id"]: {"quantity": predict(row, target_date), "observations": row["observations"]}
+        for row in rows
+    }
@@ -1,48 +1,89 @@
-from datetime import date, timedelta
+"""
+Forecast learning state
+Keeps a per-(store, product) exponentially weighted mean of forecast error,
+folded forward incrementally: each approved forecast with actual_sold is
+consumed once (forecast_history.learned_at marks it) in a single set-based
+statement, so a refresh costs O(new observations).
 
-LOOKBACK_DAYS = 7
-MAX_ADJUSTMENT_PCT = 0.15  # ±15% cap
+A batch of k new observations x_1..x_k (oldest first) updates the state as
+    m = sum(w_i * x_i) / sum(w_i),   w_i = alpha * (1 - alpha) ** (k - i)
+    new = old * (1 - alpha) ** k + m * (1 - (1 - alpha) ** k)
+which is the same as applying the EWMA one observation at a time. A product
+with no prior state starts from m.
+"""
 
-def update_learning(cur, store_id):
-    since = date.today() - timedelta(days=LOOKBACK_DAYS)
+import os
 
-    cur.execute("""
-        SELECT
-            product_id,
-            AVG(forecast_error) AS avg_error,
-            AVG(error_pct) AS avg_error_pct,
-            COUNT(*) AS n
-        FROM forecast_history
-        WHERE store_id = %s
-          AND status = 'approved'
-          AND target_date >= %s
+MAX_ADJUSTMENT_PCT = 0.15  # ±15% cap
+# Weight of the newest observation; 0.25 gives roughly the last week most of the say
+LEARNING_ALPHA = float(os.getenv("LEARNING_ALPHA", "0.25"))
+
+_UPDATE_SQL = """
+    WITH observed AS (
+        UPDATE forecast_history
+        SET learned_at = now()
+        WHERE status = 'approved'
           AND actual_sold IS NOT NULL
-        GROUP BY product_id;
-    """, (store_id, since))
-
-    rows = cur.fetchall()
-
-    for r in rows:
-        adj_pct = max(
-            -MAX_ADJUSTMENT_PCT,
-            min(MAX_ADJUSTMENT_PCT, r["avg_error_pct"])
-        )
-
-        cur.execute("""
-            INSERT INTO forecast_learning
-            (store_id, product_id, avg_error, avg_error_pct, sample_size, last_updated)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (store_id, product_id)
-            DO UPDATE SET
-                avg_error = EXCLUDED.avg_error,
-                avg_error_pct = EXCLUDED.avg_error_pct,
-                sample_size = EXCLUDED.sample_size,
-                last_updated = EXCLUDED.last_updated;
-        """, (
+          AND forecast_error IS NOT NULL
+          AND error_pct IS NOT NULL
+          AND learned_at IS NULL
+          {store_filter}
+        RETURNING store_id, product_id, target_date, forecast_error, error_pct
+    ),
+    weighted AS (
+        SELECT
             store_id,
-            r["product_id"],
-            r["avg_error"],
-            adj_pct,
-            r["n"],
-            date.today()
-        ))
+            product_id,
+            target_date,
+            forecast_error,
+            error_pct,
+            %(alpha)s * power(
+                1 - %(alpha)s,
+                COUNT(*) OVER (PARTITION BY store_id, product_id)
+                    - ROW_NUMBER() OVER (PARTITION BY store_id, product_id ORDER BY target_date)
+            ) AS weight
+        FROM observed
+    )
+    INSERT INTO forecast_learning AS fl
+        (store_id, product_id, avg_error, avg_error_pct, ewma_error_pct,
+         sample_size, last_target_date, last_updated)
+    SELECT
+        store_id,
+        product_id,
+        SUM(weight * forecast_error) / SUM(weight),
+        GREATEST(-%(cap)s, LEAST(%(cap)s, SUM(weight * error_pct) / SUM(weight))),
+        SUM(weight * error_pct) / SUM(weight),
+        COUNT(*),
+        MAX(target_date),
+        CURRENT_DATE
+    FROM weighted
+    GROUP BY store_id, product_id
+    ON CONFLICT (store_id, product_id) DO UPDATE SET
+        avg_error = fl.avg_error * power(1 - %(alpha)s, EXCLUDED.sample_size)
+            + EXCLUDED.avg_error * (1 - power(1 - %(alpha)s, EXCLUDED.sample_size)),
+        ewma_error_pct = COALESCE(fl.ewma_error_pct, fl.avg_error_pct) * power(1 - %(alpha)s, EXCLUDED.sample_size)
+            + EXCLUDED.ewma_error_pct * (1 - power(1 - %(alpha)s, EXCLUDED.sample_size)),
+        avg_error_pct = GREATEST(-%(cap)s, LEAST(%(cap)s,
+            COALESCE(fl.ewma_error_pct, fl.avg_error_pct) * power(1 - %(alpha)s, EXCLUDED.sample_size)
+            + EXCLUDED.ewma_error_pct * (1 - power(1 - %(alpha)s, EXCLUDED.sample_size)))),
+        sample_size = fl.sample_size + EXCLUDED.sample_size,
+        last_target_date = GREATEST(fl.last_target_date, EXCLUDED.last_target_date),
+        last_updated = EXCLUDED.last_updated;
+"""
+
+
+def update_learning(cur, store_id=None, alpha=LEARNING_ALPHA):
+    """Fold new approved observations into forecast_learning.
+
+    store_id may be one id, a list of ids, or None for every store (bulk mode).
+    Returns the number of (store, product) rows updated.
+    """
+    params = {"alpha": alpha, "cap": MAX_ADJUSTMENT_PCT}
+    if store_id is None:
+        store_filter = ""
+    else:
+        store_filter = "AND store_id = ANY(%(store_ids)s)"
+        params["store_ids"] = list(store_id) if isinstance(store_id, (list, tuple, set)) else [store_id]
+
+    cur.execute(_UPDATE_SQL.format(store_filter=store_filter), params)
+    return cur.rowcount
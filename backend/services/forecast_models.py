@@ -0,0 +1,299 @@
+"""
+Forecast model registry
+Every demand model the app can serve or backtest, keyed by the model_version
+stored in forecast_history. Each model answers two questions:
+
+- predict(cur, store_id, target_date): live estimate for one day, as
+  {product_id: (quantity, points)} for every product with usable history
+- backtest(history): NumPy array [products, days] with the estimate for every
+  day of a StoreHistory using only the days before it (NaN when none)
+
+Both paths implement the same rule, so a backtest measures what the live
+endpoint would have produced. `produces` is "demand" (units expected to sell;
+the caller turns it into a production plan with the waste-target divisor) or
+"production" (already a production quantity).
+
+Models:
+  v1             mean sold over the last 4 same-weekday days (routes/forecast.py);
+                 falls back to the last 4 days of any weekday
+  weekday-mean-9 mean sold over the last 9 same-weekday days with both produced and
+                 waste recorded (services/forecast_engine.py)
+  waste-ratio    mean produced over the last 4 same-weekday days, trimmed 10% when
+                 waste ran over 20% and padded 5% when under 5%
+  ets-v2         damped-trend exponential smoothing per weekday (services/forecast_ets.py)
+
+predict() is plain Python; NumPy is only imported by the backtest code paths so
+the API workers (routes/forecast.py imports this module) don't load it at boot.
+"""
+
+import math
+from collections import defaultdict
+
+from services import forecast_ets
+from services.forecast_ets import ETS_MODEL_VERSION, ets_predictions
+
+_RECENT_SQL = """
+    SELECT product_id, sold, produced, waste
+    FROM (
+        SELECT
+            product_id,
+            GREATEST(COALESCE(produced, 0) - COALESCE(waste, 0), 0) AS sold,
+            COALESCE(produced, 0) AS produced,
+            COALESCE(waste, 0) AS waste,
+            ROW_NUMBER() OVER (PARTITION BY product_id ORDER BY date DESC) AS recency
+        FROM daily_throwaway
+        WHERE store_id = %(store_id)s
+          AND date {date_op} %(target_date)s
+          {weekday_filter}
+          {complete_filter}
+    ) recent
+    WHERE recency <= %(points)s
+"""
+
+
+def recent_rows(cur, store_id, target_date, points, same_weekday=True, inclusive=False, complete_only=False):
+    """{product_id: [row, ...]} with each product's last `points` daily_throwaway rows before target_date.
+
+    complete_only skips rows where produced or waste is NULL instead of counting them as 0.
+    """
+    cur.execute(_RECENT_SQL.format(
+        date_op="<=" if inclusive else "<",
+        weekday_filter="AND EXTRACT(ISODOW FROM date) = %(isodow)s" if same_weekday else "",
+        complete_filter="AND produced IS NOT NULL AND waste IS NOT NULL" if complete_only else "",
+    ), {"store_id": store_id, "target_date": target_date, "points": points, "isodow": target_date.isoweekday()})
+    rows = defaultdict(list)
+    for row in cur.fetchall():
+        rows[row["product_id"]].append(row)
+    return rows
+
+
+def waste_target_divisor(min_pct=8.0, max_pct=12.0):
+    """Production = demand / divisor, aiming at the middle of the manager's waste target range."""
+    target_waste_ratio = max(0.0, min(0.4, ((min_pct + max_pct) / 2.0) / 100.0))
+    return max(0.6, 1.0 - target_waste_ratio)
+
+
+class StoreHistory:
+    """A store's full daily_throwaway history as dense [products, days] arrays (NaN = no row).
+
+    NULL produced/waste are stored as 0 (as the live queries COALESCE them);
+    `complete` marks rows where both were recorded (defaults to every row).
+    """
+
+    def __init__(self, store_id, product_ids, start_date, produced, waste, complete=None):
+        import numpy as np
+
+        self.store_id = store_id
+        self.product_ids = product_ids
+        self.start_date = start_date
+        self.produced = produced
+        self.waste = waste
+        self.valid = ~np.isnan(produced)
+        self.complete = self.valid if complete is None else complete & self.valid
+        self.sold = np.where(self.valid, np.maximum(produced - waste, 0.0), np.nan)
+
+    @property
+    def days(self):
+        return self.produced.shape[1]
+
+
+def _trailing_sums(arrays, valid, points):
+    """Sums over the last `points` valid entries strictly before each column, and how many there were.
+
+    arrays: list of [series, T] arrays sharing the `valid` mask. Vectorised: valid
+    values are packed to the left per row so prefix sums index by count, not position.
+    """
+    import numpy as np
+
+    rows = valid.shape[0]
+    order = np.argsort(~valid, axis=1, kind="stable")
+    seen = np.concatenate([np.zeros((rows, 1), dtype=np.int64), np.cumsum(valid, axis=1)[:, :-1]], axis=1)
+    low = np.maximum(seen - points, 0)
+    sums = []
+    for values in arrays:
+        packed = np.take_along_axis(np.where(valid, values, 0.0), order, axis=1)
+        prefix = np.concatenate([np.zeros((rows, 1)), np.cumsum(packed, axis=1)], axis=1)
+        sums.append(np.take_along_axis(prefix, seen, axis=1) - np.take_along_axis(prefix, low, axis=1))
+    return sums, seen - low
+
+
+def _by_weekday(values, fill):
+    """[P, D] -> [P * 7, W]: one row per (product, weekday) series, one column per week."""
+    import numpy as np
+
+    products, days = values.shape
+    weeks = -(-days // 7)
+    padded = np.full((products, weeks * 7), fill, dtype=values.dtype)
+    padded[:, :days] = values
+    return padded.reshape(products, weeks, 7).transpose(0, 2, 1).reshape(products * 7, weeks)
+
+
+def _from_weekday(values, products, days):
+    weeks = values.shape[1]
+    return values.reshape(products, 7, weeks).transpose(0, 2, 1).reshape(products, weeks * 7)[:, :days]
+
+
+def _weekday_means(history, points, mask):
+    """(mean sold, points used) over the last `points` same-weekday days in `mask`, as [P, D] arrays."""
+    import numpy as np
+
+    (sums,), counts = _trailing_sums([_by_weekday(history.sold, np.nan)], _by_weekday(mask, False), points)
+    products, days = history.sold.shape
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return _from_weekday(means, products, days), _from_weekday(counts, products, days)
+
+
+class ForecastModel:
+    version = None
+    description = ""
+    produces = "demand"
+
+    def predict(self, cur, store_id, target_date):
+        raise NotImplementedError
+
+    def backtest(self, history):
+        raise NotImplementedError
+
+
+class WeekdayMean(ForecastModel):
+    """Mean sold over the last `points` same-weekday days."""
+    produces = "demand"
+
+    def __init__(self, version, points, fallback, description, complete_only=False):
+        self.version = version
+        self.points = points
+        self.fallback = fallback
+        self.description = description
+        self.complete_only = complete_only
+
+    def predict(self, cur, store_id, target_date):
+        recent = recent_rows(cur, store_id, target_date, self.points, complete_only=self.complete_only)
+        if self.fallback:
+            # No same-weekday history yet: most recent days of any weekday
+            fallback = recent_rows(cur, store_id, target_date, self.points, same_weekday=False, inclusive=True)
+            for product_id, rows in fallback.items():
+                recent.setdefault(product_id, rows)
+        return {
+            product_id: (sum(float(r["sold"]) for r in rows) / len(rows), len(rows))
+            for product_id, rows in recent.items()
+        }
+
+    def backtest(self, history):
+        import numpy as np
+
+        means, counts = _weekday_means(history, self.points, history.complete if self.complete_only else history.valid)
+        if self.fallback:
+            # Strictly before each day here: the live fallback's `<=` would read the answer
+            (sums,), any_counts = _trailing_sums([history.sold], history.valid, self.points)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                any_means = np.where(any_counts > 0, sums / any_counts, np.nan)
+            means = np.where(counts > 0, means, any_means)
+        return means
+
+
+class WasteRatio(ForecastModel):
+    """Mean produced over recent same-weekday days, nudged by how much of it was wasted."""
+    produces = "production"
+
+    def __init__(self, version, points, description):
+        self.version = version
+        self.points = points
+        self.description = description
+
+    @staticmethod
+    def _factor(waste_ratio):
+        if waste_ratio > 0.20:
+            return 0.9
+        if waste_ratio < 0.05:
+            return 1.05
+        return 1.0
+
+    def predict(self, cur, store_id, target_date):
+        predictions = {}
+        for product_id, rows in recent_rows(cur, store_id, target_date, self.points).items():
+            produced = sum(float(r["produced"]) for r in rows)
+            if produced == 0:
+                predictions[product_id] = (0.0, len(rows))
+                continue
+            waste_ratio = sum(float(r["waste"]) for r in rows) / produced
+            predictions[product_id] = (float(math.floor(produced / len(rows) * self._factor(waste_ratio))), len(rows))
+        return predictions
+
+    def backtest(self, history):
+        import numpy as np
+
+        valid = _by_weekday(history.valid, False)
+        (produced, waste), counts = _trailing_sums(
+            [_by_weekday(history.produced, np.nan), _by_weekday(history.waste, np.nan)], valid, self.points)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            waste_ratio = waste / produced
+            factor = np.where(waste_ratio > 0.20, 0.9, np.where(waste_ratio < 0.05, 1.05, 1.0))
+            quantity = np.where(produced > 0, np.floor(produced / counts * factor), 0.0)
+        quantity = np.where(counts > 0, quantity, np.nan)
+        products, days = history.produced.shape
+        return _from_weekday(quantity, products, days)
+
+
+class DampedTrendETS(ForecastModel):
+    """Exponential smoothing with damped trend, one series per (product, weekday)."""
+    version = ETS_MODEL_VERSION
+    description = "damped-trend exponential smoothing per weekday (services/forecast_ets.py)"
+    produces = "demand"
+
+    def predict(self, cur, store_id, target_date):
+        return {
+            product_id: (prediction["quantity"], prediction["observations"])
+            for product_id, prediction in ets_predictions(cur, store_id, target_date).items()
+        }
+
+    def backtest(self, history):
+        import numpy as np
+
+        alpha, beta, phi = forecast_ets.ETS_ALPHA, forecast_ets.ETS_BETA, forecast_ets.ETS_PHI
+        sold = _by_weekday(history.sold, np.nan)
+        # Same observations as forecast_ets: rows with a production count only
+        valid = _by_weekday(history.valid & (np.nan_to_num(history.produced) > 0), False)
+        series, weeks = sold.shape
+
+        level = np.zeros(series)
+        trend = np.zeros(series)
+        last_week = np.full(series, -1)
+        predictions = np.full((series, weeks), np.nan)
+        # Same recurrence as forecast_ets.fold, one week at a time across every series
+        for week in range(weeks):
+            started = last_week >= 0
+            gap = np.maximum(week - last_week, 1)
+            forecast = level + forecast_ets.damped(gap, phi) * trend
+            predictions[:, week] = np.where(started, np.maximum(forecast, 0.0), np.nan)
+
+            observed = valid[:, week]
+            y = np.where(observed, sold[:, week], 0.0)
+            new_level = alpha * y + (1 - alpha) * forecast
+            new_trend = beta * (new_level - level) / gap + (1 - beta) * phi ** gap * trend
+            level = np.where(observed, np.where(started, new_level, y), level)
+            trend = np.where(observed & started, new_trend, np.where(observed, 0.0, trend))
+            last_week = np.where(observed, week, last_week)
+
+        products, days = history.sold.shape
+        return _from_weekday(predictions, products, days)
+
+
+MODELS = {
+    model.version: model
+    for model in (
+        WeekdayMean("v1", 4, True, "mean of the last 4 same-weekday days (routes/forecast.py)"),
+        WeekdayMean("weekday-mean-9", 9, False, "mean of the last 9 same-weekday days (services/forecast_engine.py)",
+                    complete_only=True),
+        WasteRatio("waste-ratio", 4, "recent production nudged by waste ratio"),
+        DampedTrendETS(),
+    )
+}
+
+
+def get_model(version):
+    """The registered model for a model_version; raises KeyError for unknown versions."""
+    try:
+        return MODELS[version]
+    except KeyError:
+        raise KeyError(f"Unknown forecast model {version!r}; expected one of: {', '.join(MODELS)}") from None
@@ -0,0 +1,154 @@
+"""
+Columnar history export for offline analytics
+Streams daily_throwaway, forecast_history and forecast_accuracy through a
+server-side cursor in fixed-size batches, converts each batch to an Arrow
+record batch and appends it to a Parquet file. Product names are dictionary
+encoded, so the file loads into pandas as a categorical column.
+"""
+
+import uuid
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import psycopg2.extensions
+
+DEFAULT_BATCH_SIZE = 10000
+
+_PRODUCT_NAME = pa.dictionary(pa.int32(), pa.string())
+
+# table -> (select list / from clause, date column used for range predicates, arrow schema)
+HISTORY_TABLES = {
+    "daily_throwaway": (
+        """
+        SELECT t.store_id, t.product_id, p.product_name, t.date,
+               t.produced, t.waste, t.source
+        FROM daily_throwaway t
+        JOIN products p ON p.product_id = t.product_id
+        """,
+        "date",
+        pa.schema([
+            ("store_id", pa.int32()),
+            ("product_id", pa.int32()),
+            ("product_name", _PRODUCT_NAME),
+            ("date", pa.date32()),
+            ("produced", pa.int32()),
+            ("waste", pa.int32()),
+            ("source", pa.string()),
+        ]),
+    ),
+    "forecast_history": (
+        """
+        SELECT t.store_id, t.product_id, p.product_name, t.forecast_date, t.target_date,
+               t.predicted_quantity, t.adjusted_quantity, t.final_quantity,
+               t.actual_sold, t.forecast_error, t.error_pct::float8 AS error_pct,
+               t.model_version, t.status, t.confidence,
+               t.context_multiplier::float8 AS context_multiplier
+        FROM forecast_history t
+        JOIN products p ON p.product_id = t.product_id
+        """,
+        "target_date",
+        pa.schema([
+            ("store_id", pa.int64()),
+            ("product_id", pa.int32()),
+            ("product_name", _PRODUCT_NAME),
+            ("forecast_date", pa.date32()),
+            ("target_date", pa.date32()),
+            ("predicted_quantity", pa.int32()),
+            ("adjusted_quantity", pa.int32()),
+            ("final_quantity", pa.int32()),
+            ("actual_sold", pa.int32()),
+            ("forecast_error", pa.int32()),
+            ("error_pct", pa.float64()),
+            ("model_version", pa.string()),
+            ("status", pa.string()),
+            ("confidence", pa.string()),
+            ("context_multiplier", pa.float64()),
+        ]),
+    ),
+    "forecast_accuracy": (
+        """
+        SELECT t.store_id, t.product_id, p.product_name, t.target_date,
+               t.planned_quantity, t.actual_produced, t.actual_sold, t.actual_waste,
+               t.error_quantity, t.error_percent::float8 AS error_percent
+        FROM forecast_accuracy t
+        JOIN products p ON p.product_id = t.product_id
+        """,
+        "target_date",
+        pa.schema([
+            ("store_id", pa.int32()),
+            ("product_id", pa.int32()),
+            ("product_name", _PRODUCT_NAME),
+            ("target_date", pa.date32()),
+            ("planned_quantity", pa.int32()),
+            ("actual_produced", pa.int32()),
+            ("actual_sold", pa.int32()),
+            ("actual_waste", pa.int32()),
+            ("error_quantity", pa.int32()),
+            ("error_percent", pa.float64()),
+        ]),
+    ),
+}
+
+
+def build_query(table, store_ids=None, start_date=None, end_date=None):
+    """SELECT for `table` with optional store/date predicates; returns (sql, params)."""
+    select_sql, date_column, _ = HISTORY_TABLES[table]
+    filters = []
+    params = []
+    if store_ids:
+        filters.append("t.store_id = ANY(%s)")
+        params.append(list(store_ids))
+    if start_date:
+        filters.append(f"t.{date_column} >= %s")
+        params.append(start_date)
+    if end_date:
+        filters.append(f"t.{date_column} <= %s")
+        params.append(end_date)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    return f"{select_sql} {where} ORDER BY t.store_id, t.{date_column}", params
+
+
+def _to_record_batch(rows, schema):
+    columns = list(zip(*rows))
+    arrays = []
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(columns[i], pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[i], field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_record_batches(conn, table, store_ids=None, start_date=None, end_date=None,
+                        batch_size=DEFAULT_BATCH_SIZE):
+    """Yield Arrow record batches read through a named (server-side) cursor.
+
+    Uses plain tuple rows rather than RealDictCursor and ends the read
+    transaction when done so the connection can go back to the pool.
+    """
+    schema = HISTORY_TABLES[table][2]
+    sql, params = build_query(table, store_ids, start_date, end_date)
+    cur = conn.cursor(name=f"history_export_{uuid.uuid4().hex}", cursor_factory=psycopg2.extensions.cursor)
+    try:
+        cur.itersize = batch_size
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield _to_record_batch(rows, schema)
+    finally:
+        cur.close()
+        conn.rollback()
+
+
+def write_parquet(conn, sink, table, store_ids=None, start_date=None, end_date=None,
+                  batch_size=DEFAULT_BATCH_SIZE):
+    """Write `table` to `sink` (path or binary file) as Parquet; returns rows written."""
+    schema = HISTORY_TABLES[table][2]
+    written = 0
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in iter_record_batches(conn, table, store_ids, start_date, end_date, batch_size):
+            writer.write_batch(batch)
+            written += batch.num_rows
+    return written
@@ -0,0 +1,129 @@
+"""
+Store PIN lookup cache for the public QR waste submission pages
+Holds a snapshot of every active store (store_id -> PIN digest), loaded with
+one query and refreshed after STORE_PIN_CACHE_TTL seconds. Unknown or inactive
+store ids are answered from the snapshot, so repeated scans and floods of
+bogus (distinct) store ids never reach Postgres or displace real entries.
+
+The cache is per worker process. change_store_pin invalidates the local copy;
+other workers pick up a new PIN within STORE_PIN_CACHE_TTL seconds.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+from models.db import get_connection, return_connection
+
+STORE_PIN_CACHE_TTL = float(os.getenv('STORE_PIN_CACHE_TTL', '30'))
+
+# Per-process key so cached PINs are never held in plaintext
+_DIGEST_KEY = secrets.token_bytes(32)
+
+
+def _pin_digest(pin):
+    return hmac.new(_DIGEST_KEY, str(pin).encode(), hashlib.sha256).digest()
+
+
+class StorePinEntry:
+    __slots__ = ('exists', 'pin_digest')
+
+    def __init__(self, exists, pin_digest):
+        self.exists = exists
+        self.pin_digest = pin_digest
+
+    @property
+    def pin_required(self):
+        return self.pin_digest is not None
+
+    def pin_matches(self, candidate):
+        """Constant-time comparison of a submitted PIN against the stored one."""
+        if self.pin_digest is None or not candidate:
+            return False
+        return hmac.compare_digest(_pin_digest(candidate), self.pin_digest)
+
+
+_UNKNOWN_STORE = StorePinEntry(False, None)
+
+
+class StorePinCache:
+    """Snapshot of StorePinEntry for every active store, keyed by store id."""
+
+    def __init__(self, ttl=STORE_PIN_CACHE_TTL):
+        self.ttl = ttl
+        self._stores = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, store_id):
+        """Return the StorePinEntry for store_id (exists=False for unknown/inactive stores)."""
+        return self._snapshot().get(store_id, _UNKNOWN_STORE)
+
+    def _snapshot(self):
+        with self._lock:
+            stores = self._stores
+            if stores is not None and self._expires_at > time.monotonic():
+                self.hits += 1
+                return stores
+            self.misses += 1
+
+        # One thread reloads; while a stale snapshot exists the others keep using it
+        if not self._load_lock.acquire(blocking=stores is None):
+            return stores
+        try:
+            with self._lock:
+                if self._stores is not None and self._expires_at > time.monotonic():
+                    return self._stores
+                generation = self._generation
+            try:
+                loaded = self._load()
+            except Exception as e:
+                if stores is None:
+                    raise
+                print(f"[STORE PIN] Could not refresh store PINs, keeping the previous snapshot: {e}", flush=True)
+                return stores
+            with self._lock:
+                # Don't keep a snapshot that an invalidate() (PIN change) raced with
+                if generation == self._generation:
+                    self._stores = loaded
+                    self._expires_at = time.monotonic() + self.ttl
+            return loaded
+        finally:
+            self._load_lock.release()
+
+    def _load(self):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT id, store_pin FROM stores WHERE is_active = true')
+                rows = cur.fetchall()
+            conn.rollback()
+        finally:
+            return_connection(conn)
+
+        stores = {}
+        for row in rows:
+            store_id, stored_pin = (row['id'], row['store_pin']) if isinstance(row, dict) else row
+            stores[store_id] = StorePinEntry(True, _pin_digest(stored_pin) if stored_pin else None)
+        return stores
+
+    def invalidate(self, store_id=None):
+        """Drop the snapshot so the next lookup reloads it (store_id is accepted for callers changing one store)."""
+        with self._lock:
+            self._generation += 1
+            self._stores = None
+            self._expires_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._stores or ()), "hits": self.hits, "misses": self.misses}
+
+
+store_pin_cache = StorePinCache()
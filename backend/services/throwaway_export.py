@@ -0,0 +1,316 @@
+"""
+Weekly throwaway export engine
+Renders the Dunkin AM/PM throwaway template into write-only openpyxl sheets,
+streaming rows instead of building the workbook in memory, and spools the
+finished file to disk so it can be sent with chunked transfer.
+
+Layout (per sheet):
+    - Row 1: Empty
+    - Row 2: DATE: and date values
+    - Row 3: Day names (SUN, MON, TUE, WED, THU, FRI, SAT) + PM TTL
+    - Row 4: AM/PM headers
+    - Rows 5+: Products organized by category
+    - Bottom rows: Donut and Munchkin Bought / Sold / Difference / Throwaway
+"""
+
+from datetime import timedelta
+
+from utils.streaming import new_spool
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+DAY_NAMES = ["SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"]
+
+CATEGORIES = [
+    ('croissant', 'Plain Croissants'),
+    ('bagel', 'Bagels'),
+    ('donut', 'Donuts'),
+    ('muffin', 'Muffins'),
+    ('munchkin', 'Munchkins'),
+    ('other', 'Other Items')
+]
+
+DONUT_KEYWORDS = ('donut', 'glazed', 'frosted', 'chocolate', 'jelly', 'bavarian', 'cruller', 'filled')
+
+_PRODUCT_ORDER_SQL = """
+    CASE {alias}product_type
+        WHEN 'croissant' THEN 1
+        WHEN 'bagel' THEN 2
+        WHEN 'donut' THEN 3
+        WHEN 'muffin' THEN 4
+        WHEN 'munchkin' THEN 5
+        ELSE 6
+    END,
+    {alias}product_name
+"""
+
+
+def week_dates(week_start):
+    return [week_start + timedelta(days=i) for i in range(7)]
+
+
+def smart_category(product_type, product_name):
+    """Reclassify 'other' products into donut/munchkin based on name keywords."""
+    # If already categorized, keep it unless it's 'other'
+    if product_type != 'other':
+        return product_type
+
+    name = product_name.lower()
+    if 'munchkin' in name or 'munch' in name:
+        return 'munchkin'
+    if any(keyword in name for keyword in DONUT_KEYWORDS):
+        return 'donut'
+    return 'other'
+
+
+def fetch_active_products(cur):
+    """Active products in template order."""
+    cur.execute(f"""
+        SELECT product_id, product_name, product_type
+        FROM products
+        WHERE is_active = TRUE
+        ORDER BY {_PRODUCT_ORDER_SQL.format(alias='')}
+    """)
+    return cur.fetchall()
+
+
+def fetch_throwaway_rows(cur, store_ids, start_date, end_date):
+    """produced/waste rows with activity for the given stores over [start_date, end_date]."""
+    cur.execute(f"""
+        SELECT
+            dt.store_id,
+            p.product_name,
+            p.product_type,
+            dt.date,
+            COALESCE(dt.produced, 0) AS produced,
+            COALESCE(dt.waste, 0) AS waste
+        FROM products p
+        INNER JOIN daily_throwaway dt ON p.product_id = dt.product_id
+            AND dt.store_id = ANY(%s)
+            AND dt.date BETWEEN %s AND %s
+        WHERE p.is_active = TRUE
+          AND (dt.produced > 0 OR dt.waste > 0)
+        ORDER BY dt.store_id, {_PRODUCT_ORDER_SQL.format(alias='p.')}, dt.date
+    """, (list(store_ids), start_date, end_date))
+    return cur.fetchall()
+
+
+def _bold(ws, value):
+    from openpyxl.cell import WriteOnlyCell  # deferred: keeps openpyxl out of worker boot
+    from openpyxl.styles import Font
+
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = Font(bold=True)
+    return cell
+
+
+def _row(ws, label=None, bold=False, cells=None):
+    """Build a 16-column row: label in A, `cells` maps 1-based column -> value."""
+    row = [None] * 16
+    if label is not None:
+        row[0] = _bold(ws, label) if bold else label
+    for col, value in (cells or {}).items():
+        row[col - 1] = value
+    return row
+
+
+def _day_header_rows(ws):
+    yield _row(ws, cells={**{2 + i * 2: day for i, day in enumerate(DAY_NAMES)}, 16: "PM TTL"})
+    am_pm = {}
+    for i in range(7):
+        am_pm[2 + i * 2] = "AM"
+        am_pm[3 + i * 2] = "PM"
+    yield _row(ws, cells=am_pm)
+
+
+def _summary_rows(ws, kind, produced, waste):
+    """Bought / Sold / Difference / Throwaway rows for donuts or munchkins."""
+    yield _row(ws, f"{kind} Bought", bold=True, cells={
+        **{2 + d * 2: produced[d] for d in range(7) if produced[d] > 0},
+        16: sum(produced),
+    })
+
+    sold = [produced[d] - waste[d] for d in range(7)]
+    yield _row(ws, f"{kind} Sold", bold=True, cells={
+        **{2 + d * 2: sold[d] for d in range(7) if sold[d] > 0},
+        16: sum(s for s in sold if s > 0),
+    })
+
+    yield _row(ws, "Difference", bold=True, cells={
+        **{2 + d * 2: waste[d] for d in range(7) if waste[d] > 0},
+        16: sum(waste),
+    })
+
+    yield _row(ws, "Throwaway", bold=True, cells={3 + d * 2: waste[d] for d in range(7) if waste[d] > 0})
+
+
+def iter_week_rows(ws, products, rows, dates):
+    """Yield the template rows for one store-week.
+
+    `rows` are that store's throwaway rows for `dates`; every pass is O(rows)
+    or O(products) with the category and date column resolved once.
+    """
+    from openpyxl.cell import WriteOnlyCell  # deferred: keeps openpyxl out of worker boot
+
+    day_index = {d: i for i, d in enumerate(dates)}
+
+    # {product_name: [am_sun, pm_sun, am_mon, pm_mon, ...]} for products active this week
+    product_data = {}
+    for row in rows:
+        i = day_index.get(row['date'])
+        if i is None:
+            continue
+        values = product_data.setdefault(row['product_name'], [None] * 14)
+        produced, waste = row['produced'], row['waste']
+        values[i * 2] = int(produced) if produced else None
+        values[i * 2 + 1] = int(waste) if waste else None
+
+    by_category = {key: [] for key, _ in CATEGORIES}
+    for product in products:
+        name = product['product_name']
+        if name in product_data:
+            by_category[smart_category(product['product_type'], name)].append(name)
+
+    totals = {
+        'donut': ([0] * 7, [0] * 7),
+        'munchkin': ([0] * 7, [0] * 7),
+    }
+
+    # Row 1: Empty
+    yield []
+
+    # Row 2: DATE: with all 7 dates
+    date_row = _row(ws, "DATE:")
+    for i, d in enumerate(dates):
+        cell = WriteOnlyCell(ws, value=d)
+        cell.number_format = 'mm/dd/yyyy'
+        date_row[1 + i * 2] = cell
+    yield date_row
+
+    # Rows 3-4: Day names + AM/PM headers
+    yield from _day_header_rows(ws)
+
+    for category, category_label in CATEGORIES:
+        names = by_category[category]
+        if not names:
+            continue
+
+        yield _row(ws, category_label, bold=True)
+
+        category_totals = totals.get(category)
+        for name in names:
+            values = product_data[name]
+            cells = {2 + i: val for i, val in enumerate(values) if val is not None and val != 0}
+            pm_total = sum(val for i, val in enumerate(values) if i % 2 == 1 and val)
+            if pm_total > 0:
+                cells[16] = pm_total
+            yield _row(ws, name, cells=cells)
+
+            if category_totals is not None:
+                produced_totals, waste_totals = category_totals
+                for day in range(7):
+                    produced_totals[day] += values[day * 2] or 0
+                    waste_totals[day] += values[day * 2 + 1] or 0
+
+        # Blank row after category
+        yield []
+
+    donut_produced, donut_waste = totals['donut']
+    munchkin_produced, munchkin_waste = totals['munchkin']
+
+    yield []
+    yield from _summary_rows(ws, "Donuts", donut_produced, donut_waste)
+
+    for _ in range(3):
+        yield []
+
+    yield _row(ws, "Tot PM Donut Throw", bold=True, cells={
+        2: sum(donut_waste),
+        **{3 + d * 2: donut_waste[d] for d in range(7) if donut_waste[d] > 0},
+    })
+
+    yield []
+    yield []
+
+    # Second set of day headers for the Munchkins section
+    yield from _day_header_rows(ws)
+
+    yield _row(ws, "Muffins", bold=True)
+    yield []
+    yield []
+
+    yield _row(ws, "Munchkins", bold=True)
+    for _ in range(3):
+        yield []
+
+    yield from _summary_rows(ws, "Munchkins", munchkin_produced, munchkin_waste)
+
+
+def write_week_sheet(wb, title, products, rows, dates):
+    """Append a write-only sheet for one store-week to `wb`."""
+    ws = wb.create_sheet(title=title)
+
+    # Column widths must be set before any rows are written in write-only mode
+    # (wide enough that date cells don't render as #### in Excel).
+    ws.column_dimensions['A'].width = 32
+    for col in 'BCDEFGHIJKLMNO':
+        ws.column_dimensions[col].width = 11
+    ws.column_dimensions['P'].width = 10
+
+    for row in iter_week_rows(ws, products, rows, dates):
+        ws.append(row)
+    return ws
+
+
+def new_workbook():
+    from openpyxl import Workbook  # deferred: keeps openpyxl out of worker boot
+
+    return Workbook(write_only=True)
+
+
+def save_to_spool(wb):
+    """Save a workbook to a spooled temp file (memory up to SPOOL_MAX_BYTES, then disk)."""
+    spool = new_spool()
+    wb.save(spool)
+    spool.seek(0)
+    return spool
+
+
+# ---------------------------------------------------------
+# Bulk (multi-store / multi-week) export
+# ---------------------------------------------------------
+
+def bulk_week_starts(start_date, end_date):
+    """Sundays starting every week that overlaps [start_date, end_date]."""
+    first = start_date - timedelta(days=(start_date.weekday() + 1) % 7)
+    weeks = []
+    current = first
+    while current <= end_date:
+        weeks.append(current)
+        current += timedelta(days=7)
+    return weeks
+
+
+def group_rows_by_week(rows, week_starts):
+    """Bucket one store's rows into {week_start: [rows]} in a single pass."""
+    first = week_starts[0]
+    buckets = {w: [] for w in week_starts}
+    for row in rows:
+        index = (row['date'] - first).days // 7
+        if 0 <= index < len(week_starts):
+            buckets[week_starts[index]].append(row)
+    return buckets
+
+
+def week_sheet_title(week_start, store_id=None):
+    label = week_start.strftime('%m.%d.%y')
+    return f"{store_id} {label}" if store_id is not None else label
+
+
+def render_store_workbook(products, rows, week_starts):
+    """One workbook for a store with a sheet per week; returns a spooled file."""
+    wb = new_workbook()
+    buckets = group_rows_by_week(rows, week_starts)
+    for week_start in week_starts:
+        write_week_sheet(wb, week_sheet_title(week_start), products, buckets[week_start], week_dates(week_start))
+    return save_to_spool(wb)
@@ -11,6 +11,7 @@ Provides consistent interface for all import types.
 import pandas as pd
 from datetime import timedelta, datetime
 from models.db import get_connection, return_connection
+from services.forecast_ets import fold_new_rows
 from typing import Dict, List, Tuple, Optional
 
 
@@ -191,6 +192,7 @@ class UnifiedImporter:
                 
                 imported_count += 1
             
+            fold_new_rows(cur, store_id, dates)
             conn.commit()
             cur.close()
             return_connection(conn)
@@ -0,0 +1,202 @@
+"""
+Per-request timing and SQL instrumentation.
+
+Usage:
+    from utils.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+Each request records wall time, the number of SQL statements, time spent in
+cursor.execute() and time spent waiting for a pool connection. The numbers come
+from InstrumentedCursor (the default cursor of models.db.get_connection) and
+from get_connection itself, are sent back as a Server-Timing header and are
+aggregated per route into in-memory histograms (route_timings()).
+
+Streamed responses (utils.streaming) fetch rows after the header is sent, so
+only the query that opened the stream is counted for them.
+"""
+import contextvars
+import os
+import threading
+import time
+
+import psycopg2.extras
+
+# Set REQUEST_TIMING=0 to turn the middleware (and the header) off entirely
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "1") != "0"
+# Requests slower than this are logged with their query count; 0 disables the log
+REQUEST_SLOW_MS = float(os.getenv("REQUEST_SLOW_MS", "1000"))
+
+# Histogram upper bounds in seconds (the last bucket is +Inf)
+TIMING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar("request_stats", default=None)
+_routes_lock = threading.Lock()
+_routes = {}
+
+
+class RequestStats:
+    __slots__ = ("started", "queries", "db_seconds", "pool_wait_seconds", "connections")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.connections = 0
+
+
+def current_stats():
+    """RequestStats for the request being handled on this thread, or None."""
+    return _current.get()
+
+
+def record_pool_wait(seconds):
+    """Called by models.db.get_connection with the time it took to check out a connection."""
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+        stats.connections += 1
+
+
+class InstrumentedCursor(psycopg2.extras.RealDictCursor):
+    """RealDictCursor that adds each statement's execute() time to the current request."""
+
+    def execute(self, query, vars=None):
+        stats = _current.get()
+        if stats is None:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            stats.db_seconds += time.perf_counter() - started
+            stats.queries += 1
+
+    def executemany(self, query, vars_list):
+        stats = _current.get()
+        if stats is None:
+            return super().executemany(query, vars_list)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            stats.db_seconds += time.perf_counter() - started
+            stats.queries += 1
+
+
+class RouteTiming:
+    """Aggregated timings for one (method, route) pair. Updated under _routes_lock."""
+
+    __slots__ = ("blueprint", "count", "errors", "wall_seconds", "db_seconds", "pool_wait_seconds",
+                 "queries", "max_queries", "max_seconds", "buckets")
+
+    def __init__(self, blueprint=None):
+        self.blueprint = blueprint or "app"
+        self.count = 0
+        self.errors = 0
+        self.wall_seconds = 0.0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(TIMING_BUCKETS) + 1)
+
+    def add(self, wall, stats, status_code):
+        self.count += 1
+        if status_code >= 500:
+            self.errors += 1
+        self.wall_seconds += wall
+        self.db_seconds += stats.db_seconds
+        self.pool_wait_seconds += stats.pool_wait_seconds
+        self.queries += stats.queries
+        self.max_queries = max(self.max_queries, stats.queries)
+        self.max_seconds = max(self.max_seconds, wall)
+        for i, bound in enumerate(TIMING_BUCKETS):
+            if wall <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            "blueprint": self.blueprint,
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.wall_seconds * 1000 / count, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "avg_db_ms": round(self.db_seconds * 1000 / count, 2),
+            "avg_pool_wait_ms": round(self.pool_wait_seconds * 1000 / count, 2),
+            "avg_queries": round(self.queries / count, 2),
+            "max_queries": self.max_queries,
+            "wall_seconds_sum": self.wall_seconds,
+            "db_seconds_sum": self.db_seconds,
+            "pool_wait_seconds_sum": self.pool_wait_seconds,
+            "queries_sum": self.queries,
+            "buckets": dict(zip([str(b) for b in TIMING_BUCKETS] + ["+Inf"], self.buckets)),
+        }
+
+
+def route_timings():
+    """Snapshot of the per-route aggregates for this process: {"GET /api/v1/...": {...}}."""
+    with _routes_lock:
+        return {f"{method} {rule}": timing.as_dict() for (method, rule), timing in sorted(_routes.items())}
+
+
+def reset_route_timings():
+    with _routes_lock:
+        _routes.clear()
+
+
+def _server_timing(wall, stats):
+    return (
+        f"app;dur={wall * 1000:.1f}, "
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+        f"pool;dur={stats.pool_wait_seconds * 1000:.1f}"
+    )
+
+
+def init_instrumentation(app):
+    """Register the timing hooks. Call before other extensions so the timer wraps their hooks too."""
+    if not REQUEST_TIMING:
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        stats = RequestStats()
+        g._request_stats_token = _current.set(stats)
+
+    @app.after_request
+    def _finish_request_timer(response):
+        stats = _current.get()
+        if stats is None:
+            return response
+        wall = time.perf_counter() - stats.started
+        response.headers["Server-Timing"] = _server_timing(wall, stats)
+
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        key = (request.method, rule)
+        with _routes_lock:
+            timing = _routes.get(key)
+            if timing is None:
+                timing = _routes[key] = RouteTiming(request.blueprint)
+            timing.add(wall, stats, response.status_code)
+
+        if REQUEST_SLOW_MS and wall * 1000 >= REQUEST_SLOW_MS:
+            print(
+                f"[SLOW] {request.method} {rule} {wall * 1000:.0f}ms "
+                f"({stats.queries} queries, db {stats.db_seconds * 1000:.0f}ms, "
+                f"pool wait {stats.pool_wait_seconds * 1000:.0f}ms)",
+                flush=True,
+            )
+        return response
+
+    @app.teardown_request
+    def _clear_request_timer(exc):
+        token = g.pop("_request_stats_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -0,0 +1,70 @@
+"""orjson-backed JSON encoding for Flask responses.
+
+Usage:
+    from utils.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+
+Output keeps the conventions of Flask's default provider (dates as HTTP dates,
+Decimal and UUID as strings, keys sorted) so clients see the same values, but
+psycopg2 RealDictRow results are encoded directly in C without copying them
+into dicts.
+Falls back to the stdlib json module when orjson is not installed.
+"""
+import decimal
+import json
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def json_default(o):
+    """Same conversions as Flask's default JSON provider for types the encoder doesn't handle."""
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # Dates are routed through json_default so they keep Flask's HTTP-date format;
+    # keys are sorted like Flask's default provider (sort_keys=True)
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+    def dumps_json(obj):
+        """Encode to UTF-8 JSON bytes. RealDictRow rows are encoded as-is, without copying."""
+        return orjson.dumps(obj, default=json_default, option=_ORJSON_OPTIONS)
+
+    loads_json = orjson.loads
+else:
+    def dumps_json(obj):
+        """Encode to UTF-8 JSON bytes. RealDictRow rows are encoded as-is, without copying."""
+        return json.dumps(obj, default=json_default, separators=(",", ":"), sort_keys=True).encode()
+
+    loads_json = json.loads
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson for jsonify(), request.get_json() and dict/list returns."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for indent/sort_keys etc. get the stdlib behaviour
+            return super().dumps(obj, **kwargs)
+        return dumps_json(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads_json(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_json(obj) + b"\n", mimetype=self.mimetype)
@@ -4,10 +4,15 @@ Provides token generation, validation, and refresh functionality
 """
 
 import jwt
+import hashlib
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from flask import request, jsonify, g
 
 SECRET_KEY = os.getenv('JWT_SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -15,6 +20,73 @@ ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Decoded-claims cache (per worker process)
+TOKEN_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '1024'))
+
+# Debug logging is off unless AUTH_DEBUG is set; never logs token contents
+_logger = logging.getLogger(__name__)
+if os.getenv('AUTH_DEBUG', '').lower() in ('1', 'true', 'yes'):
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('[AUTH DEBUG] %(message)s'))
+    _logger.addHandler(_handler)
+    _logger.setLevel(logging.DEBUG)
+    _logger.propagate = False
+
+
+class _TokenCache:
+    """Small thread-safe LRU of decoded claims keyed on the token's SHA-256.
+
+    Entries are only served until the token's own `exp`, so a cached token
+    expires exactly when jwt.decode would start rejecting it.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: str, payload: Dict) -> None:
+        exp = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._data[key] = (float(exp), payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"size": len(self._data), "capacity": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+_token_cache = _TokenCache(TOKEN_CACHE_SIZE)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Generate JWT access token"""
@@ -43,9 +115,13 @@ def create_refresh_token(data: dict) -> str:
 
 def verify_token(token: str) -> Dict:
     """Verify JWT token and return decoded payload"""
+    cache_key = _token_cache.key(token)
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])  # type: ignore
-        return payload
     except Exception as e:  # Catches ExpiredSignatureError and InvalidTokenError
         error_name = type(e).__name__
         if error_name == "ExpiredSignatureError":
@@ -53,80 +129,95 @@ def verify_token(token: str) -> Dict:
         else:
             return {"error": "Invalid token"}
 
+    _token_cache.put(cache_key, payload)
+    return dict(payload)
+
+
+def get_request_token():
+    """Extract the bearer token from the Authorization header or access_token cookie.
+
+    Returns (token, error_message); error_message is set for a malformed header.
+    An empty bearer token ("Bearer ") falls through to the cookie.
+    """
+    if 'Authorization' in request.headers:
+        parts = request.headers['Authorization'].split(" ")
+        if len(parts) < 2:
+            return None, "Invalid authorization header"
+        if parts[1]:
+            return parts[1], None
+
+    # Fallback: token in secure (httpOnly) cookie
+    token = request.cookies.get('access_token')
+    return (token or None), None
+
+
+def authenticate_request():
+    """Resolve and verify the request token, populating g.user_id / g.store_id.
+
+    Returns None on success, or a (response, status) tuple to return as-is.
+    """
+    token, error = get_request_token()
+    if error:
+        _logger.debug("auth rejected path=%s reason=malformed_header", request.path)
+        return jsonify({"status": "error", "message": error}), 401
+
+    if not token:
+        _logger.debug("auth rejected path=%s reason=missing_token", request.path)
+        return jsonify({"status": "error", "message": "Authorization token missing"}), 401
+
+    payload = verify_token(token)
+    if "error" in payload:
+        _logger.debug("auth rejected path=%s reason=%s", request.path, payload["error"])
+        return jsonify({"status": "error", "message": payload["error"]}), 401
+
+    # Store user info in Flask's g object (request context)
+    g.user_id = payload.get("sub")
+    g.store_id = payload.get("store_id")
+    _logger.debug("auth ok path=%s user_id=%s store_id=%s", request.path, g.user_id, g.store_id)
+    return None
+
 
 def require_auth(f):
     """Decorator to require valid JWT token for route"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = None
-        
-        # Debug logging
-        print(f"[AUTH DEBUG] Cookies received: {list(request.cookies.keys())}")
-        print(f"[AUTH DEBUG] Authorization header: {request.headers.get('Authorization', 'None')}")
-        
-        # Check for token in Authorization header (Bearer scheme)
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-                print(f"[AUTH DEBUG] Token from header: {token[:20]}...")
-            except IndexError:
-                return jsonify({"status": "error", "message": "Invalid authorization header"}), 401
-        
-        # Fallback: check for token in secure cookie (httpOnly)
-        if not token and 'access_token' in request.cookies:
-            token = request.cookies.get('access_token')
-            print(f"[AUTH DEBUG] Token from cookie: {token[:20] if token else 'None'}...")
-        
-        if not token:
-            print("[AUTH DEBUG] No token found!")
-            return jsonify({"status": "error", "message": "Authorization token missing"}), 401
-        
-        # Verify token
-        payload = verify_token(token)
-        if "error" in payload:
-            print(f"[AUTH DEBUG] Token verification failed: {payload['error']}")
-            return jsonify({"status": "error", "message": payload["error"]}), 401
-        
-        print(f"[AUTH DEBUG] Token verified successfully for user_id: {payload.get('sub')}")
-        
-        # Store user info in Flask's g object (request context)
-        g.user_id = payload.get("sub")
-        g.store_id = payload.get("store_id")
-        
+        failure = authenticate_request()
+        if failure is not None:
+            return failure
         return f(*args, **kwargs)
-    
+
     return decorated_function
 
 
+# Roles that may read or act on stores other than their own
+CROSS_STORE_ROLES = ("admin", "owner")
+
+
+def has_cross_store_role(cur) -> bool:
+    """Whether the authenticated user (g.user_id) holds a cross-store role."""
+    cur.execute("SELECT role FROM users WHERE id = %s", (g.user_id,))
+    row = cur.fetchone()
+    role = str((row or {}).get("role") or "").strip().lower()
+    return role in CROSS_STORE_ROLES
+
+
+def can_access_stores(cur, store_ids) -> bool:
+    """The caller's own store is always allowed; other stores (or none named) need a cross-store role."""
+    user_store_id = int(g.store_id) if getattr(g, "store_id", None) is not None else None
+    if store_ids and all(int(store_id) == user_store_id for store_id in store_ids):
+        return True
+    return has_cross_store_role(cur)
+
+
 def require_store_access(store_id_param='store_id'):
     """Decorator to verify user has access to specific store"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # First run auth decorator
-            token = None
-            if 'Authorization' in request.headers:
-                auth_header = request.headers['Authorization']
-                try:
-                    token = auth_header.split(" ")[1]
-                except IndexError:
-                    return jsonify({"status": "error", "message": "Invalid authorization header"}), 401
-            
-            if not token and 'access_token' in request.cookies:
-                token = request.cookies.get('access_token')
-            
-            if not token:
-                return jsonify({"status": "error", "message": "Authorization token missing"}), 401
-            
-            payload = verify_token(token)
-            if "error" in payload:
-                return jsonify({"status": "error", "message": payload["error"]}), 401
-            
-            # Store user info in Flask's g object (request context)
-            g.user_id = payload.get("sub")
-            g.store_id = payload.get("store_id")
-            
+            failure = authenticate_request()
+            if failure is not None:
+                return failure
+
             # Now verify store access
             requested_store_id = kwargs.get(store_id_param) or request.args.get(store_id_param)
             if requested_store_id and int(requested_store_id) != g.store_id:
@@ -0,0 +1,492 @@
+"""
+Prometheus metrics shared across gunicorn workers.
+
+Each worker process writes a JSON snapshot of its own numbers to METRICS_DIR
+(one file per pid, replaced atomically at most every METRICS_FLUSH_SECONDS).
+/metrics merges every file, so whichever worker answers the scrape reports the
+whole instance:
+
+- counters and histograms are summed over all files. When a worker exits, its
+  counters are folded into exited_workers.agg (as prometheus_client's
+  multiprocess mode does) before its file is removed, so totals never go down;
+  a new worker that reuses a dead pid folds the old file first
+- gauges (pool connections, queue depths, cache sizes) only come from live pids
+
+The gunicorn master clears METRICS_DIR when it starts (reset_metrics_dir(), from
+gunicorn.conf.py), so a restart starts every counter from zero.
+
+Sources: per-route request timings (utils.instrumentation), the database pool,
+the audit writer, the JWT, store PIN and calendar caches, the bcrypt pool, and job
+timings recorded with timed_job() (imports, forecast generation).
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from utils.instrumentation import TIMING_BUCKETS, route_timings
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "dunkin_metrics"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Counters of exited workers, and the lock serialising folds into it
+_AGGREGATE_FILE = "exited_workers.agg"
+_LOCK_FILE = ".lock"
+_COUNTER_SECTIONS = ("routes", "jobs", "job_stores", "counters")
+
+# Job durations run from milliseconds (a single forecast) to minutes (bulk imports)
+JOB_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_jobs_lock = threading.Lock()
+_jobs = {}          # job -> {"runs", "errors", "seconds", "rows", "buckets"}
+_job_stores = {}    # (job, store_id) -> {"runs", "seconds"}
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+# (pid, random id) of this process; tells a reused pid's stale file from our own
+_instance = (None, None)
+_claimed_pid = None
+
+
+class JobRun:
+    """Handed out by timed_job(); set .rows to the number of rows the job wrote."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = 0
+
+
+def record_job(job, seconds, rows=0, ok=True, store_id=None):
+    with _jobs_lock:
+        entry = _jobs.get(job)
+        if entry is None:
+            entry = _jobs[job] = {"runs": 0, "errors": 0, "seconds": 0.0, "rows": 0,
+                                  "buckets": [0] * (len(JOB_BUCKETS) + 1)}
+        entry["runs"] += 1
+        entry["errors"] += 0 if ok else 1
+        entry["seconds"] += seconds
+        entry["rows"] += rows
+        entry["buckets"][_bucket_index(JOB_BUCKETS, seconds)] += 1
+
+        if store_id is not None:
+            per_store = _job_stores.setdefault((job, int(store_id)), {"runs": 0, "seconds": 0.0})
+            per_store["runs"] += 1
+            per_store["seconds"] += seconds
+
+
+@contextmanager
+def timed_job(job, store_id=None):
+    """Time a block as one run of `job`; an exception counts it as an error and propagates.
+
+        with timed_job("throwaway_import") as run:
+            ...
+            run.rows = written
+    """
+    run = JobRun()
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield run
+        ok = True
+    finally:
+        record_job(job, time.perf_counter() - started, run.rows, ok, store_id)
+
+
+def _bucket_index(bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+def _process_snapshot():
+    """Everything this process knows, as plain JSON-able data."""
+    from models.db import pool_status
+    from services.audit_logger import audit_writer
+    from services.calendar_service import calendar_cache
+    from services.store_pin_cache import store_pin_cache
+    from utils.jwt_handler import _token_cache
+    from utils.passwords import metrics as password_metrics
+
+    with _jobs_lock:
+        jobs = {job: dict(entry, buckets=list(entry["buckets"])) for job, entry in _jobs.items()}
+        job_stores = [[job, store_id, dict(entry)] for (job, store_id), entry in _job_stores.items()]
+
+    pool = pool_status()
+    audit = audit_writer.stats()
+    passwords = password_metrics.stats()
+    caches = {"jwt": _token_cache.stats(), "store_pin": store_pin_cache.stats(), "calendar": calendar_cache.stats()}
+
+    return {
+        "pid": os.getpid(),
+        "instance": _instance_id(),
+        "written_at": time.time(),
+        "routes": route_timings(),
+        "jobs": jobs,
+        "job_stores": job_stores,
+        "counters": {
+            "audit": {k: audit[k] for k in ("enqueued", "written", "dropped", "failed", "flushes")},
+            "passwords": {"completed": passwords["completed"], "rejected": passwords["rejected"]},
+            "cache_hits": {name: c["hits"] for name, c in caches.items()},
+            "cache_misses": {name: c["misses"] for name, c in caches.items()},
+        },
+        "gauges": {
+            "pool_ready": 1 if pool["status"] == "ready" else 0,
+            "pool_in_use": pool.get("in_use", 0),
+            "pool_idle": pool.get("idle", 0),
+            "pool_max": pool["maxconn"],
+            "audit_queue_depth": audit["queue_depth"],
+            "audit_queue_capacity": audit["queue_capacity"],
+            "password_in_flight": passwords["in_flight"],
+            "password_queue_depth": passwords["queue_depth"],
+            "cache_entries": {name: c["size"] for name, c in caches.items()},
+        },
+    }
+
+
+def _instance_id():
+    global _instance
+    pid = os.getpid()
+    if _instance[0] != pid:
+        _instance = (pid, uuid.uuid4().hex)
+    return _instance[1]
+
+
+@contextmanager
+def _dir_lock():
+    """Exclusive lock over METRICS_DIR shared by every worker (flock on a lock file)."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(os.path.join(METRICS_DIR, _LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _empty_aggregate():
+    return {"pid": None, "routes": {}, "jobs": {}, "job_stores": [], "counters": {}, "gauges": {}}
+
+
+def _fold(aggregate, snapshot):
+    """Add a snapshot's counters and histograms (not gauges) into the aggregate."""
+    for key, timing in snapshot["routes"].items():
+        current = aggregate["routes"].setdefault(key, {
+            "blueprint": timing["blueprint"], "count": 0, "errors": 0, "wall_seconds_sum": 0.0,
+            "db_seconds_sum": 0.0, "pool_wait_seconds_sum": 0.0, "queries_sum": 0,
+            "buckets": {bound: 0 for bound in timing["buckets"]},
+        })
+        for field in ("count", "errors", "wall_seconds_sum", "db_seconds_sum", "pool_wait_seconds_sum", "queries_sum"):
+            current[field] += timing.get(field, 0)
+        for bound, n in timing["buckets"].items():
+            current["buckets"][bound] = current["buckets"].get(bound, 0) + n
+    for job, entry in snapshot["jobs"].items():
+        _add(aggregate["jobs"], job, entry)
+    job_stores = {(job, store_id): entry for job, store_id, entry in aggregate["job_stores"]}
+    for job, store_id, entry in snapshot["job_stores"]:
+        _add(job_stores, (job, store_id), entry)
+    aggregate["job_stores"] = [[job, store_id, entry] for (job, store_id), entry in job_stores.items()]
+    for group, values in snapshot["counters"].items():
+        _add(aggregate["counters"], group, values)
+
+
+def _fold_files(paths):
+    """Fold exited workers' files into the aggregate and remove them. Call under _dir_lock()."""
+    aggregate_path = os.path.join(METRICS_DIR, _AGGREGATE_FILE)
+    aggregate = _read_json(aggregate_path) or _empty_aggregate()
+    folded = []
+    for path in paths:
+        snapshot = _read_json(path)
+        if snapshot is not None and all(section in snapshot for section in _COUNTER_SECTIONS):
+            _fold(aggregate, snapshot)
+        folded.append(path)
+    if folded:
+        _write_json(aggregate_path, aggregate)
+        for path in folded:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return aggregate
+
+
+def _claim_pid_file(path):
+    """Before our first write: fold a file left by an exited worker that had our pid."""
+    global _claimed_pid
+    pid = os.getpid()
+    if _claimed_pid == pid:
+        return
+    with _dir_lock():
+        existing = _read_json(path)
+        if existing is not None and existing.get("instance") != _instance_id():
+            _fold_files([path])
+    _claimed_pid = pid
+
+
+def reset_metrics_dir():
+    """Remove every snapshot and the exited-worker aggregate (gunicorn master on_starting)."""
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def flush_metrics(force=False):
+    """Write this process's snapshot to METRICS_DIR (at most every METRICS_FLUSH_SECONDS unless force)."""
+    global _last_flush
+    if not _flush_lock.acquire(blocking=force):
+        return None  # another thread of this worker is writing right now
+    try:
+        now = time.monotonic()
+        if not force and now - _last_flush < METRICS_FLUSH_SECONDS:
+            return None
+        _last_flush = now
+
+        snapshot = _process_snapshot()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{snapshot['pid']}.json")
+        _claim_pid_file(path)
+        _write_json(path, snapshot)
+        return snapshot
+    finally:
+        _flush_lock.release()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshots():
+    """This process's live snapshot, every live worker's file, and the exited-worker aggregate.
+
+    Files of exited workers are folded into the aggregate and removed here.
+    """
+    own = flush_metrics(force=True)
+    snapshots = [(own, True)]
+    exited = []
+    with _dir_lock():
+        for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+            snapshot = _read_json(path)
+            if snapshot is None:
+                continue
+            pid = snapshot.get("pid")
+            if pid == own["pid"]:
+                continue
+            if _pid_alive(pid):
+                snapshots.append((snapshot, True))
+            else:
+                exited.append(path)
+        aggregate = _fold_files(exited)
+    snapshots.append((aggregate, False))
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def header(self, name, kind, help_text):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels)} {value}")
+
+    def histogram(self, name, bounds, buckets, total, count, **labels):
+        cumulative = 0
+        for bound, n in zip([str(b) for b in bounds] + ["+Inf"], buckets):
+            cumulative += n
+            self.sample(f"{name}_bucket", cumulative, le=bound, **labels)
+        self.sample(f"{name}_sum", total, **labels)
+        self.sample(f"{name}_count", count, **labels)
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def _add(target, key, values):
+    current = target.get(key)
+    if current is None:
+        target[key] = {k: (list(v) if isinstance(v, list) else v) for k, v in values.items()}
+        return
+    for k, v in values.items():
+        if isinstance(v, list):
+            current[k] = [a + b for a, b in zip(current[k], v)]
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            current[k] += v
+
+
+def render_metrics():
+    """Prometheus text exposition of the merged snapshots from every worker."""
+    snapshots = _load_snapshots()
+
+    routes, jobs, job_stores, counters = {}, {}, {}, {}
+    gauges = {"workers": 0}
+    for snapshot, alive in snapshots:
+        for key, timing in snapshot["routes"].items():
+            method, rule = key.split(" ", 1)
+            _add(routes, (timing["blueprint"], method, rule), {
+                "count": timing["count"],
+                "errors": timing["errors"],
+                "wall": timing["wall_seconds_sum"],
+                "db": timing["db_seconds_sum"],
+                "pool_wait": timing.get("pool_wait_seconds_sum", 0.0),
+                "queries": timing["queries_sum"],
+                "buckets": list(timing["buckets"].values()),
+            })
+        for job, entry in snapshot["jobs"].items():
+            _add(jobs, job, entry)
+        for job, store_id, entry in snapshot["job_stores"]:
+            _add(job_stores, (job, store_id), entry)
+        for group, values in snapshot["counters"].items():
+            _add(counters, group, values)
+        if alive:
+            gauges["workers"] += 1
+            for name, value in snapshot["gauges"].items():
+                if isinstance(value, dict):
+                    _add(gauges, name, value)
+                else:
+                    gauges[name] = gauges.get(name, 0) + value
+
+    out = _Exposition()
+    route_keys = sorted(routes)
+
+    def route_labels(key):
+        blueprint, method, rule = key
+        return dict(blueprint=blueprint, method=method, route=rule)
+
+    out.header("dunkin_workers", "gauge", "Live worker processes reporting metrics")
+    out.sample("dunkin_workers", gauges["workers"])
+
+    out.header("dunkin_http_requests_total", "counter", "Requests handled, by blueprint and route")
+    for key in route_keys:
+        out.sample("dunkin_http_requests_total", routes[key]["count"], **route_labels(key))
+    out.header("dunkin_http_request_errors_total", "counter", "Requests that returned 5xx")
+    for key in route_keys:
+        out.sample("dunkin_http_request_errors_total", routes[key]["errors"], **route_labels(key))
+    out.header("dunkin_http_request_duration_seconds", "histogram", "Request wall time")
+    for key in route_keys:
+        r = routes[key]
+        out.histogram("dunkin_http_request_duration_seconds", TIMING_BUCKETS, r["buckets"], r["wall"], r["count"],
+                      **route_labels(key))
+    for name, field, help_text in (
+        ("dunkin_http_request_db_seconds_total", "db", "Time spent executing SQL"),
+        ("dunkin_http_request_queries_total", "queries", "SQL statements executed"),
+        ("dunkin_http_request_pool_wait_seconds_total", "pool_wait", "Time spent waiting for a pool connection"),
+    ):
+        out.header(name, "counter", help_text)
+        for key in route_keys:
+            out.sample(name, routes[key][field], **route_labels(key))
+
+    out.header("dunkin_db_pool_connections", "gauge", "Pool connections by state, summed over workers")
+    out.sample("dunkin_db_pool_connections", gauges.get("pool_in_use", 0), state="in_use")
+    out.sample("dunkin_db_pool_connections", gauges.get("pool_idle", 0), state="idle")
+    out.header("dunkin_db_pool_max_connections", "gauge", "Pool capacity, summed over workers")
+    out.sample("dunkin_db_pool_max_connections", gauges.get("pool_max", 0))
+    out.header("dunkin_db_pool_ready_workers", "gauge", "Workers whose pool finished warming up")
+    out.sample("dunkin_db_pool_ready_workers", gauges.get("pool_ready", 0))
+
+    out.header("dunkin_job_duration_seconds", "histogram", "Import / forecast job duration")
+    for job, entry in sorted(jobs.items()):
+        out.histogram("dunkin_job_duration_seconds", JOB_BUCKETS, entry["buckets"], entry["seconds"], entry["runs"], job=job)
+    out.header("dunkin_job_errors_total", "counter", "Jobs that raised")
+    for job, entry in sorted(jobs.items()):
+        out.sample("dunkin_job_errors_total", entry["errors"], job=job)
+    out.header("dunkin_job_rows_total", "counter", "Rows written by jobs")
+    for job, entry in sorted(jobs.items()):
+        out.sample("dunkin_job_rows_total", entry["rows"], job=job)
+    out.header("dunkin_job_store_seconds", "summary", "Job duration per store")
+    for (job, store_id), entry in sorted(job_stores.items()):
+        out.sample("dunkin_job_store_seconds_sum", entry["seconds"], job=job, store_id=store_id)
+        out.sample("dunkin_job_store_seconds_count", entry["runs"], job=job, store_id=store_id)
+
+    audit = counters.get("audit", {})
+    out.header("dunkin_audit_events_total", "counter", "Audit events by outcome")
+    for outcome in ("enqueued", "written", "dropped", "failed"):
+        out.sample("dunkin_audit_events_total", audit.get(outcome, 0), outcome=outcome)
+    out.header("dunkin_audit_queue_depth", "gauge", "Audit events waiting to be written")
+    out.sample("dunkin_audit_queue_depth", gauges.get("audit_queue_depth", 0))
+    out.header("dunkin_audit_queue_capacity", "gauge", "Audit queue capacity, summed over workers")
+    out.sample("dunkin_audit_queue_capacity", gauges.get("audit_queue_capacity", 0))
+
+    passwords = counters.get("passwords", {})
+    out.header("dunkin_password_hashes_total", "counter", "bcrypt operations by outcome")
+    out.sample("dunkin_password_hashes_total", passwords.get("completed", 0), outcome="completed")
+    out.sample("dunkin_password_hashes_total", passwords.get("rejected", 0), outcome="rejected")
+    out.header("dunkin_password_in_flight", "gauge", "bcrypt operations running or queued")
+    out.sample("dunkin_password_in_flight", gauges.get("password_in_flight", 0))
+
+    hits = counters.get("cache_hits", {})
+    misses = counters.get("cache_misses", {})
+    entries = gauges.get("cache_entries", {})
+    caches = sorted(set(hits) | set(misses))
+    out.header("dunkin_cache_hits_total", "counter", "Cache hits")
+    for cache in caches:
+        out.sample("dunkin_cache_hits_total", hits.get(cache, 0), cache=cache)
+    out.header("dunkin_cache_misses_total", "counter", "Cache misses")
+    for cache in caches:
+        out.sample("dunkin_cache_misses_total", misses.get(cache, 0), cache=cache)
+    out.header("dunkin_cache_hit_ratio", "gauge", "hits / (hits + misses) since the instance started")
+    for cache in caches:
+        h, m = hits.get(cache, 0), misses.get(cache, 0)
+        out.sample("dunkin_cache_hit_ratio", round(h / (h + m), 4) if h + m else 0, cache=cache)
+    out.header("dunkin_cache_entries", "gauge", "Cached entries, summed over workers")
+    for cache in caches:
+        out.sample("dunkin_cache_entries", entries.get(cache, 0), cache=cache)
+
+    return out.text()
+
+
+def init_metrics(app):
+    """Flush this worker's snapshot after requests (rate-limited) and at exit."""
+
+    @app.after_request
+    def _flush_metrics(response):
+        try:
+            flush_metrics()
+        except OSError as e:
+            print(f"[METRICS] Could not write snapshot to {METRICS_DIR}: {e}", flush=True)
+        return response
+
+    @atexit.register
+    def _flush_metrics_at_exit():
+        try:
+            flush_metrics(force=True)
+        except Exception:
+            pass
@@ -0,0 +1,130 @@
+"""Keyset pagination for table list endpoints.
+
+Usage:
+    from utils.pagination import paginated_list
+    @bp.route('/', methods=['GET'])
+    def list_things():
+        return paginated_list('things', ('id',))
+
+Clients pass `limit` (default PAGE_DEFAULT_LIMIT, max PAGE_MAX_LIMIT) and the
+opaque `cursor` from the previous response's X-Next-Cursor header. The body is
+still a plain JSON array (NDJSON with ?format=ndjson), streamed row by row; the
+header is absent on the last page. Large pages are read through a named (server-side) cursor so memory per
+request stays bounded however big the table gets.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from flask import jsonify, request
+
+from models.db import get_connection, return_connection
+from utils.streaming import iter_query, streamed_json_response
+
+PAGE_DEFAULT_LIMIT = 100
+PAGE_MAX_LIMIT = 1000
+# Pages larger than this are fetched with a server-side cursor in batches
+SERVER_CURSOR_THRESHOLD = 250
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Opaque token for the last key of a page."""
+    plain = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(plain, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, key_count):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != key_count:
+        raise PaginationError("Invalid cursor")
+    return values
+
+
+def parse_page_args(key_count):
+    """Return (limit, cursor_values) from the query string."""
+    raw_limit = request.args.get("limit")
+    try:
+        limit = int(raw_limit) if raw_limit else PAGE_DEFAULT_LIMIT
+    except ValueError:
+        raise PaginationError("limit must be an integer")
+    if limit < 1:
+        raise PaginationError("limit must be positive")
+    limit = min(limit, PAGE_MAX_LIMIT)
+
+    token = request.args.get("cursor")
+    return limit, decode_cursor(token, key_count) if token else None
+
+
+def _key_sql(key_columns):
+    return f"({', '.join(key_columns)})"
+
+
+def paginated_list(table, key_columns, columns="*", where=None, params=()):
+    """Stream one keyset page of `table` ordered by `key_columns` (the primary key or date).
+
+    `where` / `params` add an optional fixed filter. The next page's cursor is
+    found first with an index-only probe, so it can go in a response header
+    before the body is streamed.
+    """
+    key_columns = tuple(key_columns)
+    try:
+        limit, after = parse_page_args(len(key_columns))
+    except PaginationError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    keys = _key_sql(key_columns)
+    conditions = [where] if where else []
+    base_params = list(params)
+    if after is not None:
+        conditions.append(f"{keys} > ({', '.join(['%s'] * len(key_columns))})")
+        base_params.extend(after)
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            # Last key on this page, plus one more row if another page follows
+            cur.execute(
+                f"SELECT {', '.join(key_columns)} FROM {table} {where_sql} "
+                f"ORDER BY {', '.join(key_columns)} OFFSET %s LIMIT 2",
+                base_params + [limit - 1],
+            )
+            probe = cur.fetchall()
+
+        page_params = list(base_params)
+        page_conditions = list(conditions)
+        next_cursor = None
+        if probe:
+            last_key = [probe[0][c] for c in key_columns]
+            page_conditions.append(f"{keys} <= ({', '.join(['%s'] * len(key_columns))})")
+            page_params.extend(last_key)
+            if len(probe) > 1:
+                next_cursor = encode_cursor(last_key)
+        page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+        page_sql = f"SELECT {columns} FROM {table} {page_where} ORDER BY {', '.join(key_columns)} LIMIT %s"
+        page_params.append(limit)
+
+        if limit > SERVER_CURSOR_THRESHOLD:
+            # The stream owns the connection from here on
+            stream_conn, conn = conn, None
+            rows = iter_query(stream_conn, page_sql, page_params)
+        else:
+            with conn.cursor() as cur:
+                cur.execute(page_sql, page_params)
+                rows = cur.fetchall()
+    finally:
+        if conn is not None:
+            return_connection(conn)
+
+    response = streamed_json_response(rows)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
@@ -0,0 +1,127 @@
+"""
+Password hashing on a bounded worker pool
+Keeps bcrypt's ~250 ms of CPU per call off the request thread and caps how
+many hashes run at once, so a burst of logins cannot occupy every worker thread.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+# Max concurrent bcrypt operations per worker process
+BCRYPT_MAX_CONCURRENCY = int(os.getenv('BCRYPT_MAX_CONCURRENCY', '2'))
+# Max operations waiting for a slot before new ones are rejected
+BCRYPT_MAX_QUEUE = int(os.getenv('BCRYPT_MAX_QUEUE', '32'))
+# Cost factor for new hashes (existing hashes keep the cost they were made with)
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+# How long a request waits for its hash before giving up
+BCRYPT_TIMEOUT_SECONDS = float(os.getenv('BCRYPT_TIMEOUT_SECONDS', '10'))
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Raised when the hashing queue is full or the wait times out."""
+
+
+class _PasswordMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    def stats(self):
+        with self._lock:
+            avg = self.total_hash_seconds / self.completed if self.completed else 0.0
+            return {
+                "queue_depth": max(0, self.in_flight - BCRYPT_MAX_CONCURRENCY),
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_hash_ms": round(avg * 1000, 2),
+                "max_hash_ms": round(self.max_hash_seconds * 1000, 2),
+                "avg_wait_ms": round(self.total_wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            }
+
+
+metrics = _PasswordMetrics()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Create the executor lazily, once per (forked) worker process."""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, BCRYPT_MAX_CONCURRENCY),
+                    thread_name_prefix="bcrypt",
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def _timed(fn, submitted_at):
+    started = time.perf_counter()
+    try:
+        return fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        with metrics._lock:
+            metrics.completed += 1
+            metrics.total_hash_seconds += elapsed
+            metrics.max_hash_seconds = max(metrics.max_hash_seconds, elapsed)
+            metrics.total_wait_seconds += started - submitted_at
+
+
+def _release(_future=None):
+    with metrics._lock:
+        metrics.in_flight -= 1
+
+
+def _run(fn):
+    with metrics._lock:
+        if metrics.in_flight >= BCRYPT_MAX_CONCURRENCY + BCRYPT_MAX_QUEUE:
+            metrics.rejected += 1
+            raise PasswordPoolBusy("Too many password operations in progress")
+        metrics.in_flight += 1
+        metrics.max_in_flight = max(metrics.max_in_flight, metrics.in_flight)
+    try:
+        future = _get_executor().submit(_timed, fn, time.perf_counter())
+    except Exception:
+        _release()
+        raise
+    # The slot is held until the hash itself finishes (or is cancelled before
+    # starting), not until this caller stops waiting, so timeouts cannot push
+    # the number of running hashes past the cap.
+    future.add_done_callback(_release)
+    try:
+        return future.result(timeout=BCRYPT_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        future.cancel()
+        raise PasswordPoolBusy("Timed out waiting for password operation")
+
+
+def hash_password(password: str) -> str:
+    """Return a bcrypt hash of `password` as a utf-8 string."""
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return _run(lambda: bcrypt.hashpw(password.encode(), salt)).decode('utf-8')
+
+
+def check_password(password: str, password_hash: str) -> bool:
+    """Check `password` against a stored bcrypt hash."""
+    if not password_hash:
+        return False
+    return _run(lambda: bcrypt.checkpw(password.encode(), str(password_hash).encode()))
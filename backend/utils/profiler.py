@@ -0,0 +1,228 @@
+"""
+Opt-in request profiler for production.
+
+Disabled unless PROFILER_TOKEN is set. A request that sends
+    X-Profile: <PROFILER_TOKEN>
+(and optionally X-Profile-Mode: sample | cprofile) is profiled from
+before_request to after_request on its own thread:
+
+- sample   (default) a background thread snapshots the request thread's stack
+           every PROFILER_INTERVAL_MS and writes flamegraph-ready collapsed
+           stacks ("outer;inner;leaf count" lines, for flamegraph.pl / speedscope)
+- cprofile deterministic cProfile; writes a .pstats file for pstats / snakeviz
+
+Profiles are stored in PROFILE_DIR as <request_id>.<ext> with a <request_id>.json
+description, and the response carries X-Profile-Id. The request id is the
+incoming X-Request-ID when present. Profiling is limited to PROFILER_RATE_LIMIT
+(shared across workers through the rate-limit storage) and one profile at a
+time per worker; requests over the limit are served normally, unprofiled.
+"""
+import cProfile
+import hmac
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "dunkin_profiles"))
+PROFILER_RATE_LIMIT = os.getenv("PROFILER_RATE_LIMIT", "10 per hour")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+# Oldest profiles beyond this count are deleted
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
+
+PROFILE_MODES = ("sample", "cprofile")
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_active = threading.Semaphore(1)
+
+
+def profiler_enabled():
+    return bool(PROFILER_TOKEN)
+
+
+def token_matches(supplied):
+    return profiler_enabled() and bool(supplied) and hmac.compare_digest(supplied, PROFILER_TOKEN)
+
+
+class StackSampler(threading.Thread):
+    """Counts collapsed stacks of one thread, sampled every `interval` seconds."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    def __init__(self, request_id, mode):
+        self.request_id = request_id
+        self.mode = mode
+        self.started = time.perf_counter()
+        if mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(threading.get_ident(), PROFILER_INTERVAL_MS / 1000)
+            self._profiler.start()
+
+    def stop(self):
+        """Stop profiling; returns elapsed seconds. Safe to call twice."""
+        if self._profiler is None:
+            return None
+        elapsed = time.perf_counter() - self.started
+        if self.mode == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        self._result, self._profiler = self._profiler, None
+        return elapsed
+
+    def save(self, meta):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self.mode == "cprofile":
+            filename = f"{self.request_id}.pstats"
+            self._result.dump_stats(os.path.join(PROFILE_DIR, filename))
+        else:
+            filename = f"{self.request_id}.collapsed"
+            with open(os.path.join(PROFILE_DIR, filename), "w") as f:
+                f.write(self._result.collapsed())
+            meta["samples"] = self._result.samples
+        meta.update(request_id=self.request_id, mode=self.mode, file=filename)
+        with open(os.path.join(PROFILE_DIR, f"{self.request_id}.json"), "w") as f:
+            json.dump(meta, f)
+        _prune()
+        return meta
+
+
+def _prune():
+    metas = sorted(
+        (os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR) if name.endswith(".json")),
+        key=os.path.getmtime,
+    )
+    for meta_path in metas[:max(0, len(metas) - PROFILER_MAX_FILES)]:
+        stem = meta_path[:-len(".json")]
+        for path in (meta_path, stem + ".pstats", stem + ".collapsed"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def list_profiles():
+    """Stored profile descriptions, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(PROFILE_DIR, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda p: p.get("created_at", 0), reverse=True)
+
+
+def profile_path(request_id):
+    """(directory, filename) of a stored profile, or None."""
+    if not _REQUEST_ID_RE.match(request_id or ""):
+        return None
+    for ext in (".collapsed", ".pstats"):
+        if os.path.exists(os.path.join(PROFILE_DIR, request_id + ext)):
+            return PROFILE_DIR, request_id + ext
+    return None
+
+
+def _within_rate_limit():
+    from limits import parse
+    from utils.security import limiter
+    return limiter.limiter.hit(parse(PROFILER_RATE_LIMIT), "request-profiler")
+
+
+def init_profiler(app):
+    """Register the profiling hooks (no-op unless PROFILER_TOKEN is set)."""
+    if not profiler_enabled():
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        if not token_matches(request.headers.get("X-Profile")):
+            return
+        mode = request.headers.get("X-Profile-Mode", "sample").lower()
+        if mode not in PROFILE_MODES or not _active.acquire(blocking=False):
+            return
+        try:
+            if not _within_rate_limit():
+                _active.release()
+                return
+        except Exception as e:
+            _active.release()
+            print(f"[PROFILER] Rate limit check failed, not profiling: {e}", flush=True)
+            return
+
+        request_id = request.headers.get("X-Request-ID", "")
+        if not _REQUEST_ID_RE.match(request_id) or profile_path(request_id):
+            request_id = uuid.uuid4().hex
+        g._request_profile = RequestProfile(request_id, mode)
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.pop("_request_profile", None)
+        if profile is None:
+            return response
+        try:
+            elapsed = profile.stop()
+            profile.save({
+                "method": request.method,
+                "path": request.path,
+                "query": request.query_string.decode(errors="replace"),
+                "route": request.url_rule.rule if request.url_rule is not None else None,
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 2),
+                "created_at": time.time(),
+                "pid": os.getpid(),
+            })
+            response.headers["X-Profile-Id"] = profile.request_id
+        except Exception as e:
+            print(f"[PROFILER] Could not save profile {profile.request_id}: {e}", flush=True)
+        finally:
+            _active.release()
+        return response
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        # after_request is skipped when the handler raised; don't leak the slot
+        profile = g.pop("_request_profile", None)
+        if profile is not None:
+            profile.stop()
+            _active.release()
@@ -0,0 +1,272 @@
+"""
+Shared rate limit storage backends for Flask-Limiter
+Counters live outside the worker process so limits hold across gunicorn workers
+without an external Redis.
+
+Storage URIs (set RATE_LIMIT_STORAGE_URI):
+    postgres+limiter://                  UNLOGGED table in the app database (DATABASE_URL)
+    postgres+limiter://user:pw@host/db   UNLOGGED table in another database
+    sqlite+limiter:///path/to/file.db    local file shared by workers on one host
+
+Both backends support the fixed-window and sliding-window-counter strategies
+(RATE_LIMIT_STRATEGY) and record each accepted hit with a single upsert.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+import psycopg2
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+
+# How often (seconds) a process sweeps expired counter rows
+CLEANUP_INTERVAL_SECONDS = 60
+
+_CREATE_TABLE_SQL = """
+    CREATE {unlogged} TABLE IF NOT EXISTS rate_limit_counters (
+        key TEXT PRIMARY KEY,
+        window_idx BIGINT NOT NULL DEFAULT 0,
+        curr_count BIGINT NOT NULL DEFAULT 0,
+        prev_count BIGINT NOT NULL DEFAULT 0,
+        expires_at DOUBLE PRECISION NOT NULL
+    )
+"""
+
+# Fixed window: restart the counter once the stored window has expired
+_INCR_SQL = """
+    INSERT INTO rate_limit_counters AS t (key, window_idx, curr_count, prev_count, expires_at)
+    VALUES (%s, 0, %s, 0, %s)
+    ON CONFLICT (key) DO UPDATE SET
+        curr_count = CASE WHEN t.expires_at <= %s THEN excluded.curr_count
+                          ELSE t.curr_count + excluded.curr_count END,
+        expires_at = CASE WHEN t.expires_at <= %s THEN excluded.expires_at
+                          ELSE t.expires_at END
+    RETURNING curr_count
+"""
+
+# Sliding window counter: roll current -> previous when the window index advances
+_SLIDING_INCR_SQL = """
+    INSERT INTO rate_limit_counters AS t (key, window_idx, curr_count, prev_count, expires_at)
+    VALUES (%s, %s, %s, 0, %s)
+    ON CONFLICT (key) DO UPDATE SET
+        prev_count = CASE WHEN t.window_idx >= excluded.window_idx THEN t.prev_count
+                          WHEN t.window_idx = excluded.window_idx - 1 THEN t.curr_count
+                          ELSE 0 END,
+        curr_count = CASE WHEN t.window_idx >= excluded.window_idx THEN t.curr_count + excluded.curr_count
+                          ELSE excluded.curr_count END,
+        window_idx = CASE WHEN t.window_idx >= excluded.window_idx THEN t.window_idx
+                          ELSE excluded.window_idx END,
+        expires_at = excluded.expires_at
+    RETURNING prev_count, curr_count
+"""
+
+_SLIDING_DECR_SQL = """
+    UPDATE rate_limit_counters
+    SET curr_count = CASE WHEN curr_count > %s THEN curr_count - %s ELSE 0 END
+    WHERE key = %s AND window_idx = %s
+"""
+
+
+class _SqlCounterStorage(Storage, SlidingWindowCounterSupport):
+    """Shared counter logic; subclasses provide a connection and `_execute`."""
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._next_cleanup = 0.0
+
+    # -- subclass hooks ---------------------------------------------------
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _execute(self, conn, sql, params=(), fetch=False):
+        raise NotImplementedError
+
+    # -- helpers ----------------------------------------------------------
+
+    def _run(self, sql, params=(), fetch=False):
+        with self._lock:
+            pid = os.getpid()
+            if self._conn is None or self._pid != pid:
+                # Never reuse a connection inherited across a gunicorn fork
+                self._conn = self._connect()
+                self._pid = pid
+            try:
+                return self._execute(self._conn, sql, params, fetch)
+            except self.base_exceptions:
+                self._discard_connection()
+                raise
+
+    def _discard_connection(self):
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def _maybe_cleanup(self, now):
+        if now < self._next_cleanup:
+            return
+        self._next_cleanup = now + CLEANUP_INTERVAL_SECONDS
+        self._run("DELETE FROM rate_limit_counters WHERE expires_at <= %s", (now,))
+
+    # -- fixed window -----------------------------------------------------
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        self._maybe_cleanup(now)
+        row = self._run(_INCR_SQL, (key, amount, now + expiry, now, now), fetch=True)
+        return int(row[0])
+
+    def get(self, key):
+        row = self._run(
+            "SELECT curr_count FROM rate_limit_counters WHERE key = %s AND expires_at > %s",
+            (key, time.time()),
+            fetch=True,
+        )
+        return int(row[0]) if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._run(
+            "SELECT expires_at FROM rate_limit_counters WHERE key = %s AND expires_at > %s",
+            (key, now),
+            fetch=True,
+        )
+        return float(row[0]) if row else now
+
+    def check(self):
+        try:
+            self._run("SELECT 1", fetch=True)
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        return self._run("DELETE FROM rate_limit_counters")
+
+    def clear(self, key):
+        self._run("DELETE FROM rate_limit_counters WHERE key = %s", (key,))
+
+    # -- sliding window counter ------------------------------------------
+
+    @staticmethod
+    def _window(expiry, now):
+        window_idx = int(now // expiry)
+        previous_ttl = (window_idx + 1) * expiry - now
+        return window_idx, previous_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        self._maybe_cleanup(now)
+        window_idx, previous_ttl = self._window(expiry, now)
+        prev_count, curr_count = self._run(
+            _SLIDING_INCR_SQL,
+            (key, window_idx, amount, (window_idx + 2) * expiry),
+            fetch=True,
+        )
+        weighted = prev_count * previous_ttl / expiry + curr_count
+        if math.floor(weighted) > limit:
+            # Over the limit: give the slot back; only rejected hits pay a second statement
+            self._run(_SLIDING_DECR_SQL, (amount, amount, key, window_idx))
+            return False
+        return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        window_idx, previous_ttl = self._window(expiry, now)
+        row = self._run(
+            "SELECT window_idx, prev_count, curr_count FROM rate_limit_counters WHERE key = %s",
+            (key,),
+            fetch=True,
+        )
+        prev_count = curr_count = 0
+        if row:
+            stored_idx, stored_prev, stored_curr = int(row[0]), int(row[1]), int(row[2])
+            if stored_idx >= window_idx:
+                prev_count, curr_count = stored_prev, stored_curr
+            elif stored_idx == window_idx - 1:
+                prev_count = stored_curr
+        return prev_count, previous_ttl, curr_count, previous_ttl + expiry
+
+    def clear_sliding_window(self, key, expiry):
+        self.clear(key)
+
+
+class PostgresLimiterStorage(_SqlCounterStorage):
+    """Counters in an UNLOGGED Postgres table over one autocommit connection per worker."""
+
+    STORAGE_SCHEME = ["postgres+limiter"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urllib.parse.urlparse(uri or "")
+        if parsed.netloc:
+            self._dsn = urllib.parse.urlunparse(parsed._replace(scheme="postgresql"))
+        else:
+            self._dsn = os.getenv("DATABASE_URL")
+        if not self._dsn:
+            raise RuntimeError("postgres+limiter:// requires DATABASE_URL or an explicit database URI")
+
+    @property
+    def base_exceptions(self):
+        return psycopg2.Error
+
+    def _connect(self):
+        conn = psycopg2.connect(self._dsn, connect_timeout=5)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(_CREATE_TABLE_SQL.format(unlogged="UNLOGGED"))
+        return conn
+
+    def _execute(self, conn, sql, params=(), fetch=False):
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            if fetch:
+                return cur.fetchone()
+            return cur.rowcount
+
+
+class SqliteLimiterStorage(_SqlCounterStorage):
+    """Counters in a WAL-mode SQLite file shared by every worker on the host."""
+
+    STORAGE_SCHEME = ["sqlite+limiter"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        path = urllib.parse.urlparse(uri or "").path
+        if not path or path == "/":
+            import tempfile
+            path = os.path.join(tempfile.gettempdir(), "dunkin_rate_limits.db")
+        self._path = path
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self):
+        conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Counters are disposable; skip fsync on every hit
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(_CREATE_TABLE_SQL.format(unlogged=""))
+        return conn
+
+    def _execute(self, conn, sql, params=(), fetch=False):
+        cur = conn.execute(sql.replace("%s", "?"), params)
+        try:
+            if fetch:
+                return cur.fetchone()
+            return cur.rowcount
+        finally:
+            cur.close()
@@ -8,12 +8,24 @@ from flask_limiter.util import get_remote_address
 from functools import wraps
 from flask import request, jsonify
 import os
+import tempfile
 
-# Initialize limiter
+# Registers the postgres+limiter:// and sqlite+limiter:// storage schemes
+import utils.rate_limit_storage  # noqa: F401
+
+# Counters must be shared by all gunicorn workers, so the default is a local
+# SQLite file rather than per-process memory:// storage.
+DEFAULT_RATE_LIMIT_STORAGE_URI = "sqlite+limiter:///" + os.path.join(
+    tempfile.gettempdir(), "dunkin_rate_limits.db"
+).lstrip("/")
+
+# Initialize limiter (RATE_LIMIT_ENABLED=false turns it off, e.g. for load tests)
 limiter = Limiter(
     key_func=get_remote_address,
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "true").strip().lower() not in ("0", "false", "no"),
     default_limits=["120 per minute", "5000 per day"],
-    storage_uri=os.getenv("RATE_LIMIT_STORAGE_URI", "memory://"),
+    storage_uri=os.getenv("RATE_LIMIT_STORAGE_URI", DEFAULT_RATE_LIMIT_STORAGE_URI),
+    strategy=os.getenv("RATE_LIMIT_STRATEGY", "fixed-window"),
 )
 
 # Define rate limit strategies by endpoint type
@@ -0,0 +1,175 @@
+"""Helpers for sending large generated files and result sets without holding them in memory.
+
+Usage:
+    from utils.streaming import new_spool, streamed_file_response
+    spool = new_spool()
+    wb.save(spool)
+    return streamed_file_response(spool, "export.xlsx", mimetype)
+
+    from utils.streaming import iter_query, streamed_json_response
+    rows = iter_query(get_connection(), "SELECT ...", params)
+    return streamed_json_response(rows)
+"""
+import tempfile
+import uuid
+
+from flask import Response, request
+
+from models.db import return_connection
+from utils.json_provider import dumps_json
+
+# Spool exports in memory up to this size before falling back to a temp file
+SPOOL_MAX_BYTES = 4 * 1024 * 1024
+STREAM_CHUNK_BYTES = 64 * 1024
+# Rows fetched per round trip by iter_query's server-side cursor
+QUERY_ITERSIZE = 500
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def new_spool():
+    """Temp file kept in memory up to SPOOL_MAX_BYTES, then moved to disk."""
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+
+def iter_file_chunks(fileobj, chunk_size=STREAM_CHUNK_BYTES):
+    """Yield a file's contents in chunks and close it when done."""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def streamed_file_response(fileobj, filename, mimetype):
+    """Chunked attachment response that reads `fileobj` from its current position."""
+    return Response(
+        iter_file_chunks(fileobj),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        direct_passthrough=True,
+    )
+
+
+# ---------------------------------------------------------
+# JSON result sets
+# ---------------------------------------------------------
+
+class QueryStream:
+    """Rows of one query read through a named (server-side) cursor, `itersize` at a time.
+
+    The query runs on construction so SQL errors surface in the view. Owns
+    `conn`: close() ends the read transaction and returns it to the pool, and
+    runs when the rows are exhausted or the response is closed.
+    """
+
+    def __init__(self, conn, sql, params=None, itersize=QUERY_ITERSIZE):
+        self._conn = conn
+        self._cur = None
+        try:
+            self._cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+            self._cur.itersize = itersize
+            self._cur.execute(sql, params)
+        except Exception:
+            self.close()
+            raise
+
+    def __iter__(self):
+        try:
+            yield from self._cur
+        finally:
+            self.close()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if self._cur is not None:
+                self._cur.close()
+            conn.rollback()
+        finally:
+            return_connection(conn)
+
+
+def iter_query(conn, sql, params=None, itersize=QUERY_ITERSIZE):
+    """Stream a query's rows from a server-side cursor; takes ownership of `conn`."""
+    return QueryStream(conn, sql, params, itersize)
+
+
+def _chunked(pieces, chunk_size=STREAM_CHUNK_BYTES):
+    """Coalesce small byte strings into chunks of roughly `chunk_size`."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _array_pieces(rows):
+    yield b"["
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield dumps_json(row)
+        else:
+            yield b"," + dumps_json(row)
+    yield b"]"
+
+
+def iter_json_array(rows):
+    """Encode `rows` as one JSON array, incrementally."""
+    return _chunked(_array_pieces(rows))
+
+
+def iter_ndjson(rows):
+    """Encode `rows` as newline-delimited JSON, one row per line."""
+    return _chunked(dumps_json(row) + b"\n" for row in rows)
+
+
+def iter_json_object(fields, key, rows):
+    """Encode `{**fields, key: [rows...]}` with the array streamed last."""
+    head = dumps_json(fields)[:-1]
+    def pieces():
+        yield head + (b"," if fields else b"") + dumps_json(key) + b":"
+        yield from _array_pieces(rows)
+        yield b"}"
+    return _chunked(pieces())
+
+
+def wants_ndjson():
+    """True when the client asked for NDJSON via ?format=ndjson or the Accept header."""
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def streamed_json_response(rows, fields=None, key=None, ndjson=None):
+    """Stream rows as a JSON array (or NDJSON when requested).
+
+    With `key`, the body is an object `{**fields, key: [rows...]}` instead of a
+    bare array; NDJSON is not offered for that shape.
+    """
+    if key is not None:
+        response = Response(iter_json_object(fields or {}, key, rows), mimetype="application/json")
+    else:
+        if ndjson is None:
+            ndjson = wants_ndjson()
+        if ndjson:
+            response = Response(iter_ndjson(rows), mimetype=NDJSON_MIMETYPE)
+        else:
+            response = Response(iter_json_array(rows), mimetype="application/json")
+    # Release a QueryStream's connection even if the body is never read
+    if hasattr(rows, "close"):
+        response.call_on_close(rows.close)
+    return response